@@ -1,18 +1,103 @@
-from flask import Flask, request, jsonify
+import os
+import time
+
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 
 from solver import solver
+from jobs import Jobs
+from batch import Batches
+from cache import ResultCache, cached_solve
+from stream import stream_solve, sse_event
+from metrics import Metrics
 
 app = Flask(__name__)
 CORS(app)
 
+jobs = Jobs()
+
+# RESULT_CACHE_PATH points at a SQLite file to share solve results between processes
+result_cache = ResultCache(path=os.environ.get('RESULT_CACHE_PATH'))
+
+metrics = Metrics()
+
+# batch problems share the result cache and metrics of /solve
+batches = Batches(cache=result_cache, metrics=metrics)
+
 @app.route("/solve", methods=['POST'])
 def solve_allocation():
     data = request.get_json()
+    stats = {}
+
+    solution = cached_solve(result_cache, lambda data: solver(data, stats=stats), data)
+
+    metrics.observe_cache(solution['cache']['hit'])
+    if len(stats) > 0:
+        metrics.observe_solve(stats, solution['status'])
 
-    solution = solver(data)
+    # stats only exist when the solve ran, not for a cached result
+    if 'stats' in data and data['stats']:
+        solution = { **solution, "stats": stats if len(stats) > 0 else None }
 
     return jsonify(solution)
 
+@app.route("/metrics", methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route("/solve/stream", methods=['POST'])
+def stream_allocation():
+    data = request.get_json()
+
+    return Response(stream_solve(data), mimetype='text/event-stream')
+
+@app.route("/solve/batch", methods=['POST'])
+def solve_batch():
+    """
+        Solve an array of problems concurrently. Results come back in order, or with ?stream=true as
+        a Server-Sent 'result' event per problem as it finishes, then a 'done' event
+    """
+    problems = request.get_json()
+
+    if not isinstance(problems, list):
+        return jsonify({ "error": "expected an array of problems" }), 400
+
+    if request.args.get('stream') == 'true':
+        def events():
+            for result in batches.solve_as_completed(problems):
+                yield sse_event('result', result)
+            yield sse_event('done', {})
+
+        return Response(events(), mimetype='text/event-stream')
+
+    start = time.perf_counter()
+    results = batches.solve(problems)
+
+    return jsonify({ "results": results, "elapsedMs": (time.perf_counter() - start) * 1000 })
+
+@app.route("/jobs", methods=['POST'])
+def create_job():
+    data = request.get_json()
+
+    id = jobs.submit(data)
+
+    return jsonify({ "id": id }), 202
+
+@app.route("/jobs/<id>", methods=['GET'])
+def get_job(id):
+    job = jobs.get(id)
+
+    if job == None:
+        return jsonify({ "error": "job not found" }), 404
+
+    return jsonify(job)
+
+@app.route("/jobs/<id>", methods=['DELETE'])
+def cancel_job(id):
+    if not jobs.cancel(id):
+        return jsonify({ "error": "job not found" }), 404
+
+    return jsonify(jobs.get(id))
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,111 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from solver import solver
+from cache import request_key, with_cache_block
+
+def solve_item(data):
+    """
+        Solve one problem of a batch in a pool process, timing it. A problem that fails to solve
+        (e.g. a malformed payload) fails on its own instead of failing the batch. stats are handed back
+        for the metrics of the api process
+    """
+    start = time.perf_counter()
+    stats = {}
+
+    try:
+        solution = solver(data, stats=stats)
+        error = None
+    except Exception as e:
+        solution = None
+        error = repr(e)
+
+    return {
+        "status": 'done' if error == None else 'failed',
+        "solution": solution,
+        "error": error,
+        "solveMs": (time.perf_counter() - start) * 1000,
+        "stats": stats,
+    }
+
+class Batches():
+    """
+        Many solve requests at once on a bounded process pool, so a batch takes about as long
+        as its longest problem rather than the sum of them. Problems already in cache (a ResultCache)
+        aren't solved again, solved ones are added to it and recorded in metrics, as for /solve.
+        Pool processes solve their problem whole, they don't start processes of their own
+    """
+    def __init__(self, max_workers=None, cache=None, metrics=None):
+        self.max_workers = max_workers
+        self.cache = cache
+        self.metrics = metrics
+        self.pool = None
+
+    def start(self):
+        # only start processes once a batch is submitted (not on import of the api)
+        if self.pool == None:
+            self.pool = ProcessPoolExecutor(self.max_workers)
+
+    def solve_as_completed(self, problems):
+        """
+            Generator of each problem's result as it finishes: { index, status, solution, error, solveMs, elapsedMs }
+            with elapsedMs the time from the start of the batch. Closing the generator cancels any problem not started
+        """
+        self.start()
+        start = time.perf_counter()
+
+        cached = []
+        futures = {}
+        for index, data in enumerate(problems):
+            key = request_key(data) if self.cache != None and isinstance(data, dict) else None
+            solution, tier = self.cache.get(key) if key != None else (None, None)
+
+            if self.metrics != None and isinstance(data, dict):
+                self.metrics.observe_cache(solution != None)
+
+            if solution != None:
+                cached.append((index, with_cache_block(solution, tier, key)))
+            else:
+                futures[self.pool.submit(solve_item, data)] = (index, key)
+
+        try:
+            for index, solution in cached:
+                yield {
+                    "index": index,
+                    "status": 'done',
+                    "solution": solution,
+                    "error": None,
+                    "solveMs": 0,
+                    "elapsedMs": (time.perf_counter() - start) * 1000,
+                }
+
+            for future in as_completed(futures):
+                index, key = futures[future]
+
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # the pool process died
+                    result = { "status": 'failed', "solution": None, "error": repr(e), "solveMs": None, "stats": {} }
+
+                stats = result.pop('stats')
+                if result['status'] == 'done':
+                    if self.metrics != None and len(stats) > 0:
+                        self.metrics.observe_solve(stats, result['solution']['status'])
+
+                    if key != None:
+                        self.cache.set(key, result['solution'])
+                        result['solution'] = with_cache_block(result['solution'], None, key)
+
+                yield {
+                    "index": index,
+                    **result,
+                    "elapsedMs": (time.perf_counter() - start) * 1000,
+                }
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def solve(self, problems):
+        """Results of every problem, in the order given"""
+        return sorted(self.solve_as_completed(problems), key=lambda result: result['index'])
@@ -0,0 +1,48 @@
+import unittest
+from batch import Batches
+from cache import ResultCache
+from metrics import Metrics
+from cpsat_solver_test import get_test_data
+
+class TestBatch(unittest.TestCase):
+    def test_batch_results_in_order(self):
+        batches = Batches(max_workers=2)
+        broken = get_test_data('cpsat')
+        del broken['costMatrix']
+
+        results = batches.solve([get_test_data('cpsat'), broken, get_test_data('noOptimisation')])
+
+        self.assertListEqual([result['index'] for result in results], [0, 1, 2])
+        self.assertListEqual([result['status'] for result in results], ['done', 'failed', 'done'])
+        self.assertTrue(results[0]['solution']['status'])
+        self.assertIn('costMatrix', results[1]['error'])
+        for result in results:
+            self.assertGreaterEqual(result['elapsedMs'], result['solveMs'])
+
+    def test_batch_as_completed(self):
+        batches = Batches(max_workers=2)
+
+        results = list(batches.solve_as_completed([get_test_data('cpsat') for _ in range(3)]))
+
+        self.assertSetEqual(set(result['index'] for result in results), set([0, 1, 2]))
+        self.assertListEqual(sorted(result['elapsedMs'] for result in results), [result['elapsedMs'] for result in results])
+
+    def test_batch_cached_and_measured(self):
+        metrics = Metrics()
+        batches = Batches(max_workers=2, cache=ResultCache(), metrics=metrics)
+        data = { **get_test_data('noOptimisation'), 'portfolio': True, 'decompose': True }
+
+        first = batches.solve([data])
+        second = batches.solve([data, get_test_data('cpsat')])
+
+        self.assertFalse(first[0]['solution']['cache']['hit'])
+        self.assertTrue(second[0]['solution']['cache']['hit'])
+        self.assertFalse(second[1]['solution']['cache']['hit'])
+        self.assertEqual(second[0]['solution']['objectiveValue'], first[0]['solution']['objectiveValue'])
+        self.assertDictEqual(metrics.cache.series, { ('hit',): 1, ('miss',): 2 })
+        self.assertEqual(sum(metrics.solves.series.values()), 2)
+        # a pool process solves its problem whole
+        self.assertNotIn('strategy', first[0]['solution'])
+
+if __name__ == '__main__':
+    unittest.main()
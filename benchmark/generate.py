@@ -0,0 +1,183 @@
+import base64
+import random
+from array import array
+
+day_start_mins = 8 * 60
+
+durations = [15, 30, 45, 60, 90, 120]
+
+default_qty_weights = { 1: 0.7, 2: 0.2, 3: 0.1 }
+
+# fraction of workers given each kind of constraint
+default_constraint_mix = {
+    'mustWork': 0,
+    'cannotWork': 0.05,
+    'atLeastWork': 0.01,
+    'combinedMustWork': 0,
+    'timeFatigueTotal': 0.05,
+    'overallTimeFatigueTotal': 0.05,
+    'overallTimeFatigueConsecutive': 0.1,
+    'unavailable': 0.1,
+    'buddy': 0.01,
+    'nemesis': 0.02,
+}
+
+def get_time(mins):
+    return { "hour": mins // 60, "min": mins % 60 }
+
+def pick_workers(rand, workers, fraction):
+    count = round(len(workers) * fraction)
+
+    return rand.sample(workers, min(count, len(workers)))
+
+def generate_roster(
+    num_workers,
+    num_tasks,
+    overlap=None,
+    qty_weights=default_qty_weights,
+    constraint_mix=default_constraint_mix,
+    solver_option='noOptimisation',
+    time_limit=None,
+    seed=0,
+    worker_types=None,
+    shift_length=None,
+):
+    """
+        Seeded synthetic /solve request.
+        overlap : average number of scheduled tasks on at any one time, the day is stretched to fit
+            (defaults to a quarter of the workers, so the roster can be filled)
+        qty_weights : { [qty] : weight } qty distribution of tasks
+        constraint_mix : { [constraint key] : fraction of workers with that constraint }
+        worker_types : number of distinct cost rows, workers of a type cost the same (defaults to every worker its own)
+        shift_length : minutes, every task is a whole shift starting on a shift boundary (defaults to any start and duration)
+    """
+    rand = random.Random(seed)
+
+    if overlap == None:
+        mean_qty = sum(qty * weight for qty, weight in qty_weights.items()) / sum(qty_weights.values())
+        overlap = max(1, num_workers / (4 * mean_qty))
+
+    mean_duration = sum(durations) / len(durations) if shift_length == None else shift_length
+    day_length = max(60, int(num_tasks * mean_duration / overlap))
+
+    workers = [
+        { "id": id, "name": f'worker {id}', "tags": [] }
+            for id in range(num_workers)
+    ]
+
+    num_task_ids = max(1, num_tasks // 5)
+    qtys = list(qty_weights.keys())
+    qty_by_task_id = { task_id: rand.choices(qtys, [qty_weights[q] for q in qtys])[0] for task_id in range(num_task_ids) }
+
+    scheduled_tasks = []
+    for index in range(num_tasks):
+        if shift_length == None:
+            start = day_start_mins + rand.randrange(0, day_length, 15)
+            end = start + rand.choice(durations)
+        else:
+            start = day_start_mins + rand.randrange(0, max(day_length, shift_length), shift_length)
+            end = start + shift_length
+        task_id = rand.randrange(num_task_ids)
+
+        scheduled_tasks.append({
+            "id": f'scheduled-task-{index}',
+            "startTime": get_time(start),
+            "endTime": get_time(end),
+            "task": { "id": task_id, "name": f'task {task_id}', "qty": qty_by_task_id[task_id] },
+        })
+
+    if worker_types == None:
+        cost_matrix = {
+            str(worker['id']): { task['id']: rand.randrange(0, 100) for task in scheduled_tasks }
+                for worker in workers
+        }
+    else:
+        type_costs = [{ task['id']: rand.randrange(0, 100) for task in scheduled_tasks } for type in range(worker_types)]
+        cost_matrix = { str(worker['id']): dict(type_costs[worker['id'] % worker_types]) for worker in workers }
+
+    return {
+        "workers": workers,
+        "scheduledTasks": scheduled_tasks,
+        "costMatrix": cost_matrix,
+        "solverOption": solver_option,
+        "timeLimit": time_limit,
+        "constraints": generate_constraints(rand, workers, num_task_ids, day_length, constraint_mix),
+    }
+
+def generate_constraints(rand, workers, num_task_ids, day_length, constraint_mix):
+    mix = { **{ key: 0 for key in default_constraint_mix }, **constraint_mix }
+    task_ids = list(range(num_task_ids))
+    constraints = {}
+
+    constraints['mustWork'] = {
+        str(w['id']): [str(rand.choice(task_ids))] for w in pick_workers(rand, workers, mix['mustWork'])
+    }
+    constraints['cannotWork'] = {
+        str(w['id']): [str(t) for t in rand.sample(task_ids, min(3, num_task_ids))]
+            for w in pick_workers(rand, workers, mix['cannotWork'])
+    }
+    constraints['atLeastWork'] = {
+        str(w['id']): [str(rand.choice(task_ids))] for w in pick_workers(rand, workers, mix['atLeastWork'])
+    }
+    constraints['timeFatigueTotal'] = {
+        str(w['id']): [{ "limit": rand.choice([60, 120, 180]), "tasks": rand.sample(task_ids, min(2, num_task_ids)) }]
+            for w in pick_workers(rand, workers, mix['timeFatigueTotal'])
+    }
+    # overallTimeFatigueTotal is keyed by worker index, which is the worker id for generated workers
+    constraints['overallTimeFatigueTotal'] = {
+        str(w['id']): { "limit": rand.choice([240, 360, 480]) }
+            for w in pick_workers(rand, workers, mix['overallTimeFatigueTotal'])
+    }
+
+    consecutive = {}
+    for w in pick_workers(rand, workers, mix['overallTimeFatigueConsecutive']):
+        limit = str(rand.choice([60, 90, 120]))
+        consecutive.setdefault(limit, { "breakTime": 15, "workers": [] })['workers'].append(w['id'])
+    constraints['overallTimeFatigueConsecutive'] = consecutive
+
+    unavailable = {}
+    for w in pick_workers(rand, workers, mix['unavailable']):
+        start = day_start_mins + rand.randrange(0, day_length, 15)
+        unavailable[str(w['id'])] = {
+            "range": { "startTime": get_time(start), "endTime": get_time(start + rand.choice([60, 120, 240])) }
+        }
+    constraints['unavailable'] = unavailable
+
+    for key, size in [('buddy', 2), ('nemesis', 2), ('combinedMustWork', 3)]:
+        chosen = pick_workers(rand, workers, mix[key])
+        constraints[key] = [
+            { "workers": [w['id'] for w in chosen[i:i + size]], "tasks": [rand.choice(task_ids)] }
+                for i in range(0, len(chosen) - size + 1, size)
+        ]
+
+    return constraints
+
+def encode_cost_matrix(data, cost_format):
+    """
+        data's costMatrix in another format: 'dense' rows, a 'base64' int32 buffer or a base64 'npy' file
+        (see utils.get_cost_rows)
+    """
+    rows = [
+        [data['costMatrix'][str(worker['id'])][task['id']] for task in data['scheduledTasks']]
+            for worker in data['workers']
+    ]
+
+    if cost_format == 'dense':
+        return rows
+
+    costs = array('i', (cost for row in rows for cost in row))
+    if costs.itemsize != 4:
+        raise ValueError('int is not 32 bit on this platform')
+
+    if array('i', [1]).tobytes()[0] != 1:
+        costs.byteswap()
+
+    if cost_format == 'base64':
+        return { "encoding": "base64", "data": base64.b64encode(costs.tobytes()).decode('ascii') }
+
+    header = f"{{'descr': '<i4', 'fortran_order': False, 'shape': ({len(rows)}, {len(data['scheduledTasks'])}), }}"
+    # magic, version 1.0, then the header padded with spaces to 64 bytes (ending in a newline)
+    header = header + ' ' * (63 - (10 + len(header)) % 64) + '\n'
+    npy = b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header.encode('latin1') + costs.tobytes()
+
+    return { "encoding": "npy", "data": base64.b64encode(npy).decode('ascii') }
@@ -0,0 +1,156 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import time
+
+from ortools.constraint_solver import pywrapcp
+
+import utils
+from solver import solver
+from constraints import Constraints
+from model import CpSatModel, build_assignments, add_constraints, measure_build
+from benchmark.generate import generate_roster, encode_cost_matrix, default_constraint_mix
+
+default_sizes = ['30x25', '100x100', '300x500', '1000x2000', '2000x5000']
+
+def time_parse(data):
+    start = time.perf_counter()
+    tasks = utils.get_tasks(data['scheduledTasks'])
+    workers = utils.get_workers(data['workers'])
+
+    return (time.perf_counter() - start, tasks, workers)
+
+def build(data, tasks, workers):
+    """
+        Build the model (variables and every Constraints family) without searching, returning the build stats
+    """
+    build_stats = []
+    model = CpSatModel() if data['solverOption'] == 'cpsat' else pywrapcp.Solver('benchmark')
+    constraints = measure_build(build_stats, 'Constraints', model, lambda m: Constraints(tasks, workers))
+    fixed = measure_build(build_stats, 'presolve', model, lambda m: constraints.presolve(data['constraints']))
+    assignment_costs = measure_build(
+        build_stats,
+        'get_cost_rows',
+        model,
+        lambda m: utils.get_cost_rows(data['costMatrix'], workers, tasks)
+    )
+    assignments, assignments_ref = measure_build(
+        build_stats,
+        'build_assignments',
+        model,
+        lambda m: build_assignments(m, tasks, workers, fixed)
+    )
+    constraints.set_assignments(assignment_costs, assignments, assignments_ref)
+    add_constraints(model, constraints, data['constraints'], build_stats)
+
+    return build_stats
+
+def solve(data):
+    stats = {}
+    # solver prints progress, keep the benchmark output clean
+    with contextlib.redirect_stdout(io.StringIO()):
+        solution = solver(data, stats=stats)
+
+    return (solution, stats)
+
+def run_benchmark(num_workers, num_tasks, search=True, seed=0, cost_format=None, **roster_options):
+    data = generate_roster(num_workers, num_tasks, seed=seed, **roster_options)
+
+    if cost_format != None:
+        data['costMatrix'] = encode_cost_matrix(data, cost_format)
+
+    parse_time, tasks, workers = time_parse(data)
+    result = {
+        "workers": num_workers,
+        "tasks": num_tasks,
+        "seed": seed,
+        "solverOption": data['solverOption'],
+        "parseMs": parse_time * 1000,
+    }
+
+    if not search:
+        build_stats = build(data, tasks, workers)
+
+        return {
+            **result,
+            "buildMs": sum(family['ms'] for family in build_stats),
+            "build": build_stats,
+        }
+
+    solution, stats = solve(data)
+
+    return {
+        **result,
+        "buildMs": stats['buildMs'],
+        "searchMs": stats['search']['wallTimeMs'],
+        "build": stats['build'],
+        "search": stats['search'],
+        "status": solution['status'],
+        "objectiveValue": solution['objectiveValue'],
+        "gap": solution['gap'],
+    }
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_size(size):
+    num_workers, num_tasks = size.split('x')
+
+    return (int(num_workers), int(num_tasks))
+
+def main():
+    parser = argparse.ArgumentParser(description='Time model build and search on synthetic rosters')
+    parser.add_argument('--sizes', default=','.join(default_sizes), help='comma separated WORKERSxTASKS')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--overlap', type=float, default=None, help='average number of tasks on at once')
+    parser.add_argument('--solver-option', default='noOptimisation')
+    parser.add_argument('--time-limit', type=float, default=None, help='search time limit in minutes')
+    parser.add_argument('--worker-types', type=int, default=None, help='number of distinct worker cost rows')
+    parser.add_argument('--shift-length', type=int, default=None, help='minutes, make every task a whole shift')
+    parser.add_argument('--cost-format', default=None, choices=['dense', 'base64', 'npy'], help='costMatrix format (default nested objects)')
+    parser.add_argument('--constraints', default=None,
+        help='JSON { [constraint key] : fraction of workers }, merged over the default mix')
+    parser.add_argument('--only', default=None, help='only generate this constraint key (to isolate one family)')
+    parser.add_argument('--build-only', action='store_true', help='skip the search')
+    parser.add_argument('--output', default='bench_output.json')
+    args = parser.parse_args()
+
+    constraint_mix = { **default_constraint_mix, **(json.loads(args.constraints) if args.constraints else {}) }
+    if args.only != None:
+        constraint_mix = { key: (fraction if key == args.only else 0) for key, fraction in constraint_mix.items() }
+
+    results = []
+    for size in args.sizes.split(','):
+        num_workers, num_tasks = parse_size(size)
+        result = run_benchmark(
+            num_workers,
+            num_tasks,
+            search=not args.build_only,
+            seed=args.seed,
+            overlap=args.overlap,
+            constraint_mix=constraint_mix,
+            solver_option=args.solver_option,
+            time_limit=args.time_limit,
+            worker_types=args.worker_types,
+            shift_length=args.shift_length,
+            cost_format=args.cost_format,
+        )
+        print(json.dumps({ key: value for key, value in result.items() if key not in ['build', 'search'] }))
+        results.append(result)
+
+    with open(args.output, 'w') as output:
+        json.dump({
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "constraintMix": constraint_mix,
+            "results": results,
+        }, output, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+import unittest
+from benchmark.generate import generate_roster
+from benchmark.run import run_benchmark
+
+class TestBenchmark(unittest.TestCase):
+    def test_generate_roster_is_seeded(self):
+        self.assertEqual(generate_roster(30, 25, seed=1), generate_roster(30, 25, seed=1))
+        self.assertNotEqual(generate_roster(30, 25, seed=1), generate_roster(30, 25, seed=2))
+
+    def test_generate_roster_shape(self):
+        data = generate_roster(40, 60, constraint_mix={ 'unavailable': 0.5, 'buddy': 0.1 })
+
+        self.assertEqual(len(data['workers']), 40)
+        self.assertEqual(len(data['scheduledTasks']), 60)
+        self.assertEqual(len(data['constraints']['unavailable']), 20)
+        self.assertEqual(len(data['constraints']['buddy']), 2)
+        self.assertEqual(data['constraints']['nemesis'], [])
+        for worker in data['workers']:
+            self.assertEqual(len(data['costMatrix'][str(worker['id'])]), 60)
+
+    def test_run_benchmark(self):
+        result = run_benchmark(30, 25)
+
+        self.assertTrue(result['status'])
+        self.assertTrue(result['buildMs'] > 0)
+        self.assertTrue(result['searchMs'] >= 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import utils
+
+# a dense costMatrix is lined up with the workers and scheduledTasks arrays, so none of them can be reordered
+dense_cost_keys = ['workers', 'scheduledTasks', 'costMatrix']
+
+# constraint maps keyed by worker index (position in workers) rather than worker id
+index_keyed_constraint_keys = ['overallTimeFatigueTotal']
+
+def normalise(value):
+    """
+        Canonical form of a request payload: dict keys sorted and every list sorted, since
+        workers, scheduled tasks and all constraint lists are sets as far as the solver is concerned
+    """
+    if isinstance(value, dict):
+        return { str(key): normalise(item) for key, item in sorted(value.items(), key=lambda i: str(i[0])) }
+
+    if isinstance(value, list):
+        items = [normalise(item) for item in value]
+        items.sort(key=lambda item: json.dumps(item, sort_keys=True))
+        return items
+
+    return value
+
+def key_by_worker_id(data):
+    """
+        The request with constraint maps keyed by worker index keyed by worker id instead, so they stay with
+        the same workers once workers are sorted. Keys of no worker are dropped, the solver ignores them too
+    """
+    extra_constraints = data['constraints'] if 'constraints' in data and data['constraints'] != None else {}
+    if not any(key in extra_constraints for key in index_keyed_constraint_keys):
+        return data
+
+    worker_ids = { str(index): str(worker['id']) for index, worker in enumerate(data['workers']) }
+
+    return {
+        **data,
+        "constraints": {
+            **extra_constraints,
+            **{
+                key: { worker_ids[index]: value for index, value in extra_constraints[key].items() if index in worker_ids }
+                    for key in index_keyed_constraint_keys if key in extra_constraints
+            },
+        },
+    }
+
+def normalise_request(data):
+    """normalise a request payload, keeping the order a dense costMatrix and worker indexes depend on"""
+    if 'workers' in data:
+        data = key_by_worker_id(data)
+
+    if 'costMatrix' not in data or not utils.is_dense_cost_matrix(data['costMatrix']):
+        return normalise(data)
+
+    return { key: (value if key in dense_cost_keys else normalise(value)) for key, value in data.items() }
+
+def request_key(data):
+    """Hash of the normalised payload, identical requests share a key"""
+    canonical = json.dumps(normalise_request(data), sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ResultCache():
+    """
+        Solve results by request key. An in-memory LRU tier (max_size entries, ttl seconds) in front
+        of an optional SQLite tier at path, which can be shared by every process on the box
+    """
+    def __init__(self, max_size=256, ttl=24 * 60 * 60, path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.entries = OrderedDict()
+        # request threads and batch/stream generators share the memory tier
+        self.lock = threading.Lock()
+
+        if path != None:
+            with self.connect() as connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT, created REAL)'
+                )
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def expired(self, created):
+        return self.ttl != None and time.time() - created > self.ttl
+
+    def get(self, key):
+        """
+            Returns (result, tier) where tier is 'memory' or 'disk', or (None, None) on a miss
+        """
+        with self.lock:
+            if key in self.entries:
+                result, created = self.entries[key]
+                if not self.expired(created):
+                    self.entries.move_to_end(key)
+                    return (result, 'memory')
+
+                del self.entries[key]
+
+        if self.path != None:
+            with self.connect() as connection:
+                row = connection.execute('SELECT result, created FROM results WHERE key = ?', (key,)).fetchone()
+
+            if row != None and not self.expired(row[1]):
+                result = json.loads(row[0])
+                self.remember(key, result, row[1])
+                return (result, 'disk')
+
+        return (None, None)
+
+    def set(self, key, result):
+        created = time.time()
+        self.remember(key, result, created)
+
+        if self.path != None:
+            with self.connect() as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO results (key, result, created) VALUES (?, ?, ?)',
+                    (key, json.dumps(result), created)
+                )
+
+    def remember(self, key, result, created):
+        with self.lock:
+            self.entries[key] = (result, created)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+def cached_solve(cache, solve, data):
+    """
+        solve(data) unless an identical request has already been solved, adding a cache block
+        ({ hit, tier, key }) to the response
+    """
+    key = request_key(data)
+    result, tier = cache.get(key)
+
+    if result == None:
+        result = solve(data)
+        cache.set(key, result)
+
+    return with_cache_block(result, tier, key)
+
+def with_cache_block(result, tier, key):
+    """The response with its cache block, tier None for a result just solved"""
+    return {
+        **result,
+        "cache": {
+            "hit": tier != None,
+            "tier": tier,
+            "key": key,
+        }
+    }
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from cache import request_key, ResultCache, cached_solve
+from cpsat_solver_test import get_test_data
+from benchmark.generate import encode_cost_matrix
+
+class TestCache(unittest.TestCase):
+    def test_request_key_ignores_key_and_list_order(self):
+        data = get_test_data('noOptimisation')
+        reordered = {
+            **{ key: data[key] for key in reversed(list(data.keys())) },
+            'workers': list(reversed(data['workers'])),
+            'scheduledTasks': list(reversed(data['scheduledTasks'])),
+        }
+
+        self.assertEqual(request_key(data), request_key(reordered))
+
+        data['timeLimit'] = 1
+        self.assertNotEqual(request_key(data), request_key(reordered))
+
+    def test_request_key_keeps_dense_cost_matrix_order(self):
+        data = get_test_data('noOptimisation')
+        data['costMatrix'] = encode_cost_matrix(data, 'dense')
+        swapped_rows = { **data, 'costMatrix': [data['costMatrix'][1], data['costMatrix'][0], *data['costMatrix'][2:]] }
+        swapped_workers = { **swapped_rows, 'workers': [data['workers'][1], data['workers'][0], *data['workers'][2:]] }
+
+        # the same costs for different workers
+        self.assertNotEqual(request_key(data), request_key(swapped_rows))
+        self.assertNotEqual(request_key(data), request_key(swapped_workers))
+
+        self.assertEqual(request_key(data), request_key({ **data, 'timeLimit': data['timeLimit'] }))
+
+    def test_request_key_keeps_worker_index_keys_with_their_workers(self):
+        data = get_test_data('noOptimisation')
+        data['constraints']['overallTimeFatigueTotal'] = { '0': { 'limit': 60 } }
+        reversed_workers = { **data, 'workers': list(reversed(data['workers'])) }
+
+        # the limit is now on the last worker
+        self.assertNotEqual(request_key(data), request_key(reversed_workers))
+
+        last_index = str(len(data['workers']) - 1)
+        moved_limit = {
+            **reversed_workers,
+            'constraints': { **data['constraints'], 'overallTimeFatigueTotal': { last_index: { 'limit': 60 } } },
+        }
+        self.assertEqual(request_key(data), request_key(moved_limit))
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        cache = ResultCache(max_size=2)
+        cache.set('a', { 'status': True })
+        cache.set('b', { 'status': True })
+        cache.get('a')
+        cache.set('c', { 'status': True })
+
+        self.assertEqual(cache.get('b'), (None, None))
+        self.assertEqual(cache.get('a'), ({ 'status': True }, 'memory'))
+
+    def test_memory_tier_shared_between_threads(self):
+        cache = ResultCache(max_size=4)
+        errors = []
+
+        def use(offset):
+            try:
+                for n in range(2000):
+                    key = str((n + offset) % 8)
+                    cache.set(key, { 'status': True })
+                    cache.get(key)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=use, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertListEqual(errors, [])
+        self.assertLessEqual(len(cache.entries), 4)
+
+    def test_expired_results_miss(self):
+        cache = ResultCache(ttl=0)
+        cache.set('a', { 'status': True })
+        time.sleep(0.01)
+
+        self.assertEqual(cache.get('a'), (None, None))
+
+    def test_disk_tier_shared_between_caches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.db')
+            ResultCache(path=path).set('a', { 'status': True })
+
+            self.assertEqual(ResultCache(path=path).get('a'), ({ 'status': True }, 'disk'))
+
+    def test_cached_solve_reports_hits(self):
+        calls = []
+        def solve(data):
+            calls.append(data)
+            return { 'status': True }
+
+        cache = ResultCache()
+        miss = cached_solve(cache, solve, { 'solverOption': 'optimal' })
+        hit = cached_solve(cache, solve, { 'solverOption': 'optimal' })
+
+        self.assertFalse(miss['cache']['hit'])
+        self.assertTrue(hit['cache']['hit'])
+        self.assertEqual(hit['cache']['tier'], 'memory')
+        self.assertEqual(len(calls), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,42 +1,169 @@
+import json
+from collections import namedtuple
+
 import utils
 
+Consecutive_fatigue = namedtuple(
+    'Consecutive_fatigue',
+    ['indexes_over_limit', 'indexes_within_break_time', 'paths', 'predecessors']
+)
+
+# above this many consecutive paths for a limit, use the running consecutive time formulation
+max_consecutive_paths = 2000
+
+# constraint maps keyed by worker id
+worker_constraint_keys = ['mustWork', 'cannotWork', 'atLeastWork', 'timeFatigueTotal', 'unavailable']
+
+# constraints on groups of workers, symmetric in the workers of a group
+worker_group_constraint_keys = ['combinedMustWork', 'buddy', 'nemesis']
+
 class Constraints():
     def __init__(
         self,
         tasks,
         workers,
-        assignment_costs,
-        assignments,
-        assignments_ref,
+        assignment_costs=None,
+        assignments=None,
+        assignments_ref=None,
     ):
         self.tasks = tasks
         self.workers = workers
         self.num_tasks = len(tasks)
         self.num_workers = len(workers)
+        self.task_table = utils.get_task_table(tasks)
+        # tasks in start order, so time range and break window queries don't scan every task
+        self.timeline = utils.get_timeline(self.task_table)
+
+        # worker/task pairs decided by presolve, { (worker_index, task_index) : 0 | 1 }
+        self.fixed = {}
+        # worker/task pairs presolve found fixed to both 0 and 1
+        self.conflicts = set()
+
+        # lookup tables so constraint families never scan workers/tasks for an id
+        self.worker_index_by_id = {int(w.id): w.index for w in workers}
+        self.task_index_by_id = {t.id: t.index for t in tasks}
+        self.task_indexes_by_task_id = {}
+        for t in tasks:
+            self.task_indexes_by_task_id.setdefault(t.task_id, []).append(t.index)
+
+        # consecutive fatigue paths by (limit, break time, formulation)
+        self.consecutive_fatigue = {}
+
+        if assignments != None:
+            self.set_assignments(assignment_costs, assignments, assignments_ref)
+
+    def set_assignments(self, assignment_costs, assignments, assignments_ref):
+        """
+            Decision variables to add constraints to. Rows are sparse, assignments[i] : { [task_index] : var },
+            pairs presolve fixed to 0 have no variable
+        """
         self.assignment_costs = assignment_costs
         self.assignments = assignments
         self.assignments_ref = assignments_ref
 
+        self.workers_by_task = [[] for j in range(self.num_tasks)]
+        for i, worker_assignments in enumerate(assignments):
+            for j in worker_assignments:
+                self.workers_by_task[j].append(i)
+
+    def presolve(self, extra_constraints):
+        """
+            Work out the worker/task pairs the must/cannot work, unavailability and consecutive fatigue maps
+            already decide, so the model only needs variables for the rest.
+            Returns { (worker_index, task_index) : 0 | 1 }. A pair fixed both ways is left out, its variable then
+            gets both constraints and the model is infeasible as before
+        """
+        fixed_one = set()
+        fixed_zero = set()
+
+        must_map = extra_constraints['mustWork'] if 'mustWork' in extra_constraints else None
+        cannot_map = extra_constraints['cannotWork'] if 'cannotWork' in extra_constraints else None
+
+        for i in range(self.num_workers):
+            worker_id_str = str(self.workers[i].id)
+
+            if not (
+                (must_map != None and worker_id_str in must_map) or
+                (cannot_map != None and worker_id_str in cannot_map)
+            ):
+                continue
+
+            for j in range(self.num_tasks):
+                task_id_str = str(self.tasks[j].task_id)
+
+                # must work wins over cannot work, as in must_cannot_work
+                if self.worker_task_in_map(worker_id_str, task_id_str, must_map):
+                    fixed_one.add((i, j))
+                elif self.worker_task_in_map(worker_id_str, task_id_str, cannot_map):
+                    fixed_zero.add((i, j))
+
+        if 'unavailable' in extra_constraints:
+            unavailability_map = extra_constraints['unavailable']
+            for worker in self.workers:
+                if str(worker.id) in unavailability_map:
+                    unavailable_range = utils.get_range(unavailability_map[str(worker.id)]['range'])
+                    fixed_zero.update(
+                        (worker.index, j) for j in utils.get_task_indexes_in_range(self.task_table, unavailable_range, self.timeline))
+
+        if 'overallTimeFatigueConsecutive' in extra_constraints:
+            for limit_str, limit_info in extra_constraints['overallTimeFatigueConsecutive'].items():
+                formulation = limit_info['formulation'] if 'formulation' in limit_info else None
+                consecutive_fatigue = self.get_consecutive_fatigue(int(limit_str), limit_info['breakTime'], formulation)
+
+                for i in self.worker_indexes(limit_info['workers']):
+                    fixed_zero.update((i, j) for j in consecutive_fatigue.indexes_over_limit)
+                    fixed_zero.update((i, j) for j in consecutive_fatigue.indexes_within_break_time)
+
+        self.conflicts = fixed_one & fixed_zero
+
+        self.fixed = {
+            **{pair: 0 for pair in fixed_zero - self.conflicts},
+            **{pair: 1 for pair in fixed_one - self.conflicts},
+        }
+
+        return self.fixed
+
+    def fix(self, solver, i, j, value):
+        """Fix worker i to value for task j, unless presolve already has"""
+        if j in self.assignments[i] and self.fixed.get((i, j)) != value:
+            solver.Add(self.assignments[i][j] == value)
+
     def addOneWorkerOneTask(self, solver):
         [solver.Add(solver.Sum(self.assignments[i][j]
-            for i in range(self.num_workers)) == 1)
+            for i in self.workers_by_task[j]) == 1)
                 for j in range(self.num_tasks)]
 
 
     def add_task_qty_constraint(self, solver):
         [solver.Add(solver.Sum(self.assignments[i][j]
-            for i in range(self.num_workers)) == self.tasks[j].qty)
+            for i in self.workers_by_task[j]) == self.tasks[j].qty)
                 for j in range(self.num_tasks)]
 
     def add_same_worker_same_task_time(self, solver):
         """
             This constraint ensures workers cannot be assigned to at most one task at an point in time
         """
-        grouped_task_time = utils.map_to_indicies(utils.group_task_by_time_overlap(self.tasks))
+        grouped_task_time = utils.group_task_indexes_by_time_overlap(self.task_table)
 
-        [solver.Add(solver.Sum(self.assignments[i][j] for j in task_time_indexes) <= 1)
-            for task_time_indexes in grouped_task_time
-                for i in range(self.num_workers)]
+        for task_time_indexes in grouped_task_time:
+            for worker_assignments in self.assignments:
+                # a single task left in the group can't clash
+                worker_task_time = [worker_assignments[j] for j in task_time_indexes if j in worker_assignments]
+                if len(worker_task_time) > 1:
+                    solver.Add(solver.Sum(worker_task_time) <= 1)
+
+    def worker_indexes(self, worker_ids):
+        """Indexes of the given worker ids, ignoring any unknown worker"""
+        indexes = [self.worker_index_by_id.get(int(worker_id)) for worker_id in worker_ids]
+
+        return [i for i in indexes if i != None]
+
+    def task_indexes(self, task_ids):
+        """Indexes (in schedule order) of all scheduled tasks for the given task ids"""
+        return sorted(set(
+            j for task_id in task_ids
+                for j in self.task_indexes_by_task_id.get(task_id, [])
+        ))
 
     def worker_task_in_map(self, worker_id, task_id, map):
         if map == None:
@@ -49,18 +176,24 @@ class Constraints():
             This constraint ensures that workers obey forced must/cannot constraints
         """
         for i in range(self.num_workers):
-            for j in range(self.num_tasks):
-                worker_task = self.assignments_ref[i][j]
+            worker_id_str = str(self.workers[i].id)
+
+            # most workers have no must/cannot entries, so skip their tasks entirely
+            if not (
+                (must_map != None and worker_id_str in must_map) or
+                (cannot_map != None and worker_id_str in cannot_map)
+            ):
+                continue
 
-                worker_id_str = str(worker_task.worker.id)
-                task_id_str = str(worker_task.task.task_id)
+            for j in range(self.num_tasks):
+                task_id_str = str(self.tasks[j].task_id)
 
                 # if in must work, sum for task qty for use has to be 1
                 if self.worker_task_in_map(worker_id_str, task_id_str, must_map):
-                    solver.Add(self.assignments[i][j] == 1)
+                    self.fix(solver, i, j, 1)
                 # if in cannot work, sum for task qty for use has to be 0
                 elif self.worker_task_in_map(worker_id_str, task_id_str, cannot_map):
-                    solver.Add(self.assignments[i][j] == 0)
+                    self.fix(solver, i, j, 0)
 
     def combined_must_work_all(self, solver, combined_groups):
         """
@@ -69,37 +202,29 @@ class Constraints():
         """
 
         for group in combined_groups:
-            worker_ids = group['workers']
-            workers = [utils.find_worker_by_id(worker_id, self.workers) for worker_id in worker_ids]
-            worker_indexes = [w.index for w in workers if w != None]
+            worker_indexes = self.worker_indexes(group['workers'])
             task_ids = group['tasks']
             for task_id in task_ids:
-                sched_tasks = [t for t in self.tasks if t.task_id == task_id]
-
-                for schd_task in sched_tasks:
+                for j in self.task_indexes_by_task_id.get(task_id, []):
                     solver.Add(
                         solver.Sum(
-                            self.assignments[i][schd_task.index] for i in worker_indexes
+                            self.assignments[i][j] for i in worker_indexes if j in self.assignments[i]
                         ) == 1
                     )
 
-
-
-
     def add_at_least_work_task(self, solver, at_least_map):
         """
             This constraint ensures that workers work at least on task in the given map
         """
-        grouped_task = utils.group_task_by_task(self.tasks)
-
         for i in range(self.num_workers):
-            for task_group in grouped_task:
-                # Each group will have same task, so use first one to get id
-                task_id_str = str(task_group[0].task_id)
-                worker_id_str = str(self.workers[i].id)
+            worker_id_str = str(self.workers[i].id)
+
+            if worker_id_str not in at_least_map:
+                continue
 
-                if self.worker_task_in_map(worker_id_str, task_id_str, at_least_map):
-                    solver.Add(solver.Sum(self.assignments[i][task.index] for task in task_group) >= 1)
+            for task_id, task_indexes in self.task_indexes_by_task_id.items():
+                if self.worker_task_in_map(worker_id_str, str(task_id), at_least_map):
+                    solver.Add(solver.Sum(self.assignments[i][j] for j in task_indexes if j in self.assignments[i]) >= 1)
 
     def add_time_fatigue_total(self, solver, fatigue_total_map):
         """
@@ -116,15 +241,16 @@ class Constraints():
                 for total_fatigue in worker_total_fatigue_constraints:
                     limit = total_fatigue['limit']
                     task_ids_for_limit = total_fatigue['tasks']
-                    tasks_for_limit = [utils.find_sch_task_by_task_id(id, self.tasks) for id in task_ids_for_limit]
 
-                    for task_for_limit in tasks_for_limit:
-                        solver.Add(
-                            solver.Sum(
-                                self.assignments[i][task.index] * utils.get_task_duration(task)
-                                    for task in self.tasks if
-                                        (task_for_limit != None and task.task_id == task_for_limit.task_id)
-                                    ) <= limit)
+                    for task_id in task_ids_for_limit:
+                        task_indexes = self.task_indexes_by_task_id.get(task_id)
+
+                        if task_indexes:
+                            solver.Add(
+                                solver.Sum(
+                                    self.assignments[i][j] * self.task_table.duration[j]
+                                        for j in task_indexes if j in self.assignments[i]
+                                        ) <= limit)
 
     def add_overall_total_fatigue_time(self, solver, overall_map):
         """
@@ -137,13 +263,62 @@ class Constraints():
             if worker_id_str in overall_map:
                 limit = overall_map[worker_id_str]['limit']
                 solver.Add(
-                    solver.Sum(self.assignments[i][j] * utils.get_task_duration(self.assignments_ref[i][j].task)
-                        for j in range(self.num_tasks)) <= limit)
+                    solver.Sum(assignment * self.task_table.duration[j]
+                        for j, assignment in self.assignments[i].items()) <= limit)
+
+    def get_consecutive_fatigue(self, limit, break_time, formulation):
+        """
+            Everything the consecutive fatigue constraint needs for a limit, worked out once and
+            shared by every worker with that limit
+        """
+        key = (limit, break_time, formulation)
+        if key in self.consecutive_fatigue:
+            return self.consecutive_fatigue[key]
+
+        starts = self.task_table.start
+        ends = self.task_table.end
+
+        # split tasks into ones that have duration over limit
+        indexes_below_limit, indexes_over_limit = utils.split_task_indexes_by_duration_limit(self.task_table, limit)
+
+        # For tasks lower, find all possible consecutive paths greater than limit
+        paths = None
+        if formulation != 'window':
+            max_paths = None if formulation == 'paths' else max_consecutive_paths
+            paths = utils.find_consecutive_index_paths(indexes_below_limit, starts, ends, limit, max_paths=max_paths)
+
+        # tasks starting within break time after any path equal to the limit
+        if paths != None:
+            path_end_times = set(min(ends[j] for j in path.path_tasks) for path in paths if path.total_time == limit)
+        else:
+            path_end_times = set(ends[j] for j in utils.get_exact_limit_path_starts(indexes_below_limit, starts, ends, limit))
+
+        indexes_within_break_time = sorted(set(
+            j for path_end_time in path_end_times
+                for j in utils.get_task_indexes_within_break_time_limit(break_time, path_end_time, self.task_table, self.timeline)
+        ))
+
+        predecessors = None
+        if paths == None:
+            predecessors = utils.get_task_predecessors(indexes_below_limit, starts, ends)
+
+        self.consecutive_fatigue[key] = Consecutive_fatigue(
+            indexes_over_limit,
+            indexes_within_break_time,
+            paths,
+            predecessors,
+        )
+
+        return self.consecutive_fatigue[key]
 
     def add_overall_consecutive_total_fatigue_time(self, solver, overall_consecutive_map):
         """
             This constraint ensures that workers can not consecutively work more than limit given in overall_consecutive_map
-            overall_consecutive_map : { [limit] : worker_ids[] }
+            overall_consecutive_map : { [limit] : { breakTime : number, workers : worker_ids[], formulation? : 'paths' | 'window' } }
+
+            Each consecutive path over the limit gets a constraint per worker, unless there are more than
+            max_consecutive_paths of them (or formulation is 'window'), then a running consecutive time
+            variable per worker and task is bounded by the limit instead
         """
         # Note: consecutive_map grouped by limit (15min increments) to reduce duplicate calculations
 
@@ -151,33 +326,133 @@ class Constraints():
             limit = int(limit_str)
             break_time = limit_info['breakTime']
             workers = limit_info['workers']
+            formulation = limit_info['formulation'] if 'formulation' in limit_info else None
 
-            # split tasks into ones that have duration over limit
-            tasks_below_limit, tasks_over_limit = utils.split_task_by_duration_limit(self.tasks, limit)
+            consecutive_fatigue = self.get_consecutive_fatigue(limit, break_time, formulation)
 
             # Add constraints for each worker for limit
-            for worker_id in workers:
-                worker_index = utils.find_worker_by_id(worker_id, self.workers).index
+            for worker_index in self.worker_indexes(workers):
+                worker_assignments = self.assignments[worker_index]
+
                 # Add cannot constraint to tasks_over_limit
-                [solver.Add(self.assignments[worker_index][t.index] == 0) for t in tasks_over_limit]
+                [self.fix(solver, worker_index, j, 0) for j in consecutive_fatigue.indexes_over_limit]
 
-                # For tasks lower, find all possible consecutive paths greater than limit
-                consecutive_paths = utils.find_all_consecutive_paths(tasks_below_limit, limit)
+                # for any path that is equal to the limit, ensure that break before next task is >= limit
+                [self.fix(solver, worker_index, j, 0) for j in consecutive_fatigue.indexes_within_break_time]
+
+                if consecutive_fatigue.paths != None:
+                    # Add constraint so that all tasks in a path cannot be assigned to worker
+                    # (a path with a task fixed to 0 already can't be)
+                    for path in consecutive_fatigue.paths:
+                        if all(j in worker_assignments for j in path.path_tasks):
+                            solver.Add(solver.Sum(worker_assignments[j] for j in path.path_tasks) < len(path.path_tasks))
+                else:
+                    self.add_consecutive_time_window(solver, worker_index, limit, consecutive_fatigue.predecessors)
+
+    def add_consecutive_time_window(self, solver, worker_index, limit, predecessors):
+        """
+            Bound the time a worker works back to back without enumerating paths. consecutive_time[j] is
+            at least the length of the assigned run of back to back tasks ending at task j, and a run of
+            two or more tasks has to stay under the limit (a single task can last exactly the limit)
+        """
+        durations = self.task_table.duration
+        worker_assignments = self.assignments[worker_index]
+
+        # tasks fixed to 0 never start or extend a run
+        predecessors = {
+            j: [p for p in task_predecessors if p in worker_assignments]
+                for j, task_predecessors in predecessors.items() if j in worker_assignments
+        }
+
+        linked = set(j for j, task_predecessors in predecessors.items() if len(task_predecessors) > 0)
+        linked.update(p for task_predecessors in predecessors.values() for p in task_predecessors)
+
+        max_time = {j: max(limit - 1, durations[j]) for j in linked}
+        consecutive_time = {
+            j: solver.IntVar(0, max_time[j], f'consecutive time: worker {worker_index}, task {j}')
+                for j in sorted(linked)
+        }
+
+        for j in sorted(linked):
+            assigned = worker_assignments[j]
+            solver.Add(consecutive_time[j] >= durations[j] * assigned)
+
+            for p in predecessors[j]:
+                # only binds when j is assigned, if p is not consecutive_time[p] can stay 0
+                solver.Add(
+                    consecutive_time[j] >= consecutive_time[p] + durations[j] - (max_time[p] + durations[j]) * (1 - assigned)
+                )
 
-                # Add constraint so that all tasks in a path cannot be assigned to worker
-                for path in consecutive_paths:
-                    solver.Add(solver.Sum(self.assignments[worker_index][t.index] for t in path.path_tasks) < len(path.path_tasks))
+    def get_worker_classes(self, extra_constraints, hinted=set()):
+        """
+            Groups (of 2 or more) of interchangeable workers: the same costs for every task and the same
+            entries in every constraint map (and previous solution), so swapping their tasks gives a
+            solution of the same cost. Returns lists of worker indexes
+        """
+        entries = [[] for i in range(self.num_workers)]
+
+        for key in worker_constraint_keys:
+            if key in extra_constraints:
+                for worker in self.workers:
+                    if str(worker.id) in extra_constraints[key]:
+                        entries[worker.index].append((key, json.dumps(extra_constraints[key][str(worker.id)], sort_keys=True)))
+
+        # keyed by worker index, as in add_overall_total_fatigue_time
+        if 'overallTimeFatigueTotal' in extra_constraints:
+            for worker in self.workers:
+                if str(worker.index) in extra_constraints['overallTimeFatigueTotal']:
+                    entries[worker.index].append(
+                        ('overallTimeFatigueTotal', extra_constraints['overallTimeFatigueTotal'][str(worker.index)]['limit']))
+
+        if 'overallTimeFatigueConsecutive' in extra_constraints:
+            for limit_str, limit_info in extra_constraints['overallTimeFatigueConsecutive'].items():
+                for i in self.worker_indexes(limit_info['workers']):
+                    entries[i].append(('overallTimeFatigueConsecutive', limit_str))
+
+        for key in worker_group_constraint_keys:
+            if key in extra_constraints:
+                for group_index, group in enumerate(extra_constraints[key]):
+                    for i in set(self.worker_indexes(group['workers'])):
+                        entries[i].append((key, group_index))
+
+        for i, j in hinted:
+            entries[i].append(('solutionHint', j))
+
+        classes = {}
+        for i in range(self.num_workers):
+            signature = (tuple(self.assignment_costs[i]), tuple(sorted(entries[i])))
+            classes.setdefault(signature, []).append(i)
 
-                    # for any path that is equal to the limit, ensure that break before next task is >= limit
-                    if path.total_time == limit:
-                        tasks_start_within_break_time_limit = utils.get_tasks_within_break_time_limit(
-                            break_time,
-                            path,
-                            self.tasks
-                        )
+        return [worker_class for worker_class in classes.values() if len(worker_class) > 1]
 
-                        for task in tasks_start_within_break_time_limit:
-                            solver.Add(self.assignments[worker_index][task.index] == 0)
+    def add_symmetry_breaking(self, solver, worker_classes):
+        """
+            Interchangeable workers (see get_worker_classes) give the same solution in any order, so only
+            search one: each worker's first task is no later than the next worker's in its class
+        """
+        for worker_class in worker_classes:
+            for i, next_i in zip(worker_class, worker_class[1:]):
+                worker_assignments = self.assignments[i]
+                next_worker_assignments = self.assignments[next_i]
+
+                # started : worker i has a task at or before task j (variables overload ==, so compare with is)
+                started = None
+                for j in range(self.num_tasks):
+                    if j in worker_assignments:
+                        if started is None:
+                            started = worker_assignments[j]
+                        else:
+                            next_started = solver.IntVar(0, 1, f'started: worker {i}, task {j}')
+                            solver.Add(next_started >= started)
+                            solver.Add(next_started >= worker_assignments[j])
+                            solver.Add(next_started <= started + worker_assignments[j])
+                            started = next_started
+
+                    if j in next_worker_assignments:
+                        if started is None:
+                            self.fix(solver, next_i, j, 0)
+                        else:
+                            solver.Add(next_worker_assignments[j] <= started)
 
     def add_unavailability(self, solver, unavailability_map):
         """
@@ -187,10 +462,10 @@ class Constraints():
         for worker in self.workers:
             if str(worker.id) in unavailability_map:
                 range = utils.get_range(unavailability_map[str(worker.id)]['range'])
-                tasks_in_range = utils.get_tasks_in_range(self.tasks, range)
+                indexes_in_range = utils.get_task_indexes_in_range(self.task_table, range, self.timeline)
 
-                for task in tasks_in_range:
-                    solver.Add(self.assignments[worker.index][task.index] == 0)
+                for j in indexes_in_range:
+                    self.fix(solver, worker.index, j, 0)
 
     def add_buddy(self, solver, buddies):
         """
@@ -199,20 +474,23 @@ class Constraints():
         """
 
         for buddy_data in buddies:
-            worker_buddies_ids = buddy_data['workers']
-            worker_buddies = [utils.find_worker_by_id(worker_id, self.workers) for worker_id in worker_buddies_ids]
-            worker_buddy_indexes = [worker.index for worker in worker_buddies if worker != None]
+            worker_buddy_indexes = self.worker_indexes(buddy_data['workers'])
             num_of_workers = len(worker_buddy_indexes)
             tasks_to_buddy_on = buddy_data['tasks']
 
             if num_of_workers > 1:
-                for task in self.tasks:
-                    if task.task_id in tasks_to_buddy_on:
-                        for index, i in enumerate(worker_buddy_indexes):
-                            if index < num_of_workers - 1:
-                                solver.Add(
-                                    self.assignments[i][task.index] == self.assignments[worker_buddy_indexes[index + 1]][task.index]
-                                )
+                for j in self.task_indexes(tasks_to_buddy_on):
+                    for index, i in enumerate(worker_buddy_indexes):
+                        if index < num_of_workers - 1:
+                            buddy_index = worker_buddy_indexes[index + 1]
+
+                            # a buddy fixed to 0 for the task keeps the other off it too
+                            if j not in self.assignments[i]:
+                                self.fix(solver, buddy_index, j, 0)
+                            elif j not in self.assignments[buddy_index]:
+                                self.fix(solver, i, j, 0)
+                            else:
+                                solver.Add(self.assignments[i][j] == self.assignments[buddy_index][j])
 
     def add_nemesis(self, solver, nemesis):
         """
@@ -221,17 +499,14 @@ class Constraints():
         """
 
         for nemesis_data in nemesis:
-            worker_nemesis_ids = nemesis_data['workers']
-            worker_nemesis = [utils.find_worker_by_id(worker_id, self.workers) for worker_id in worker_nemesis_ids]
-            worker_nemesis_indexes = [worker.index for worker in worker_nemesis if worker != None]
+            worker_nemesis_indexes = self.worker_indexes(nemesis_data['workers'])
             tasks_to_nemesis_on = nemesis_data['tasks']
 
             num_of_workers = len(worker_nemesis_indexes)
 
             if num_of_workers > 1:
-                for task in self.tasks:
-                    if task.task_id in tasks_to_nemesis_on:
-                        solver.Add(
-                            solver.Sum(self.assignments[i][task.index] for i in worker_nemesis_indexes) <= 1
-                        )
+                for j in self.task_indexes(tasks_to_nemesis_on):
+                    solver.Add(
+                        solver.Sum(self.assignments[i][j] for i in worker_nemesis_indexes if j in self.assignments[i]) <= 1
+                    )
 
@@ -0,0 +1,262 @@
+import math
+import threading
+import time
+from collections import namedtuple
+from ortools.sat.python import cp_model
+
+import utils
+from skeletons import get_skeleton
+from model import (
+    measure_build,
+    get_solution,
+    get_solution_cost,
+    report_solution,
+    get_hinted_assignments,
+    get_hint_deviation,
+    get_presolve_stats,
+    get_cost_bound,
+    get_gap,
+)
+
+default_num_workers = 8
+
+Cpsat_build = namedtuple('Cpsat_build', [
+    'model',
+    'tasks',
+    'workers',
+    'fixed',
+    'assignment_costs',
+    'assignments',
+    'assignments_ref',
+    'hinted',
+    'worker_classes',
+    'task_table',
+    'skeleton',
+    'bound',
+])
+
+Skeleton_use = namedtuple('Skeleton_use', ['key', 'hit'])
+
+# seconds between checks of should_stop
+stop_poll_interval = 0.1
+
+class SolutionCallback(cp_model.CpSolverSolutionCallback):
+    """
+        Counts improving solutions, passing each on to on_solution(objective_value, solution_by_worker) if given
+    """
+    def __init__(self, on_solution, assignment_costs, assignments, assignments_ref):
+        super().__init__()
+        self.on_solution = on_solution
+        self.assignment_costs = assignment_costs
+        self.assignments = assignments
+        self.assignments_ref = assignments_ref
+        self.solutions = 0
+
+    def on_solution_callback(self):
+        self.solutions += 1
+
+        if self.on_solution == None:
+            return
+
+        report_solution(
+            self.on_solution,
+            self.assignment_costs,
+            self.assignments_ref,
+            lambda i, j: self.Value(self.assignments[i][j]) == 1
+        )
+
+def stop_search_when(cp_solver, should_stop, search_done):
+    while not search_done.wait(stop_poll_interval):
+        if should_stop():
+            cp_solver.StopSearch()
+            return
+
+def build_cpsat_model(data, build_stats=None):
+    """
+        Build the CP-SAT model of a request: decision variables, objective and every constraint,
+        with any solutionHint as hints. Shared by the cpsat and lns engines.
+        The variables and constraints come from a copy of the request's skeleton (see skeletons.Skeleton),
+        only the objective, hints and symmetry breaking are built for each solve
+    """
+    cost_matrix = data['costMatrix']
+    extra_constraints = data['constraints'] if 'constraints' in data else {}
+    solution_hint = data['solutionHint'] if 'solutionHint' in data else None
+    hint_penalty = data['hintPenalty'] if 'hintPenalty' in data else 0
+    # CP-SAT finds and breaks symmetries in its own presolve, ordering interchangeable workers on top only slows it
+    symmetry_breaking = data['symmetryBreaking'] if 'symmetryBreaking' in data else False
+
+    skeleton, skeleton_key, _ = get_skeleton(data, build_stats)
+    tasks = skeleton.tasks
+    workers = skeleton.workers
+    fixed = skeleton.fixed
+
+    # declare decision variables (and every constraint on them) with a reference matrix
+    model, assignments, assignments_ref, skeleton_hit = skeleton.get_cpsat_model(build_stats)
+
+    # cost of every worker/task by index, whichever format costMatrix came in
+    assignment_costs = measure_build(
+        build_stats,
+        'get_cost_rows',
+        model,
+        lambda m: utils.get_cost_rows(cost_matrix, workers, tasks)
+    )
+
+    constraints = skeleton.get_constraints()
+    constraints.set_assignments(assignment_costs, assignments, assignments_ref)
+
+    # previous solution to start the search from
+    hinted = get_hinted_assignments(solution_hint, workers, tasks)
+
+    # objective
+    cost = model.Sum(
+        assignment_costs[i][j] * assignment
+            for i, worker_assignments in enumerate(assignments)
+                for j, assignment in worker_assignments.items()
+    )
+
+    # optionally penalise every change from the previous solution
+    if len(hinted) > 0 and hint_penalty > 0:
+        cost = cost + hint_penalty * get_hint_deviation(model, assignments, hinted)
+
+    model.Minimize(cost)
+
+    # only search one order of interchangeable workers
+    worker_classes = constraints.get_worker_classes(extra_constraints, hinted) if symmetry_breaking else []
+    measure_build(build_stats, 'add_symmetry_breaking', model, lambda m: constraints.add_symmetry_breaking(m, worker_classes))
+
+    # Hint every variable with the previous solution, letting CP-SAT repair the parts that no longer fit
+    if len(hinted) > 0:
+        for i, worker_assignments in enumerate(assignments):
+            for j, assignment in worker_assignments.items():
+                model.AddHint(assignment, 1 if (i, j) in hinted else 0)
+
+    return Cpsat_build(
+        model,
+        tasks,
+        workers,
+        fixed,
+        assignment_costs,
+        assignments,
+        assignments_ref,
+        hinted,
+        worker_classes,
+        constraints.task_table,
+        Skeleton_use(skeleton_key, skeleton_hit),
+        # every task filled by its cheapest workers
+        get_cost_bound(assignment_costs, assignments, tasks, fixed),
+    )
+
+def get_build_stats(build_stats, built):
+    """Build, presolve and symmetry stats of a built model (see solver.solver stats)"""
+    return {
+        "build": build_stats,
+        "buildMs": sum(family['ms'] for family in build_stats),
+        "presolve": get_presolve_stats(built.fixed, built.assignments),
+        "symmetry": {
+            "classes": len(built.worker_classes),
+            "workers": sum(len(worker_class) for worker_class in built.worker_classes),
+        },
+        "skeleton": {
+            "key": built.skeleton.key,
+            "hit": built.skeleton.hit,
+        },
+    }
+
+def cpsat_solver(data, on_solution=None, should_stop=None, stats=None):
+    """
+        Solve the allocation on the CP-SAT engine, minimising total cost with numWorkers search workers.
+        Returns the same response shape as solver.solver, on_solution/should_stop/stats work as they do there.
+    """
+    time_limit = data['timeLimit'] if 'timeLimit' in data else None
+    num_workers = data['numWorkers'] if 'numWorkers' in data else default_num_workers
+    hint_penalty = data['hintPenalty'] if 'hintPenalty' in data else 0
+    relative_gap = data['relativeGap'] if 'relativeGap' in data else None
+    absolute_gap = data['absoluteGap'] if 'absoluteGap' in data else None
+
+    build_stats = [] if stats != None else None
+
+    built = build_cpsat_model(data, build_stats)
+    model = built.model
+    assignment_costs = built.assignment_costs
+    assignments = built.assignments
+    assignments_ref = built.assignments_ref
+
+    cp_solver = cp_model.CpSolver()
+    cp_solver.parameters.num_workers = num_workers
+    cp_solver.parameters.repair_hint = len(built.hinted) > 0
+
+    # Set time limit if given
+    if time_limit != None:
+        print('time_limit', time_limit)
+        cp_solver.parameters.max_time_in_seconds = time_limit * 60
+
+    # stop once the best solution is close enough to CP-SAT's own bound
+    if relative_gap != None:
+        cp_solver.parameters.relative_gap_limit = relative_gap
+    if absolute_gap != None:
+        cp_solver.parameters.absolute_gap_limit = absolute_gap
+
+    callback = None
+    if on_solution != None or stats != None:
+        callback = SolutionCallback(on_solution, assignment_costs, assignments, assignments_ref)
+
+    search_done = threading.Event()
+    if should_stop != None:
+        threading.Thread(target=stop_search_when, args=(cp_solver, should_stop, search_done), daemon=True).start()
+
+    result = cp_solver.Solve(model, callback)
+    search_done.set()
+    status = result in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+    print("Time:", cp_solver.WallTime() * 1000, "ms")
+    print('status', cp_solver.StatusName(result))
+
+    if stats != None:
+        stats.update(get_build_stats(build_stats, built))
+        stats['search'] = {
+            "engine": "cpsat",
+            "branches": cp_solver.NumBranches(),
+            "failures": cp_solver.NumConflicts(),
+            "solutions": callback.solutions,
+            "restarts": cp_solver.ResponseProto().num_restarts,
+            "wallTimeMs": cp_solver.WallTime() * 1000,
+        }
+
+    # If solution found, collect all assignments
+    if status:
+        solution_by_task, solution_by_worker = get_solution(
+            assignments_ref,
+            lambda i, j: cp_solver.Value(assignments[i][j]) == 1
+        )
+
+        # objective includes any hint penalty, report the cost alone
+        objective_value = get_solution_cost(
+            assignment_costs,
+            assignments_ref,
+            lambda i, j: cp_solver.Value(assignments[i][j]) == 1
+        )
+
+        # CP-SAT's bound is on the cost alone unless a hint penalty is in the objective
+        bound = built.bound
+        if len(built.hinted) == 0 or hint_penalty == 0:
+            bound = max(bound, math.ceil(cp_solver.BestObjectiveBound()))
+
+        return {
+            "status": status,
+            "solutionByTask": solution_by_task,
+            "solutionByWorker": solution_by_worker,
+            "objectiveValue": objective_value,
+            "bound": bound,
+            "gap": get_gap(objective_value, bound),
+            "engine": "cpsat",
+        }
+
+    return {
+        "status": status,
+        "solutionByTask": None,
+        "solutionByWorker": None,
+        "objectiveValue": None,
+        "bound": None,
+        "gap": None,
+        "engine": "cpsat",
+    }
@@ -0,0 +1,137 @@
+import unittest
+import utils
+from constraints import Constraints
+from solver import solver, get_data
+from benchmark.generate import generate_roster, encode_cost_matrix
+
+def get_test_data(solver_option):
+    data = get_data('./data.json')
+    data['solverOption'] = solver_option
+    # data.json still has buddy/nemesis in their old shape
+    del data['constraints']['buddy']
+    del data['constraints']['nemesis']
+
+    return data
+
+class TestCpSatSolver(unittest.TestCase):
+    def test_cpsat_solution_shape(self):
+        data = get_test_data('cpsat')
+        data['numWorkers'] = 2
+
+        solution = solver(data)
+
+        self.assertTrue(solution['status'])
+        self.assertSetEqual(set(solution.keys()), set(['status', 'solutionByTask', 'solutionByWorker', 'objectiveValue', 'bound', 'gap', 'engine']))
+
+        # every scheduled task is filled to its qty
+        for scheduled_task in data['scheduledTasks']:
+            self.assertEqual(len(solution['solutionByTask'][scheduled_task['id']]), scheduled_task['task']['qty'])
+
+    def test_cpsat_no_worse_than_first_solution(self):
+        first_solution = solver(get_test_data('noOptimisation'))
+        cpsat_solution = solver(get_test_data('cpsat'))
+
+        self.assertLessEqual(cpsat_solution['objectiveValue'], first_solution['objectiveValue'])
+
+    def test_cpsat_hint_keeps_unchanged_assignments(self):
+        data = get_test_data('cpsat')
+        previous_solution = solver(data)
+
+        # worker 3 becomes unavailable for the whole day
+        data['constraints']['unavailable']['3'] = {
+            'range': { 'startTime': { 'hour': 0, 'min': 0 }, 'endTime': { 'hour': 23, 'min': 0 } }
+        }
+        data['solutionHint'] = previous_solution['solutionByWorker']
+        data['hintPenalty'] = 1000
+
+        solution = solver(data)
+
+        self.assertTrue(solution['status'])
+        self.assertNotIn(3, solution['solutionByWorker'])
+        # only worker 3's tasks move to someone else
+        for worker_id, task_ids in previous_solution['solutionByWorker'].items():
+            if worker_id != 3:
+                self.assertTrue(set(task_ids) <= set(solution['solutionByWorker'][worker_id]))
+
+    def test_presolve_leaves_out_fixed_pairs(self):
+        data = get_test_data('cpsat')
+        whole_day = { 'range': { 'startTime': { 'hour': 0, 'min': 0 }, 'endTime': { 'hour': 23, 'min': 0 } } }
+        data['constraints']['unavailable']['3'] = whole_day
+        data['constraints']['mustWork'] = { '5': [str(data['scheduledTasks'][0]['task']['id'])] }
+        stats = {}
+
+        solution = solver(data, stats=stats)
+
+        num_pairs = len(data['workers']) * len(data['scheduledTasks'])
+        self.assertTrue(solution['status'])
+        self.assertGreaterEqual(stats['presolve']['fixedZero'], len(data['scheduledTasks']))
+        self.assertGreater(stats['presolve']['fixedOne'], 0)
+        self.assertEqual(stats['presolve']['variables'], num_pairs - stats['presolve']['fixedZero'])
+        self.assertNotIn(3, solution['solutionByWorker'])
+        self.assertIn(data['scheduledTasks'][0]['id'], solution['solutionByWorker'][5])
+
+        # a must work the worker is unavailable for is still infeasible
+        data['constraints']['mustWork'] = { '3': [str(data['scheduledTasks'][0]['task']['id'])] }
+
+        self.assertFalse(solver(data)['status'])
+
+    def test_symmetry_breaking_keeps_optimum(self):
+        data = generate_roster(12, 15, constraint_mix={ 'unavailable': 0.25 }, solver_option='cpsat', worker_types=3)
+
+        tasks = utils.get_tasks(data['scheduledTasks'])
+        constraints = Constraints(tasks, utils.get_workers(data['workers']))
+        constraints.set_assignments([[data['costMatrix'][str(w['id'])][t.id] for t in tasks] for w in data['workers']], [], [])
+        worker_classes = constraints.get_worker_classes(data['constraints'])
+
+        # workers of a type are interchangeable unless a constraint tells them apart
+        unavailable = set(int(worker_id) for worker_id in data['constraints']['unavailable'])
+        for worker_class in worker_classes:
+            self.assertEqual(len(set(i % 3 for i in worker_class)), 1)
+            self.assertTrue(len(unavailable & set(worker_class)) in [0, len(worker_class)])
+        self.assertGreater(len(worker_classes), 0)
+
+        stats = {}
+        solution = solver({ **data, 'symmetryBreaking': True }, stats=stats)
+
+        self.assertEqual(stats['symmetry']['classes'], len(worker_classes))
+        self.assertEqual(solution['objectiveValue'], solver(data)['objectiveValue'])
+
+    def test_dense_cost_matrix_formats(self):
+        data = get_test_data('cpsat')
+        objective_value = solver(data)['objectiveValue']
+        first_objective_value = solver(get_test_data('noOptimisation'))['objectiveValue']
+
+        for cost_format in ['dense', 'base64', 'npy']:
+            cost_matrix = encode_cost_matrix(data, cost_format)
+
+            self.assertEqual(solver({ **data, 'costMatrix': cost_matrix })['objectiveValue'], objective_value)
+            self.assertEqual(
+                solver({ **get_test_data('noOptimisation'), 'costMatrix': cost_matrix })['objectiveValue'],
+                first_objective_value
+            )
+
+        with self.assertRaises(ValueError):
+            solver({ **data, 'costMatrix': encode_cost_matrix(data, 'dense')[1:] })
+
+    def test_bound_and_gap(self):
+        data = { **generate_roster(20, 30, solver_option='cpsat', seed=1), 'decompose': False }
+
+        # proven optimal
+        solution = solver(data)
+        self.assertEqual(solution['bound'], solution['objectiveValue'])
+        self.assertEqual(solution['gap'], 0)
+
+        first_solution = solver({ **data, 'solverOption': 'noOptimisation' })
+        self.assertLessEqual(first_solution['bound'], solution['objectiveValue'])
+        self.assertGreater(first_solution['gap'], 0)
+
+        # any solution is within a 100% gap, so the search stops at the first
+        stats = {}
+        gap_solution = solver({ **data, 'solverOption': 'optimal', 'relativeGap': 1 }, stats=stats)
+        self.assertTrue(gap_solution['status'])
+        self.assertEqual(stats['search']['solutions'], 1)
+        self.assertLessEqual(gap_solution['gap'], 1)
+        self.assertLessEqual(gap_solution['bound'], solution['objectiveValue'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,296 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import utils
+from constraints import Constraints, worker_group_constraint_keys
+from model import get_gap
+
+# constraint maps presolve can fix pairs to 0 from cheaply (consecutive fatigue paths are left to each component)
+component_constraint_keys = ['mustWork', 'cannotWork', 'unavailable']
+
+# requests with fewer scheduled tasks are solved whole unless decompose is set, they solve in less time
+# than handing components to other processes takes
+min_decompose_tasks = 100
+
+# pool of a process per cpu components are solved in, started once and kept for every later request
+pool = None
+pool_lock = threading.Lock()
+
+def is_pool_process():
+    """Whether this is a pool process (of a decomposed solve, a portfolio or a batch) rather than the api's"""
+    return multiprocessing.parent_process() != None
+
+def should_decompose(data):
+    """
+        Whether to look for components: decompose if given, otherwise only for requests of min_decompose_tasks
+        or more. Never in a pool process, its request is already one of many solved side by side
+    """
+    if is_pool_process():
+        return False
+
+    return data['decompose'] if 'decompose' in data else len(data['scheduledTasks']) >= min_decompose_tasks
+
+def get_pool():
+    """The pool shared by every decomposed request, started on first use"""
+    global pool
+
+    with pool_lock:
+        if pool == None:
+            pool = ProcessPoolExecutor(os.cpu_count())
+
+        return pool
+
+def shutdown_pool():
+    with pool_lock:
+        if pool != None:
+            pool.shutdown(cancel_futures=True)
+
+atexit.register(shutdown_pool)
+
+def find(parents, node):
+    while parents[node] != node:
+        parents[node] = parents[parents[node]]
+        node = parents[node]
+
+    return node
+
+def union(parents, node, other_node):
+    parents[find(parents, node)] = find(parents, other_node)
+
+def get_components(tasks, workers, extra_constraints):
+    """
+        Groups of workers and scheduled tasks that never interact: a worker and a task are linked if the
+        worker could be assigned the task (presolve doesn't fix them to 0), workers of a combinedMustWork,
+        buddy or nemesis group are linked with each other, and with the tasks of combinedMustWork and
+        atLeastWork entries. Fatigue totals only add up tasks a worker could be assigned, so stay within
+        its component, but consecutive fatigue rules tasks out from the runs of back to back tasks across
+        the whole day: with any worker given a consecutive limit every task is linked.
+        Returns (worker_indexes, task_indexes)[], in worker order
+    """
+    constraints = Constraints(tasks, workers)
+    fixed = constraints.presolve({
+        key: extra_constraints[key] for key in component_constraint_keys if key in extra_constraints
+    })
+
+    # workers are nodes 0 .. num_workers - 1, tasks the nodes after
+    num_workers = len(workers)
+    num_tasks = len(tasks)
+    parents = list(range(num_workers + num_tasks))
+
+    fixed_zero_by_worker = {}
+    for (i, j), value in fixed.items():
+        if value == 0:
+            fixed_zero_by_worker.setdefault(i, set()).add(j)
+
+    # once a worker can do every task, all tasks are linked and any other worker only needs linking to one
+    tasks_linked = False
+    for i in sorted(range(num_workers), key=lambda i: len(fixed_zero_by_worker.get(i, []))):
+        fixed_zero = fixed_zero_by_worker.get(i, set())
+        for j in range(num_tasks):
+            if j not in fixed_zero:
+                union(parents, i, num_workers + j)
+                if tasks_linked:
+                    break
+
+        tasks_linked = tasks_linked or len(fixed_zero) == 0
+
+    consecutive_map = extra_constraints['overallTimeFatigueConsecutive'] if 'overallTimeFatigueConsecutive' in extra_constraints else {}
+    if any(len(constraints.worker_indexes(limit_info['workers'])) > 0 for limit_info in consecutive_map.values()):
+        for j in range(1, num_tasks):
+            union(parents, num_workers + j, num_workers)
+
+    for key in worker_group_constraint_keys:
+        if key in extra_constraints:
+            for group in extra_constraints[key]:
+                worker_indexes = constraints.worker_indexes(group['workers'])
+                for i in worker_indexes[1:]:
+                    union(parents, i, worker_indexes[0])
+
+                if key == 'combinedMustWork' and len(worker_indexes) > 0:
+                    for j in constraints.task_indexes(group['tasks']):
+                        union(parents, num_workers + j, worker_indexes[0])
+
+    if 'atLeastWork' in extra_constraints:
+        for worker_id, task_ids in extra_constraints['atLeastWork'].items():
+            for i in constraints.worker_indexes([worker_id]):
+                for j in range(num_tasks):
+                    if str(tasks[j].task_id) in task_ids:
+                        union(parents, num_workers + j, i)
+
+    components = {}
+    for node in range(len(parents)):
+        worker_indexes, task_indexes = components.setdefault(find(parents, node), ([], []))
+        if node < num_workers:
+            worker_indexes.append(node)
+        else:
+            task_indexes.append(node - num_workers)
+
+    return sorted(components.values(), key=lambda component: (component[0][:1], component[1][:1]))
+
+def get_component_request(data, tasks, workers, component):
+    """
+        The request for just the workers and scheduled tasks of a component, solved without decomposing again
+    """
+    worker_indexes, task_indexes = component
+    extra_constraints = data['constraints'] if 'constraints' in data else {}
+    cost_matrix = data['costMatrix']
+
+    component_constraints = { **extra_constraints }
+
+    # keyed by worker index, which changes in the component
+    if 'overallTimeFatigueTotal' in extra_constraints:
+        component_constraints['overallTimeFatigueTotal'] = {
+            str(component_index): extra_constraints['overallTimeFatigueTotal'][str(i)]
+                for component_index, i in enumerate(worker_indexes)
+                    if str(i) in extra_constraints['overallTimeFatigueTotal']
+        }
+
+    component_data = {
+        **data,
+        "workers": [data['workers'][i] for i in worker_indexes],
+        "scheduledTasks": [data['scheduledTasks'][j] for j in task_indexes],
+        "costMatrix": get_component_cost_matrix(cost_matrix, tasks, workers, component),
+        "constraints": component_constraints,
+        "decompose": False,
+        # already checked as a whole
+        "precheck": False,
+    }
+
+    if 'solutionHint' in data and data['solutionHint'] != None:
+        task_ids = set(tasks[j].id for j in task_indexes)
+        component_data['solutionHint'] = {
+            worker_id: [task_id for task_id in task_ids_hinted if task_id in task_ids]
+                for worker_id, task_ids_hinted in data['solutionHint'].items()
+        }
+
+    return component_data
+
+def get_component_cost_matrix(cost_matrix, tasks, workers, component):
+    """The component's costs, in the format they came in (a dense matrix as rows of the component)"""
+    worker_indexes, task_indexes = component
+
+    if not utils.is_dense_cost_matrix(cost_matrix):
+        return { str(workers[i].id): cost_matrix[str(workers[i].id)] for i in worker_indexes }
+
+    cost_rows = utils.get_cost_rows(cost_matrix, workers, tasks)
+
+    return [[cost_rows[i][j] for j in task_indexes] for i in worker_indexes]
+
+def solve_component(data, with_stats):
+    """Solve one component in a pool process"""
+    # solver decomposes requests, so only import it once running
+    from solver import solver
+
+    stats = {} if with_stats else None
+
+    return (solver(data, stats=stats), stats)
+
+def merge_stats(component_stats):
+    """
+        Stats of the whole request from each component's: build families one after another, counts summed
+        and the search wall time of the slowest component (they run side by side)
+    """
+    searches = [stats['search'] for stats in component_stats]
+
+    return {
+        "build": [family for stats in component_stats for family in stats['build']],
+        "buildMs": sum(stats['buildMs'] for stats in component_stats),
+        "presolve": {
+            key: sum(stats['presolve'][key] for stats in component_stats) for key in component_stats[0]['presolve']
+        },
+        "symmetry": {
+            key: sum(stats['symmetry'][key] for stats in component_stats) for key in component_stats[0]['symmetry']
+        },
+        "search": {
+            "engine": ','.join(sorted(set(search['engine'] for search in searches))),
+            **{
+                key: sum(search[key] for search in searches)
+                    for key in ['branches', 'failures', 'solutions', 'restarts']
+            },
+            "wallTimeMs": max(search['wallTimeMs'] for search in searches),
+        },
+        "components": len(component_stats),
+    }
+
+def merge_solutions(solutions):
+    """
+        One response from the responses of every component, solved only if every component is.
+        engine lists every engine that ran (components can fit different ones), strategy every winning
+        portfolio strategy
+    """
+    engine = ','.join(sorted(set(solution['engine'] for solution in solutions)))
+    strategies = sorted(set(solution['strategy'] for solution in solutions if 'strategy' in solution))
+    portfolio = { "strategy": ','.join(strategies) } if len(strategies) > 0 else {}
+
+    if not all(solution['status'] for solution in solutions):
+        return {
+            "status": False,
+            "solutionByTask": None,
+            "solutionByWorker": None,
+            "objectiveValue": None,
+            "bound": None,
+            "gap": None,
+            "engine": engine,
+            **portfolio,
+        }
+
+    objective_value = sum(solution['objectiveValue'] for solution in solutions)
+    bound = sum(solution['bound'] for solution in solutions)
+
+    return {
+        "status": True,
+        "solutionByTask": { task_id: worker_ids for solution in solutions for task_id, worker_ids in solution['solutionByTask'].items() },
+        "solutionByWorker": { worker_id: task_ids for solution in solutions for worker_id, task_ids in solution['solutionByWorker'].items() },
+        "objectiveValue": objective_value,
+        "bound": bound,
+        "gap": get_gap(objective_value, bound),
+        "engine": engine,
+        **portfolio,
+    }
+
+def solve_components(pool, component_requests, with_stats, num_processes):
+    """solve_component results in the order of component_requests, no more than num_processes in pool at once"""
+    results = [None] * len(component_requests)
+    waiting = list(enumerate(component_requests))
+    running = {}
+
+    while len(waiting) > 0 or len(running) > 0:
+        while len(waiting) > 0 and len(running) < num_processes:
+            k, component_data = waiting.pop(0)
+            running[pool.submit(solve_component, component_data, with_stats)] = k
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[running.pop(future)] = future.result()
+
+    return results
+
+def decomposed_solve(data, components, stats=None):
+    """
+        Solve every component in its own process and merge the results. The pool is shared with every
+        decomposed request, numProcesses (at most the number of cpus) only limits how many of this
+        request's components are solved at once
+    """
+    tasks = utils.get_tasks(data['scheduledTasks'])
+    workers = utils.get_workers(data['workers'])
+    num_processes = data['numProcesses'] if 'numProcesses' in data else os.cpu_count()
+    num_processes = max(1, min(num_processes, os.cpu_count()))
+
+    component_requests = [get_component_request(data, tasks, workers, component) for component in components]
+
+    # gaps of the components add up, so each gets its share of an absolute gap (a relative gap holds as is)
+    if 'absoluteGap' in data and data['absoluteGap'] != None:
+        for component_data in component_requests:
+            component_data['absoluteGap'] = data['absoluteGap'] / len(components)
+
+    results = solve_components(get_pool(), component_requests, stats != None, num_processes)
+
+    if stats != None:
+        stats.update(merge_stats([component_stats for _, component_stats in results]))
+        # pairs across components never got a variable either
+        stats['presolve']['fixedZero'] = len(workers) * len(tasks) - stats['presolve']['variables']
+
+    return merge_solutions([solution for solution, _ in results])
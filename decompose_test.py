@@ -0,0 +1,109 @@
+import unittest
+import utils
+from decompose import get_components, get_component_request, get_pool
+from solver import solver
+from benchmark.generate import generate_roster
+
+def two_sites(solver_option):
+    """Two rosters side by side, workers of each site can't work the other site's tasks, decomposed"""
+    site_a = generate_roster(8, 10, constraint_mix={}, solver_option=solver_option, seed=1)
+    site_b = generate_roster(8, 10, constraint_mix={}, solver_option=solver_option, seed=3)
+
+    for worker in site_b['workers']:
+        worker['id'] += 8
+    for scheduled_task in site_b['scheduledTasks']:
+        scheduled_task['id'] = 'b-' + scheduled_task['id']
+        scheduled_task['task']['id'] += 100
+
+    site_b_costs = {
+        str(int(worker_id) + 8): { 'b-' + task_id: cost for task_id, cost in costs.items() }
+            for worker_id, costs in site_b['costMatrix'].items()
+    }
+
+    def cannot_work(site):
+        return [str(task_id) for task_id in set(t['task']['id'] for t in site['scheduledTasks'])]
+
+    return {
+        "workers": site_a['workers'] + site_b['workers'],
+        "scheduledTasks": site_a['scheduledTasks'] + site_b['scheduledTasks'],
+        "costMatrix": {
+            **{ worker_id: { **costs, **{ task_id: 0 for task_id in site_b_costs['8'] } } for worker_id, costs in site_a['costMatrix'].items() },
+            **{ worker_id: { **costs, **{ task_id: 0 for task_id in site_a['costMatrix']['0'] } } for worker_id, costs in site_b_costs.items() },
+        },
+        "solverOption": solver_option,
+        "timeLimit": None,
+        "decompose": True,
+        "constraints": {
+            "cannotWork": {
+                **{ str(w['id']): cannot_work(site_b) for w in site_a['workers'] },
+                **{ str(w['id']): cannot_work(site_a) for w in site_b['workers'] },
+            },
+            "overallTimeFatigueTotal": { '9': { 'limit': 240 } },
+        },
+    }
+
+class TestDecompose(unittest.TestCase):
+    def test_components_split_sites(self):
+        data = two_sites('cpsat')
+        tasks = utils.get_tasks(data['scheduledTasks'])
+        workers = utils.get_workers(data['workers'])
+
+        components = get_components(tasks, workers, data['constraints'])
+
+        self.assertListEqual(components, [(list(range(8)), list(range(10))), (list(range(8, 16)), list(range(10, 20)))])
+
+        # a nemesis pair across the sites joins them
+        joined = get_components(tasks, workers, { **data['constraints'], 'nemesis': [{ 'workers': [0, 8], 'tasks': [] }] })
+        self.assertEqual(len(joined), 1)
+
+        # worker index 9 is index 1 of the second site
+        component_data = get_component_request(data, tasks, workers, components[1])
+        self.assertDictEqual(component_data['constraints']['overallTimeFatigueTotal'], { '1': { 'limit': 240 } })
+        self.assertEqual(len(component_data['costMatrix']), 8)
+
+    def test_decomposed_solve_matches_whole_solve(self):
+        data = two_sites('cpsat')
+        stats = {}
+
+        solution = solver(data, stats=stats)
+        whole_solution = solver({ **data, 'decompose': False })
+
+        self.assertEqual(stats['components'], 2)
+        self.assertTrue(solution['status'])
+        self.assertEqual(solution['objectiveValue'], whole_solution['objectiveValue'])
+        self.assertEqual(len(solution['solutionByTask']), 20)
+        self.assertEqual(stats['presolve']['fixedZero'] + stats['presolve']['variables'], 16 * 20)
+
+        # small requests are solved whole unless asked, reusing the pool when they are
+        stats = {}
+        solver({ key: value for key, value in data.items() if key != 'decompose' }, stats=stats)
+        self.assertNotIn('components', stats)
+
+        pool = get_pool()
+        one_at_a_time = solver({ **data, 'numProcesses': 1 })
+        self.assertIs(get_pool(), pool)
+        self.assertEqual(one_at_a_time['objectiveValue'], solution['objectiveValue'])
+
+    def test_fatigue_decomposed_matches_whole_solve(self):
+        data = two_sites('cpsat')
+        first_site_task_ids = set(t['task']['id'] for t in data['scheduledTasks'][:10])
+        consecutive_workers = [w['id'] for w in data['workers'] if w['id'] % 3 == 0]
+
+        for extra_constraints in [
+            { 'timeFatigueTotal': { '2': [{ 'limit': 60, 'tasks': sorted(first_site_task_ids) }], '10': [{ 'limit': 90, 'tasks': [100, 101] }] } },
+            { 'overallTimeFatigueConsecutive': { '60': { 'breakTime': 15, 'workers': consecutive_workers } } },
+        ]:
+            request = { **data, 'constraints': { **data['constraints'], **extra_constraints } }
+            stats = {}
+
+            solution = solver(request, stats=stats)
+            whole_solution = solver({ **request, 'decompose': False })
+
+            self.assertEqual(solution['status'], whole_solution['status'])
+            self.assertEqual(solution['objectiveValue'], whole_solution['objectiveValue'])
+
+        # break windows after a run of one site's tasks rule out the other site's tasks too
+        self.assertNotIn('components', stats)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import time
+from ortools.graph.python import min_cost_flow
+
+import utils
+from skeletons import get_skeleton
+from model import AssignmentPairs, get_solution, get_solution_cost, get_hinted_assignments, get_cost_bound, get_gap
+
+# constraints that only fix worker/task pairs, which the flow network can leave out or assign up front
+flow_constraint_keys = ['mustWork', 'cannotWork', 'unavailable']
+
+def get_time_blocks(task_table):
+    """
+        Block of each task when tasks that overlap all overlap each other (e.g. shifts starting and ending
+        together), so a worker's one task at a time is one task per block. None if any tasks only partly overlap
+    """
+    num_tasks = len(task_table.start)
+    blocks = [None] * num_tasks
+
+    for block, task_indexes in enumerate(utils.group_task_indexes_by_time_overlap(task_table)):
+        for j in task_indexes:
+            if blocks[j] != None:
+                return None
+            blocks[j] = block
+
+    # tasks that overlap nothing are a block of their own
+    next_block = len(blocks)
+    for j in range(num_tasks):
+        if blocks[j] == None:
+            blocks[j] = next_block
+            next_block += 1
+
+    return blocks
+
+def fits_flow(extra_constraints):
+    """Whether every constraint given only fixes worker/task pairs"""
+    return all(key in flow_constraint_keys or len(value) == 0 for key, value in extra_constraints.items())
+
+def flow_solver(data, on_solution=None, stats=None):
+    """
+        Solve a request with only qty, one task at a time and must/cannot/unavailable constraints as a
+        min cost flow: each task sends its qty to workers, through a worker/time block node that can take one task.
+        Proven optimal in one pass. Returns None if the request doesn't fit the network (see get_time_blocks)
+    """
+    extra_constraints = data['constraints'] if 'constraints' in data else {}
+    if not fits_flow(extra_constraints):
+        return None
+
+    start = time.perf_counter()
+
+    skeleton, _, _ = get_skeleton(data)
+    tasks = skeleton.tasks
+    workers = skeleton.workers
+    constraints = skeleton.constraints
+
+    blocks = get_time_blocks(constraints.task_table)
+    if blocks == None:
+        return None
+
+    assignment_costs = utils.get_cost_rows(data['costMatrix'], workers, tasks)
+    fixed = skeleton.fixed
+
+    solution_hint = data['solutionHint'] if 'solutionHint' in data else None
+    hint_penalty = data['hintPenalty'] if 'hintPenalty' in data else 0
+    hinted = get_hinted_assignments(solution_hint, workers, tasks) if hint_penalty > 0 else set()
+
+    # must work pairs are assigned up front, the network fills the rest of each task's qty
+    assigned = set(pair for pair, value in fixed.items() if value == 1)
+    remaining_qty = [task.qty for task in tasks]
+    used_blocks = set()
+    feasible = len(constraints.conflicts) == 0
+    for i, j in assigned:
+        remaining_qty[j] -= 1
+        feasible = feasible and remaining_qty[j] >= 0 and (i, blocks[j]) not in used_blocks
+        used_blocks.add((i, blocks[j]))
+
+    # nodes: source, tasks, worker/blocks, sink
+    flow = min_cost_flow.SimpleMinCostFlow()
+    source = 0
+    sink = 1
+    task_node = lambda j: 2 + j
+    worker_block_nodes = {}
+    task_arcs = []
+
+    for j in range(len(tasks)):
+        if remaining_qty[j] > 0:
+            flow.add_arc_with_capacity_and_unit_cost(source, task_node(j), remaining_qty[j], 0)
+
+    for i in range(len(workers)):
+        for j in range(len(tasks)):
+            if remaining_qty[j] <= 0 or (i, j) in fixed or (i, blocks[j]) in used_blocks:
+                continue
+
+            worker_block = (i, blocks[j])
+            if worker_block not in worker_block_nodes:
+                worker_block_nodes[worker_block] = 2 + len(tasks) + len(worker_block_nodes)
+                flow.add_arc_with_capacity_and_unit_cost(worker_block_nodes[worker_block], sink, 1, 0)
+
+            # a hint penalty costs every change from the previous solution
+            cost = assignment_costs[i][j]
+            if (i, j) in hinted:
+                cost -= hint_penalty
+            elif len(hinted) > 0:
+                cost += hint_penalty
+
+            task_arcs.append((flow.add_arc_with_capacity_and_unit_cost(task_node(j), worker_block_nodes[worker_block], 1, cost), i, j))
+
+    total_qty = sum(qty for qty in remaining_qty if qty > 0)
+    flow.set_node_supply(source, total_qty)
+    flow.set_node_supply(sink, -total_qty)
+
+    status = feasible and flow.solve() == flow.OPTIMAL
+
+    if stats != None:
+        wall_time_ms = (time.perf_counter() - start) * 1000
+        stats['build'] = []
+        stats['buildMs'] = 0
+        stats['presolve'] = {
+            "fixedZero": sum(1 for value in fixed.values() if value == 0),
+            "fixedOne": len(assigned),
+            "variables": len(task_arcs),
+        }
+        stats['symmetry'] = { "classes": 0, "workers": 0 }
+        stats['search'] = {
+            "engine": "flow",
+            "branches": 0,
+            "failures": 0,
+            "solutions": 1 if status else 0,
+            "restarts": 0,
+            "wallTimeMs": wall_time_ms,
+        }
+
+    if not status:
+        return {
+            "status": status,
+            "solutionByTask": None,
+            "solutionByWorker": None,
+            "objectiveValue": None,
+            "bound": None,
+            "gap": None,
+            "engine": "flow",
+        }
+
+    assigned.update((i, j) for arc, i, j in task_arcs if flow.flow(arc) > 0)
+
+    assignments_ref = AssignmentPairs(workers, tasks, sorted(assigned))
+    is_assigned = lambda i, j: True
+
+    solution_by_task, solution_by_worker = get_solution(assignments_ref, is_assigned)
+    objective_value = get_solution_cost(assignment_costs, assignments_ref, is_assigned)
+
+    # the flow is optimal, for the cost alone unless a hint penalty is in the arc costs
+    bound = objective_value
+    if len(hinted) > 0:
+        bound = get_cost_bound(
+            assignment_costs,
+            [{ j: None for j in range(len(tasks)) if fixed.get((i, j)) != 0 } for i in range(len(workers))],
+            tasks,
+            fixed
+        )
+
+    if on_solution != None:
+        on_solution(objective_value, solution_by_worker)
+
+    return {
+        "status": status,
+        "solutionByTask": solution_by_task,
+        "solutionByWorker": solution_by_worker,
+        "objectiveValue": objective_value,
+        "bound": bound,
+        "gap": get_gap(objective_value, bound),
+        "engine": "flow",
+    }
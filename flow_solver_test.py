@@ -0,0 +1,72 @@
+import unittest
+from solver import solver
+from benchmark.generate import generate_roster
+from cpsat_solver_test import get_test_data
+
+def shift_roster(seed=0):
+    return generate_roster(
+        15, 25,
+        constraint_mix={ 'unavailable': 0.2, 'cannotWork': 0.1 },
+        solver_option='cpsat',
+        seed=seed,
+        shift_length=240
+    )
+
+class TestFlowSolver(unittest.TestCase):
+    def test_flow_matches_cpsat(self):
+        for seed in range(3):
+            data = shift_roster(seed)
+
+            solution = solver(data)
+            cpsat_solution = solver({ **data, 'flow': False })
+
+            self.assertEqual(solution['engine'], 'flow')
+            self.assertEqual(cpsat_solution['engine'], 'cpsat')
+            self.assertTrue(solution['status'])
+            self.assertEqual(solution['objectiveValue'], cpsat_solution['objectiveValue'])
+
+            starts_by_worker = {}
+            for scheduled_task in data['scheduledTasks']:
+                worker_ids = solution['solutionByTask'][scheduled_task['id']]
+                self.assertEqual(len(set(worker_ids)), scheduled_task['task']['qty'])
+
+                # shifts either match or don't overlap, so one task at a time is one per start time
+                for worker_id in worker_ids:
+                    start = (scheduled_task['startTime']['hour'], scheduled_task['startTime']['min'])
+                    self.assertNotIn(start, starts_by_worker.setdefault(worker_id, set()))
+                    starts_by_worker[worker_id].add(start)
+
+    def test_must_work_and_conflicts(self):
+        data = shift_roster()
+        # a task id of its own, so must work is just the one scheduled task
+        scheduled_task = data['scheduledTasks'][0]
+        scheduled_task['task'] = { **scheduled_task['task'], 'id': 99 }
+        data['constraints']['mustWork'] = { '14': ['99'] }
+        data['constraints']['unavailable'].pop('14', None)
+        stats = {}
+
+        solution = solver(data, stats=stats)
+
+        self.assertEqual(stats['search']['engine'], 'flow')
+        self.assertIn(scheduled_task['id'], solution['solutionByWorker'][14])
+        self.assertEqual(solution['objectiveValue'], solver({ **data, 'flow': False })['objectiveValue'])
+
+        # must work a task while unavailable
+        data['constraints']['unavailable']['14'] = {
+            'range': { 'startTime': scheduled_task['startTime'], 'endTime': scheduled_task['endTime'] }
+        }
+        self.assertFalse(solver(data)['status'])
+
+    def test_falls_back_to_search(self):
+        # data.json has consecutive fatigue constraints
+        self.assertEqual(solver(get_test_data('cpsat'))['engine'], 'cpsat')
+
+        # tasks partly overlapping each other
+        data = generate_roster(15, 25, constraint_mix={}, solver_option='cpsat')
+        self.assertEqual(solver(data)['engine'], 'cpsat')
+
+        # a first solution searches as before
+        self.assertEqual(solver({ **shift_roster(), 'solverOption': 'noOptimisation' })['engine'], 'cp')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,474 @@
+import time
+
+import utils
+from skeletons import get_skeleton
+from model import AssignmentPairs, get_solution, get_solution_cost, get_hinted_assignments, get_gap
+
+# workers a stuck task can take from other tasks (which are filled again) before it's left short
+max_repair_moves = 50
+
+# tasks a move can take a worker from in turn, to fill the task it took one from
+max_repair_depth = 3
+
+class GreedyRoster():
+    """
+        Assignments built one worker/task at a time, checking every constraint family as they're added:
+        one task at a time, pairs presolve fixed to 0, buddy (workers added a buddy group at a time),
+        nemesis, combinedMustWork (exactly one of a group), total and consecutive fatigue
+    """
+    def __init__(self, tasks, workers, constraints, extra_constraints):
+        self.tasks = tasks
+        self.workers = workers
+        self.constraints = constraints
+        self.task_table = constraints.task_table
+
+        self.fixed_zero = set(pair for pair, value in constraints.fixed.items() if value == 0)
+        self.fixed_one = set(pair for pair, value in constraints.fixed.items() if value == 1)
+
+        self.assigned = [set() for _ in workers]
+        self.workers_on = [set() for _ in tasks]
+        # assigned tasks of each worker by start and by end minute, to follow back to back runs. A minute
+        # can have a task without a duration as well as one ending or starting on it
+        self.by_start = [{} for _ in workers]
+        self.by_end = [{} for _ in workers]
+        self.worked = [0] * len(workers)
+        self.worked_by_task_id = [{} for _ in workers]
+        # (worker index, task index, added) of every change, to undo back to a mark
+        self.journal = []
+
+        self.buddies = self.get_groups_by_task(extra_constraints, 'buddy')
+        self.nemeses = self.get_groups_by_task(extra_constraints, 'nemesis')
+        self.combined = self.get_groups_by_task(extra_constraints, 'combinedMustWork')
+
+        # task ids (as strings) of the tasks each worker must work at least once
+        self.at_least = [set() for _ in workers]
+        task_id_strs = set(str(task_id) for task_id in constraints.task_indexes_by_task_id)
+        at_least_map = extra_constraints['atLeastWork'] if 'atLeastWork' in extra_constraints else {}
+        for worker_id, task_ids in at_least_map.items():
+            for i in constraints.worker_indexes([worker_id]):
+                self.at_least[i].update(task_id for task_id in task_ids if task_id in task_id_strs)
+
+        # keyed by worker index, as in add_overall_total_fatigue_time
+        overall_map = extra_constraints['overallTimeFatigueTotal'] if 'overallTimeFatigueTotal' in extra_constraints else {}
+        self.overall_limit = [
+            overall_map[str(worker.index)]['limit'] if str(worker.index) in overall_map else None for worker in workers
+        ]
+
+        self.fatigue_limits = [{} for _ in workers]
+        fatigue_total_map = extra_constraints['timeFatigueTotal'] if 'timeFatigueTotal' in extra_constraints else {}
+        for worker_id, fatigue_totals in fatigue_total_map.items():
+            for i in constraints.worker_indexes([worker_id]):
+                for fatigue_total in fatigue_totals:
+                    for task_id in fatigue_total['tasks']:
+                        limits = self.fatigue_limits[i]
+                        limits[task_id] = min(limits.get(task_id, fatigue_total['limit']), fatigue_total['limit'])
+
+        # the smallest consecutive limit of each worker, runs of back to back tasks stay under it
+        self.consecutive_limit = [None] * len(workers)
+        consecutive_map = extra_constraints['overallTimeFatigueConsecutive'] if 'overallTimeFatigueConsecutive' in extra_constraints else {}
+        for limit_str, limit_info in consecutive_map.items():
+            for i in constraints.worker_indexes(limit_info['workers']):
+                limit = self.consecutive_limit[i]
+                self.consecutive_limit[i] = int(limit_str) if limit == None else min(limit, int(limit_str))
+
+    def get_groups_by_task(self, extra_constraints, key):
+        """Worker index sets of the key's groups on each task index (of 2 or more workers, but for combinedMustWork)"""
+        groups_by_task = {}
+        for group in extra_constraints[key] if key in extra_constraints else []:
+            worker_indexes = set(self.constraints.worker_indexes(group['workers']))
+            if len(worker_indexes) > 1 or key == 'combinedMustWork':
+                for j in self.constraints.task_indexes(group['tasks']):
+                    groups_by_task.setdefault(j, []).append(worker_indexes)
+
+        return groups_by_task
+
+    def get_unit(self, i, j):
+        """Worker i and every worker buddied with them on task j, who all work it or don't"""
+        unit = set([i])
+        added = True
+        while added:
+            added = False
+            for group in self.buddies.get(j, []):
+                if not group <= unit and len(group & unit) > 0:
+                    unit |= group
+                    added = True
+
+        return unit
+
+    def get_run_time(self, i, j):
+        """
+            (tasks, minutes) of the longest run of back to back tasks worker i would work task j in, the most
+            tasks of the longest. Runs go through tasks without a duration as in utils.find_consecutive_index_paths
+        """
+        start = self.task_table.start
+        end = self.task_table.end
+        duration = self.task_table.duration
+
+        def longest(k, path, next_tasks, next_time):
+            """(minutes, tasks) of the longest run on from task k, not back through path"""
+            best = (0, 0)
+            for n in next_tasks.get(next_time(k), []):
+                if n not in path:
+                    minutes, num_tasks = longest(n, path | set([n]), next_tasks, next_time)
+                    best = max(best, (minutes + duration[n], num_tasks + 1))
+
+            return best
+
+        # back through the tasks ending as the next starts, and on through the tasks starting as the last ends
+        before = longest(j, set([j]), self.by_end[i], lambda k: start[k])
+        after = longest(j, set([j]), self.by_start[i], lambda k: end[k])
+
+        return (before[1] + 1 + after[1], before[0] + duration[j] + after[0])
+
+    def can_add(self, i, j):
+        """Whether worker i can be added to task j with every constraint still met"""
+        if j in self.assigned[i] or (i, j) in self.fixed_zero:
+            return False
+
+        start = self.task_table.start
+        end = self.task_table.end
+        duration = self.task_table.duration
+
+        # tasks on at the same time as for the overlap groups, see utils.group_by_time_overlap
+        if any(utils.mins_same_time(start[k], end[k], start[j], end[j]) for k in self.assigned[i]):
+            return False
+
+        for groups in [self.nemeses.get(j, []), self.combined.get(j, [])]:
+            for group in groups:
+                if i in group and len(group & self.workers_on[j]) > 0:
+                    return False
+
+        if self.overall_limit[i] != None and self.worked[i] + duration[j] > self.overall_limit[i]:
+            return False
+
+        task_id = self.tasks[j].task_id
+        if task_id in self.fatigue_limits[i]:
+            if self.worked_by_task_id[i].get(task_id, 0) + duration[j] > self.fatigue_limits[i][task_id]:
+                return False
+
+        if self.consecutive_limit[i] != None:
+            num_tasks, total = self.get_run_time(i, j)
+            if num_tasks > 1 and total >= self.consecutive_limit[i]:
+                return False
+
+        return True
+
+    def add(self, i, j):
+        self.set(i, j, True)
+        self.journal.append((i, j, True))
+
+    def remove(self, i, j):
+        self.set(i, j, False)
+        self.journal.append((i, j, False))
+
+    def set(self, i, j, added):
+        duration = self.task_table.duration[j] if added else -self.task_table.duration[j]
+        task_id = self.tasks[j].task_id
+        start = self.task_table.start[j]
+        end = self.task_table.end[j]
+
+        if added:
+            self.assigned[i].add(j)
+            self.workers_on[j].add(i)
+            self.by_start[i].setdefault(start, []).append(j)
+            self.by_end[i].setdefault(end, []).append(j)
+        else:
+            self.assigned[i].discard(j)
+            self.workers_on[j].discard(i)
+            self.by_start[i][start].remove(j)
+            self.by_end[i][end].remove(j)
+
+        self.worked[i] += duration
+        self.worked_by_task_id[i][task_id] = self.worked_by_task_id[i].get(task_id, 0) + duration
+
+    def mark(self):
+        return len(self.journal)
+
+    def undo(self, mark):
+        """Take back every change since mark"""
+        while len(self.journal) > mark:
+            i, j, added = self.journal.pop()
+            self.set(i, j, not added)
+
+    def add_unit(self, i, j):
+        """
+            Add worker i and their buddies to task j, if they all fit (and the task has room for them).
+            Returns whether they were added
+        """
+        unit = [k for k in sorted(self.get_unit(i, j)) if k not in self.workers_on[j]]
+        if len(self.workers_on[j]) + len(unit) > self.tasks[j].qty:
+            return False
+
+        mark = self.mark()
+        for k in unit:
+            if not self.can_add(k, j):
+                self.undo(mark)
+                return False
+
+            self.add(k, j)
+
+        return True
+
+    def remove_unit(self, i, j):
+        """Take worker i and their buddies off task j"""
+        for k in sorted(self.get_unit(i, j)):
+            if k in self.workers_on[j]:
+                self.remove(k, j)
+
+    def is_required(self, i, j):
+        """
+            Whether taking worker i off task j would break a constraint: a pair fixed to 1, the one worker of a
+            combinedMustWork group on it, or the one task of an atLeastWork task id they work
+        """
+        if (i, j) in self.fixed_one:
+            return True
+
+        if any(i in group for group in self.combined.get(j, [])):
+            return True
+
+        task_id = self.tasks[j].task_id
+        if str(task_id) in self.at_least[i]:
+            return not any(self.tasks[k].task_id == task_id for k in self.assigned[i] if k != j)
+
+        return False
+
+    def is_met(self):
+        """
+            Whether every task has its qty and every pair fixed to 1, combinedMustWork group and atLeastWork
+            entry is met. Adding checks the other families, but taking workers off tasks can break these
+        """
+        if any(len(self.workers_on[task.index]) != task.qty for task in self.tasks):
+            return False
+
+        if any(j not in self.assigned[i] for i, j in self.fixed_one):
+            return False
+
+        for j, groups in self.combined.items():
+            if any(len(group & self.workers_on[j]) != 1 for group in groups):
+                return False
+
+        for i, task_ids in enumerate(self.at_least):
+            if not task_ids <= set(str(self.tasks[j].task_id) for j in self.assigned[i]):
+                return False
+
+        return True
+
+def get_candidates(assignment_costs, num_workers, num_tasks, fixed):
+    """Workers that can work each task (not fixed to 0), cheapest first"""
+    fixed_zero_by_task = [set() for _ in range(num_tasks)]
+    for (i, j), value in fixed.items():
+        if value == 0:
+            fixed_zero_by_task[j].add(i)
+
+    columns = zip(*assignment_costs) if num_workers > 0 else [[] for _ in range(num_tasks)]
+
+    candidates = []
+    for j, costs in enumerate(columns):
+        fixed_zero = fixed_zero_by_task[j]
+        candidates.append([i for i in sorted(range(num_workers), key=costs.__getitem__) if i not in fixed_zero])
+
+    return candidates
+
+def get_greedy_bound(assignment_costs, candidates, tasks, fixed):
+    """get_cost_bound from the cheapest candidates of every task"""
+    fixed_one_by_task = [[] for _ in tasks]
+    for (i, j), value in fixed.items():
+        if value == 1:
+            fixed_one_by_task[j].append(i)
+
+    bound = 0
+    for task in tasks:
+        j = task.index
+        fixed_one = fixed_one_by_task[j]
+        cheapest = [i for i in candidates[j][:task.qty + len(fixed_one)] if i not in fixed_one][:max(0, task.qty - len(fixed_one))]
+
+        bound += sum(assignment_costs[i][j] for i in fixed_one + cheapest)
+
+    return bound
+
+def get_task_order(assignment_costs, candidates, tasks):
+    """
+        Tasks with the fewest workers to spare first, then the ones losing the most by missing their
+        cheapest workers (regret: the next cheapest worker's cost over the last one needed)
+    """
+    def key(j):
+        qty = tasks[j].qty
+        task_candidates = candidates[j]
+        spare = len(task_candidates) - qty
+        regret = assignment_costs[task_candidates[qty]][j] - assignment_costs[task_candidates[qty - 1]][j] if spare > 0 and qty > 0 else 0
+
+        return (spare, -regret, j)
+
+    return sorted(range(len(tasks)), key=key)
+
+def fill_task(roster, candidates, j):
+    """Add the first candidates that fit to task j until it has its qty, returning whether it has"""
+    qty = roster.tasks[j].qty
+    for i in candidates[j]:
+        if len(roster.workers_on[j]) >= qty:
+            break
+        if i not in roster.workers_on[j]:
+            roster.add_unit(i, j)
+
+    return len(roster.workers_on[j]) >= qty
+
+def repair_task(roster, candidates, j):
+    """
+        Fill a task fill_task left short by moving candidates off a task clashing with it, filling that task
+        again with someone else (or by moving someone off a task clashing with it in turn, max_repair_depth deep).
+        Tries max_repair_moves moves, returning whether the task is full
+    """
+    start = roster.task_table.start
+    end = roster.task_table.end
+    moves = 0
+
+    def is_full(j):
+        return len(roster.workers_on[j]) >= roster.tasks[j].qty
+
+    def repair(j, path):
+        nonlocal moves
+
+        for i in candidates[j]:
+            if is_full(j) or moves >= max_repair_moves:
+                break
+            if i in roster.workers_on[j]:
+                continue
+
+            clashes = [k for k in roster.assigned[i] if utils.mins_same_time(start[k], end[k], start[j], end[j])]
+            if len(clashes) != 1 or clashes[0] in path:
+                continue
+
+            # the worker and their buddies can only come off a task no constraint keeps them on
+            k = clashes[0]
+            if any(roster.is_required(u, k) for u in roster.get_unit(i, k) if u in roster.workers_on[k]):
+                continue
+
+            moves += 1
+
+            mark = roster.mark()
+            roster.remove_unit(i, k)
+            if roster.add_unit(i, j) and (
+                fill_task(roster, candidates, k) or (len(path) < max_repair_depth and repair(k, path | set([k])))
+            ):
+                continue
+
+            roster.undo(mark)
+
+        return is_full(j)
+
+    return repair(j, set([j]))
+
+def build_greedy_roster(tasks, workers, constraints, extra_constraints, assignment_costs, candidates):
+    """
+        Must work pairs first, then one of each combinedMustWork group and a task for every atLeastWork entry,
+        then every task filled with its cheapest workers that fit (most constrained tasks first), repairing any
+        left short. Returns (roster, every constraint met)
+    """
+    roster = GreedyRoster(tasks, workers, constraints, extra_constraints)
+    fixed = constraints.fixed
+
+    met = len(constraints.conflicts) == 0
+
+    for (i, j), value in sorted(fixed.items()):
+        if value == 1 and i not in roster.workers_on[j]:
+            met = roster.add_unit(i, j) and met
+
+    for j, groups in sorted(roster.combined.items()):
+        for group in groups:
+            if len(group & roster.workers_on[j]) == 0:
+                met = any(roster.add_unit(i, j) for i in candidates[j] if i in group) and met
+
+    at_least_map = extra_constraints['atLeastWork'] if 'atLeastWork' in extra_constraints else {}
+    for worker_id, task_ids in at_least_map.items():
+        for i in constraints.worker_indexes([worker_id]):
+            for task_id, task_indexes in constraints.task_indexes_by_task_id.items():
+                if str(task_id) in task_ids and len(roster.assigned[i] & set(task_indexes)) == 0:
+                    cheapest = sorted(task_indexes, key=lambda j: assignment_costs[i][j])
+                    met = any(roster.add_unit(i, j) for j in cheapest) and met
+
+    short = [j for j in get_task_order(assignment_costs, candidates, tasks) if not fill_task(roster, candidates, j)]
+    short = [j for j in short if not repair_task(roster, candidates, j)]
+
+    return (roster, met and len(short) == 0 and roster.is_met())
+
+def greedy_solver(data, on_solution=None, stats=None):
+    """
+        A first solution built without searching (see build_greedy_roster), in milliseconds on rosters the cp
+        search takes seconds on. Not being able to build one doesn't make a roster infeasible. bound is
+        get_cost_bound's, with the tasks' cheapest workers
+    """
+    start = time.perf_counter()
+
+    skeleton, _, _ = get_skeleton(data)
+    tasks = skeleton.tasks
+    workers = skeleton.workers
+    constraints = skeleton.constraints
+    fixed = skeleton.fixed
+    extra_constraints = skeleton.extra_constraints
+
+    assignment_costs = utils.get_cost_rows(data['costMatrix'], workers, tasks)
+
+    solution_hint = data['solutionHint'] if 'solutionHint' in data else None
+    hinted = get_hinted_assignments(solution_hint, workers, tasks)
+
+    candidates = get_candidates(assignment_costs, len(workers), len(tasks), fixed)
+
+    # workers of a previous solution first, keeping to it where it still fits
+    hinted_candidates = candidates
+    if len(hinted) > 0:
+        hinted_candidates = [
+            [i for i in task_candidates if (i, j) in hinted] + [i for i in task_candidates if (i, j) not in hinted]
+                for j, task_candidates in enumerate(candidates)
+        ]
+
+    roster, status = build_greedy_roster(tasks, workers, constraints, extra_constraints, assignment_costs, hinted_candidates)
+
+    if stats != None:
+        num_fixed_one = sum(1 for value in fixed.values() if value == 1)
+        stats['build'] = []
+        stats['buildMs'] = 0
+        stats['presolve'] = {
+            "fixedZero": len(fixed) - num_fixed_one,
+            "fixedOne": num_fixed_one,
+            "variables": sum(len(task_candidates) for task_candidates in candidates) - num_fixed_one,
+        }
+        stats['symmetry'] = { "classes": 0, "workers": 0 }
+        stats['search'] = {
+            "engine": "greedy",
+            "branches": 0,
+            "failures": 0,
+            "solutions": 1 if status else 0,
+            "restarts": 0,
+            "wallTimeMs": (time.perf_counter() - start) * 1000,
+        }
+
+    if not status:
+        return {
+            "status": status,
+            "solutionByTask": None,
+            "solutionByWorker": None,
+            "objectiveValue": None,
+            "bound": None,
+            "gap": None,
+            "engine": "greedy",
+        }
+
+    assignments_ref = AssignmentPairs(workers, tasks, ((i, j) for i in range(len(workers)) for j in sorted(roster.assigned[i])))
+    is_assigned = lambda i, j: True
+
+    solution_by_task, solution_by_worker = get_solution(assignments_ref, is_assigned)
+    objective_value = get_solution_cost(assignment_costs, assignments_ref, is_assigned)
+    bound = get_greedy_bound(assignment_costs, candidates, tasks, fixed)
+
+    if on_solution != None:
+        on_solution(objective_value, solution_by_worker)
+
+    return {
+        "status": status,
+        "solutionByTask": solution_by_task,
+        "solutionByWorker": solution_by_worker,
+        "objectiveValue": objective_value,
+        "bound": bound,
+        "gap": get_gap(objective_value, bound),
+        "engine": "greedy",
+    }
@@ -0,0 +1,112 @@
+import unittest
+import utils
+from ortools.sat.python import cp_model
+from constraints import Constraints
+from model import CpSatModel, build_assignments, add_constraints
+from solver import solver
+from benchmark.generate import generate_roster, default_constraint_mix
+
+def is_feasible(data, solution_by_worker):
+    """Whether the solution meets every constraint of the CP model"""
+    model = CpSatModel()
+    tasks = utils.get_tasks(data['scheduledTasks'])
+    workers = utils.get_workers(data['workers'])
+    assignments, assignments_ref = build_assignments(model, tasks, workers)
+    add_constraints(model, Constraints(tasks, workers, None, assignments, assignments_ref), data['constraints'])
+
+    for worker in workers:
+        task_ids = solution_by_worker.get(worker.id, [])
+        for task in tasks:
+            model.Add(assignments[worker.index][task.index] == (1 if task.id in task_ids else 0))
+
+    return cp_model.CpSolver().Solve(model) == cp_model.OPTIMAL
+
+def breaks_consecutive_paths(data, solution_by_worker):
+    """Whether a worker with a consecutive limit works every task of one of the model's consecutive paths"""
+    tasks = utils.get_tasks(data['scheduledTasks'])
+    constraints = Constraints(tasks, utils.get_workers(data['workers']))
+
+    for limit, limit_info in data['constraints']['overallTimeFatigueConsecutive'].items():
+        paths = constraints.get_consecutive_fatigue(int(limit), limit_info['breakTime'], 'paths').paths
+        for worker_id in limit_info['workers']:
+            task_ids = set(solution_by_worker.get(worker_id, []))
+            if any(all(tasks[j].id in task_ids for j in path.path_tasks) for path in paths):
+                return True
+
+    return False
+
+class TestGreedySolver(unittest.TestCase):
+    def test_greedy_solution_meets_constraints(self):
+        heavy_mix = { key: fraction * 4 for key, fraction in default_constraint_mix.items() }
+
+        for constraint_mix in [default_constraint_mix, heavy_mix]:
+            data = generate_roster(40, 60, constraint_mix=constraint_mix, solver_option='fast', seed=3)
+            stats = {}
+
+            solution = solver(data, stats=stats)
+
+            self.assertTrue(solution['status'])
+            self.assertEqual(solution['engine'], 'greedy')
+            self.assertEqual(stats['search']['engine'], 'greedy')
+            self.assertTrue(is_feasible(data, solution['solutionByWorker']))
+            self.assertLessEqual(solution['bound'], solution['objectiveValue'])
+
+            for scheduled_task in data['scheduledTasks']:
+                self.assertEqual(len(solution['solutionByTask'][scheduled_task['id']]), scheduled_task['task']['qty'])
+
+    def test_fast_searches_when_greedy_gets_stuck(self):
+        constraint_mix = { **default_constraint_mix, 'mustWork': 0.05, 'combinedMustWork': 0.05 }
+        data = { **generate_roster(20, 30, constraint_mix=constraint_mix, solver_option='fast', seed=2), 'decompose': False }
+
+        solution = solver(data)
+
+        self.assertTrue(solution['status'])
+        self.assertEqual(solution['engine'], 'cp')
+        self.assertTrue(is_feasible(data, solution['solutionByWorker']))
+
+    def test_repair_keeps_combined_must_work(self):
+        time = lambda hour: { "hour": hour, "min": 0 }
+        data = {
+            "workers": [{ "id": 1, "name": "worker 1", "tags": [] }, { "id": 2, "name": "worker 2", "tags": [] }],
+            "scheduledTasks": [
+                { "id": "s1", "startTime": time(9), "endTime": time(10), "task": { "id": 1, "name": "task 1", "qty": 1 } },
+                { "id": "s2", "startTime": time(9), "endTime": time(10), "task": { "id": 2, "name": "task 2", "qty": 1 } },
+            ],
+            "costMatrix": { "1": { "s1": 1, "s2": 1 }, "2": { "s1": 1, "s2": 1 } },
+            "solverOption": "fast",
+            "timeLimit": None,
+            # worker 1 must work s1, so nobody can work s2
+            "constraints": { "combinedMustWork": [{ "workers": [1], "tasks": [1] }], "cannotWork": { "2": ["2"] } },
+        }
+
+        solution = solver(data)
+
+        self.assertFalse(solution['status'])
+        self.assertEqual(solution['engine'], 'cp')
+
+    def test_consecutive_runs_through_tasks_without_duration(self):
+        for seed in range(3):
+            data = generate_roster(30, 30, constraint_mix={ 'overallTimeFatigueConsecutive': 0.5 }, solver_option='fast', seed=seed)
+            data['decompose'] = False
+            # back to back tasks on the quarter hour, some of them without a duration
+            for scheduled_task in data['scheduledTasks'][::4]:
+                scheduled_task['endTime'] = dict(scheduled_task['startTime'])
+
+            solution = solver(data)
+
+            self.assertEqual(solution['engine'], 'greedy')
+            self.assertFalse(breaks_consecutive_paths(data, solution['solutionByWorker']))
+            self.assertTrue(is_feasible(data, solution['solutionByWorker']))
+
+    def test_greedy_hint(self):
+        data = { **generate_roster(40, 60, solver_option='fast', seed=3), 'decompose': False }
+        greedy_solution = solver(data)
+
+        # searching from the greedy solution finds it first
+        solution = solver({ **data, 'solverOption': 'noOptimisation', 'greedyHint': True })
+
+        self.assertEqual(solution['engine'], 'cp')
+        self.assertEqual(solution['objectiveValue'], greedy_solution['objectiveValue'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+
+from solver import solver
+
+# seconds between checks for a cancelled job while it is solving
+cancel_poll_interval = 0.5
+
+# finished jobs are kept this many seconds for their result to be fetched, and at most this many of them
+finished_job_ttl = 60 * 60
+max_finished_jobs = 1000
+
+def run_job(data, progress, cancelled):
+    """
+        Solve data in a pool process, recording the best objective found so far in progress
+        and stopping the search once cancelled is set
+    """
+    progress['status'] = 'running'
+
+    def on_solution(objective_value, solution_by_worker):
+        if progress['objectiveValue'] == None or objective_value < progress['objectiveValue']:
+            progress['objectiveValue'] = objective_value
+
+    # search limits are checked very often, only ask the manager process every so often
+    last_check = [time.monotonic()]
+    def should_stop():
+        now = time.monotonic()
+        if now - last_check[0] < cancel_poll_interval:
+            return False
+        last_check[0] = now
+
+        return cancelled.is_set()
+
+    return solver(data, on_solution, should_stop)
+
+class Jobs():
+    """
+        Solves run in the background on a bounded process pool, tracked by job id. Finished jobs are
+        dropped once older than ttl seconds, or oldest first past max_finished
+    """
+    def __init__(self, max_workers=None, ttl=finished_job_ttl, max_finished=max_finished_jobs):
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self.manager = None
+        self.pool = None
+        self.jobs = {}
+        # ids of finished jobs by the time they finished, oldest first
+        self.finished = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        # only start processes once a job is submitted (not on import of the api)
+        if self.pool == None:
+            self.manager = Manager()
+            self.pool = ProcessPoolExecutor(self.max_workers)
+
+    def submit(self, data):
+        self.start()
+        self.evict()
+
+        id = str(uuid.uuid4())
+        progress = self.manager.dict({ 'status': 'queued', 'objectiveValue': None })
+        cancelled = self.manager.Event()
+
+        with self.lock:
+            self.jobs[id] = {
+                'progress': progress,
+                'cancelled': cancelled,
+                'future': self.pool.submit(run_job, data, progress, cancelled),
+            }
+
+        self.jobs[id]['future'].add_done_callback(lambda future: self.on_finished(id))
+
+        return id
+
+    def on_finished(self, id):
+        with self.lock:
+            self.finished[id] = time.monotonic()
+
+    def evict(self):
+        """Drop finished jobs past ttl, then the oldest past max_finished"""
+        now = time.monotonic()
+
+        with self.lock:
+            expired = [id for id, finished in self.finished.items() if self.ttl != None and now - finished > self.ttl]
+            ids = list(self.finished)
+            oldest = ids[:max(0, len(ids) - self.max_finished)] if self.max_finished != None else []
+
+            for id in set(expired) | set(oldest):
+                del self.finished[id]
+                del self.jobs[id]
+
+    def get(self, id):
+        """
+            Status of the job (queued, running, done, cancelled or failed), best objective so far
+            and the solution once finished. None if no job has the id (or it was dropped)
+        """
+        self.evict()
+
+        job = self.jobs.get(id)
+        if job == None:
+            return None
+
+        future = job['future']
+        status = job['progress']['status']
+        solution = None
+
+        if future.cancelled():
+            status = 'cancelled'
+        elif future.done():
+            if future.exception() != None:
+                status = 'failed'
+            else:
+                status = 'cancelled' if job['cancelled'].is_set() else 'done'
+                solution = future.result()
+
+        objective_value = job['progress']['objectiveValue']
+        if solution != None and solution['objectiveValue'] != None:
+            objective_value = solution['objectiveValue']
+
+        return {
+            'id': id,
+            'status': status,
+            'objectiveValue': objective_value,
+            'solution': solution,
+        }
+
+    def cancel(self, id):
+        """
+            Cancel a queued job or stop the search of a running one (keeping the best solution found).
+            A finished job is left as it is. Returns False if no job has the id
+        """
+        job = self.jobs.get(id)
+        if job == None:
+            return False
+
+        if job['future'].done():
+            return True
+
+        job['cancelled'].set()
+        job['future'].cancel()
+
+        return True
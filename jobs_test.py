@@ -0,0 +1,72 @@
+import time
+import unittest
+from jobs import Jobs
+from cpsat_solver_test import get_test_data
+
+def wait_for(jobs, id, timeout=30):
+    start = time.monotonic()
+    job = jobs.get(id)
+    while job['solution'] == None and job['status'] not in ['failed', 'cancelled'] and time.monotonic() - start < timeout:
+        time.sleep(0.1)
+        job = jobs.get(id)
+
+    return job
+
+class TestJobs(unittest.TestCase):
+    def test_job_runs_to_solution(self):
+        jobs = Jobs(max_workers=1)
+        id = jobs.submit(get_test_data('cpsat'))
+
+        job = wait_for(jobs, id)
+
+        self.assertEqual(job['status'], 'done')
+        self.assertTrue(job['solution']['status'])
+        self.assertEqual(job['objectiveValue'], job['solution']['objectiveValue'])
+
+    def test_cancel_running_job_keeps_best_solution(self):
+        jobs = Jobs(max_workers=1)
+        # optimal never finishes proving on data.json
+        id = jobs.submit(get_test_data('optimal'))
+        while jobs.get(id)['objectiveValue'] == None:
+            time.sleep(0.1)
+
+        self.assertTrue(jobs.cancel(id))
+        job = wait_for(jobs, id)
+
+        self.assertEqual(job['status'], 'cancelled')
+        self.assertTrue(job['solution']['status'])
+
+    def test_cancel_finished_job_keeps_result(self):
+        jobs = Jobs(max_workers=1)
+        id = jobs.submit(get_test_data('cpsat'))
+        wait_for(jobs, id)
+
+        self.assertTrue(jobs.cancel(id))
+        job = jobs.get(id)
+
+        self.assertEqual(job['status'], 'done')
+        self.assertTrue(job['solution']['status'])
+
+    def test_finished_jobs_evicted(self):
+        jobs = Jobs(max_workers=1, max_finished=1)
+        first_id = jobs.submit(get_test_data('noOptimisation'))
+        wait_for(jobs, first_id)
+        second_id = jobs.submit(get_test_data('noOptimisation'))
+        wait_for(jobs, second_id)
+
+        # the oldest finished job is dropped past max_finished
+        self.assertEqual(jobs.get(first_id), None)
+        self.assertEqual(jobs.get(second_id)['status'], 'done')
+
+        jobs.ttl = 0
+        time.sleep(0.01)
+        self.assertEqual(jobs.get(second_id), None)
+
+    def test_unknown_job(self):
+        jobs = Jobs()
+
+        self.assertEqual(jobs.get('unknown'), None)
+        self.assertFalse(jobs.cancel('unknown'))
+
+if __name__ == '__main__':
+    unittest.main()
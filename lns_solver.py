@@ -0,0 +1,255 @@
+import random
+import time
+from ortools.sat.python import cp_model
+
+import utils
+from cpsat_solver import build_cpsat_model, get_build_stats
+from model import get_solution, get_solution_cost, report_solution, get_gap, is_gap_reached
+
+# seconds each neighbourhood is re-optimised for
+default_neighbourhood_time_limit = 1
+
+# fraction of the scheduled tasks (or workers) a neighbourhood frees to start with
+default_neighbourhood_size = 0.1
+
+# without a timeLimit, stop once this many neighbourhoods in a row don't improve
+max_stale_neighbourhoods = 30
+
+# neighbourhoods grow while they're solved to optimality within their limit, and shrink while they aren't
+neighbourhood_growth = 1.2
+
+def get_time_window_neighbourhood(rand, task_table, size):
+    """Scheduled task indexes of the tasks starting in a random window of time, size of them in start order"""
+    task_indexes = sorted(range(len(task_table.start)), key=lambda j: task_table.start[j])
+    first = rand.randrange(max(1, len(task_indexes) - size + 1))
+
+    return (set(task_indexes[first:first + size]), set())
+
+def get_worker_neighbourhood(rand, num_workers, size):
+    """size random worker indexes"""
+    return (set(), set(rand.sample(range(num_workers), min(size, num_workers))))
+
+def get_task_group_neighbourhood(rand, task_groups, size):
+    """
+        Scheduled task indexes of a random task_id group, with more random groups while the neighbourhood is under size
+    """
+    task_indexes = set()
+    for task_group in rand.sample(task_groups, len(task_groups)):
+        task_indexes.update(task_group)
+        if len(task_indexes) >= size:
+            break
+
+    return (task_indexes, set())
+
+def lns_solver(data, on_solution=None, should_stop=None, stats=None):
+    """
+        Large neighbourhood search on the CP-SAT model: take a fast first solution, then over and over
+        free a neighbourhood of it (a window of time, some workers or a task_id group), keep every other
+        worker/task as it is and re-optimise what's free for neighbourhoodTimeLimit seconds, keeping any improvement.
+        Runs for timeLimit minutes (or until max_stale_neighbourhoods in a row don't improve without one).
+        Returns the same response shape as solver.solver, on_solution/should_stop/stats work as they do there.
+    """
+    time_limit = data['timeLimit'] if 'timeLimit' in data else None
+    num_workers = data['numWorkers'] if 'numWorkers' in data else 1
+    neighbourhood_time_limit = data['neighbourhoodTimeLimit'] if 'neighbourhoodTimeLimit' in data else default_neighbourhood_time_limit
+    neighbourhood_size = data['neighbourhoodSize'] if 'neighbourhoodSize' in data else default_neighbourhood_size
+    seed = data['seed'] if 'seed' in data else 0
+    hint_penalty = data['hintPenalty'] if 'hintPenalty' in data else 0
+    relative_gap = data['relativeGap'] if 'relativeGap' in data else None
+    absolute_gap = data['absoluteGap'] if 'absoluteGap' in data else None
+
+    build_stats = [] if stats != None else None
+
+    built = build_cpsat_model(data, build_stats)
+    model = built.model
+    assignments = built.assignments
+    assignments_ref = built.assignments_ref
+    assignment_costs = built.assignment_costs
+
+    search_start = time.perf_counter()
+    deadline = search_start + time_limit * 60 if time_limit != None else None
+    rand = random.Random(seed)
+
+    def remaining_time():
+        return deadline - time.perf_counter() if deadline != None else None
+
+    # fast first solution: like the cp engine, assign any hinted then the cheapest worker/tasks first,
+    # without presolving the whole model
+    first_model = model.Copy()
+    first_model.AddDecisionStrategy(
+        [
+            first_model.GetIntVarFromProtoIndex(assignments[i][j].Index())
+                for i, j in sorted(
+                    ((i, j) for i, worker_assignments in enumerate(assignments) for j in worker_assignments),
+                    key=lambda ij: (ij not in built.hinted, assignment_costs[ij[0]][ij[1]])
+                )
+        ],
+        cp_model.CHOOSE_FIRST,
+        cp_model.SELECT_MAX_VALUE
+    )
+
+    cp_solver = cp_model.CpSolver()
+    cp_solver.parameters.num_workers = 1
+    cp_solver.parameters.stop_after_first_solution = True
+    cp_solver.parameters.search_branching = cp_model.FIXED_SEARCH
+    cp_solver.parameters.cp_model_presolve = False
+    cp_solver.parameters.linearization_level = 0
+    if deadline != None:
+        cp_solver.parameters.max_time_in_seconds = remaining_time()
+
+    result = cp_solver.Solve(first_model)
+    status = result in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+    branches = cp_solver.NumBranches()
+    failures = cp_solver.NumConflicts()
+    solutions = 1 if status else 0
+    neighbourhoods = 0
+
+    if status:
+        incumbent = {
+            (i, j): cp_solver.Value(assignment)
+                for i, worker_assignments in enumerate(assignments)
+                    for j, assignment in worker_assignments.items()
+        }
+        incumbent_objective = cp_solver.ObjectiveValue()
+        is_assigned = lambda i, j: incumbent[(i, j)] == 1
+
+        if on_solution != None:
+            report_solution(on_solution, assignment_costs, assignments_ref, is_assigned)
+
+    # every worker/task variable by the proto index its domain is at
+    variables = [
+        (i, j, model.Proto().variables[assignment.Index()])
+            for i, worker_assignments in enumerate(assignments)
+                for j, assignment in worker_assignments.items()
+    ]
+    task_groups = [[task.index for task in task_group] for task_group in utils.group_task_by_task(built.tasks)]
+    num_tasks = len(built.tasks)
+    num_workers_rostered = len(built.workers)
+
+    stale = 0
+    proven_optimal = result == cp_model.OPTIMAL
+
+    # each neighbourhood is re-optimised with the request's search (presolve removes everything fixed)
+    cp_solver = cp_model.CpSolver()
+    cp_solver.parameters.num_workers = num_workers
+
+    while status and not proven_optimal and num_tasks > 0:
+        if deadline != None and remaining_time() <= 0:
+            break
+        if deadline == None and stale >= max_stale_neighbourhoods:
+            break
+        if should_stop != None and should_stop():
+            break
+        if is_gap_reached(incumbent_objective, built.bound, relative_gap, absolute_gap):
+            break
+
+        # take turns at each kind of neighbourhood
+        kind = neighbourhoods % 3
+        if kind == 0:
+            free_tasks, free_workers = get_time_window_neighbourhood(
+                rand,
+                built.task_table,
+                max(1, round(num_tasks * neighbourhood_size))
+            )
+        elif kind == 1:
+            free_tasks, free_workers = get_worker_neighbourhood(
+                rand,
+                num_workers_rostered,
+                max(1, round(num_workers_rostered * neighbourhood_size))
+            )
+        else:
+            free_tasks, free_workers = get_task_group_neighbourhood(
+                rand,
+                task_groups,
+                max(1, round(num_tasks * neighbourhood_size))
+            )
+
+        # fix everything outside the neighbourhood to the incumbent, keeping each domain to put back after
+        domains = []
+        model.ClearHints()
+        for i, j, variable in variables:
+            if i in free_workers or j in free_tasks:
+                model.AddHint(assignments[i][j], incumbent[(i, j)])
+            else:
+                domains.append((variable, variable.domain[0], variable.domain[1]))
+                variable.domain[0] = incumbent[(i, j)]
+                variable.domain[1] = incumbent[(i, j)]
+
+        cp_solver.parameters.max_time_in_seconds = (
+            neighbourhood_time_limit if deadline == None else max(0, min(neighbourhood_time_limit, remaining_time()))
+        )
+        result = cp_solver.Solve(model)
+
+        for variable, lower_bound, upper_bound in domains:
+            variable.domain[0] = lower_bound
+            variable.domain[1] = upper_bound
+
+        neighbourhoods += 1
+        branches += cp_solver.NumBranches()
+        failures += cp_solver.NumConflicts()
+
+        if result in (cp_model.OPTIMAL, cp_model.FEASIBLE) and cp_solver.ObjectiveValue() < incumbent_objective:
+            incumbent = { (i, j): cp_solver.Value(assignments[i][j]) for i, j, _ in variables }
+            incumbent_objective = cp_solver.ObjectiveValue()
+            solutions += 1
+            stale = 0
+
+            if on_solution != None:
+                report_solution(on_solution, assignment_costs, assignments_ref, is_assigned)
+        else:
+            stale += 1
+
+        # nothing was fixed, so an optimal neighbourhood is optimal for the whole roster
+        proven_optimal = result == cp_model.OPTIMAL and len(domains) == 0
+
+        if result == cp_model.OPTIMAL:
+            neighbourhood_size = min(1, neighbourhood_size * neighbourhood_growth)
+        else:
+            neighbourhood_size = neighbourhood_size / neighbourhood_growth
+
+    print("Time:", (time.perf_counter() - search_start) * 1000, "ms")
+    print('neighbourhoods', neighbourhoods)
+
+    if stats != None:
+        stats.update(get_build_stats(build_stats, built))
+        stats['search'] = {
+            "engine": "lns",
+            "branches": branches,
+            "failures": failures,
+            "solutions": solutions,
+            "restarts": 0,
+            "neighbourhoods": neighbourhoods,
+            "wallTimeMs": (time.perf_counter() - search_start) * 1000,
+        }
+
+    if status:
+        solution_by_task, solution_by_worker = get_solution(assignments_ref, is_assigned)
+
+        # objective includes any hint penalty, report the cost alone
+        objective_value = get_solution_cost(assignment_costs, assignments_ref, is_assigned)
+
+        # a whole roster neighbourhood solved to optimality proves the cost optimal without a hint penalty
+        bound = built.bound
+        if proven_optimal and (len(built.hinted) == 0 or hint_penalty == 0):
+            bound = objective_value
+
+        return {
+            "status": status,
+            "solutionByTask": solution_by_task,
+            "solutionByWorker": solution_by_worker,
+            "objectiveValue": objective_value,
+            "bound": bound,
+            "gap": get_gap(objective_value, bound),
+            "engine": "lns",
+        }
+
+    return {
+        "status": status,
+        "solutionByTask": None,
+        "solutionByWorker": None,
+        "objectiveValue": None,
+        "bound": None,
+        "gap": None,
+        "engine": "lns",
+    }
@@ -0,0 +1,36 @@
+import unittest
+from solver import solver
+from benchmark.generate import generate_roster
+from cpsat_solver_test import get_test_data
+
+class TestLnsSolver(unittest.TestCase):
+    def test_lns_matches_cpsat(self):
+        data = { **generate_roster(30, 40, solver_option='lns', seed=0), 'decompose': False }
+        stats = {}
+
+        solution = solver(data, stats=stats)
+        cpsat_solution = solver({ **data, 'solverOption': 'cpsat' })
+
+        self.assertEqual(solution['engine'], 'lns')
+        self.assertEqual(stats['search']['engine'], 'lns')
+        self.assertGreater(stats['search']['neighbourhoods'], 0)
+        self.assertTrue(solution['status'])
+        self.assertEqual(solution['objectiveValue'], cpsat_solution['objectiveValue'])
+
+        for scheduled_task in data['scheduledTasks']:
+            self.assertEqual(len(solution['solutionByTask'][scheduled_task['id']]), scheduled_task['task']['qty'])
+
+    def test_lns_no_worse_than_first_solution(self):
+        first_solution = solver(get_test_data('noOptimisation'))
+        solutions = []
+
+        solution = solver(get_test_data('lns'), on_solution=lambda cost, by_worker: solutions.append(cost))
+
+        self.assertTrue(solution['status'])
+        self.assertLessEqual(solution['objectiveValue'], first_solution['objectiveValue'])
+        # every solution reported improves on the one before
+        self.assertListEqual(solutions, sorted(set(solutions), reverse=True))
+        self.assertEqual(solutions[-1], solution['objectiveValue'])
+
+if __name__ == '__main__':
+    unittest.main()
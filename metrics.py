@@ -0,0 +1,113 @@
+import threading
+
+default_buckets = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300]
+
+count_buckets = [10, 100, 1000, 10000, 100000, 1000000, 10000000]
+
+def format_labels(labels):
+    if len(labels) == 0:
+        return ''
+
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+def format_value(value):
+    return '+Inf' if value == float('inf') else repr(value)
+
+class Histogram():
+    """
+        Prometheus histogram, one set of buckets per label combination
+    """
+    def __init__(self, name, help, label_names=[], buckets=default_buckets):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = [*buckets, float('inf')]
+        self.series = {}
+
+    def observe(self, value, *label_values):
+        if label_values not in self.series:
+            self.series[label_values] = { 'counts': [0] * len(self.buckets), 'sum': 0, 'count': 0 }
+
+        series = self.series[label_values]
+        for index, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                series['counts'][index] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+
+        for label_values, series in sorted(self.series.items()):
+            labels = list(zip(self.label_names, label_values))
+            for bucket, count in zip(self.buckets, series['counts']):
+                lines.append(f'{self.name}_bucket{format_labels([*labels, ("le", format_value(bucket))])} {count}')
+            lines.append(f'{self.name}_sum{format_labels(labels)} {series["sum"]}')
+            lines.append(f'{self.name}_count{format_labels(labels)} {series["count"]}')
+
+        return lines
+
+class Counter():
+    def __init__(self, name, help, label_names=[]):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.series = {}
+
+    def inc(self, *label_values):
+        self.series[label_values] = self.series.get(label_values, 0) + 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+
+        for label_values, count in sorted(self.series.items()):
+            lines.append(f'{self.name}{format_labels(list(zip(self.label_names, label_values)))} {count}')
+
+        return lines
+
+class Metrics():
+    """
+        Aggregated solve statistics, rendered in the Prometheus text format for /metrics
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.solves = Counter('solver_solves_total', 'Solve requests', ['engine', 'status'])
+        self.cache = Counter('solver_cache_total', 'Solve requests answered from the result cache or not', ['result'])
+        self.build_seconds = Histogram('solver_build_seconds', 'Time building each constraint family', ['family'])
+        self.build_constraints = Histogram(
+            'solver_build_constraints', 'Constraints added by each constraint family', ['family'], count_buckets)
+        self.search_seconds = Histogram('solver_search_seconds', 'Time searching', ['engine'])
+        self.search_branches = Histogram('solver_search_branches', 'Branches explored', ['engine'], count_buckets)
+        self.search_failures = Histogram('solver_search_failures', 'Failures (conflicts) during search', ['engine'], count_buckets)
+
+    def observe_cache(self, hit):
+        with self.lock:
+            self.cache.inc('hit' if hit else 'miss')
+
+    def observe_solve(self, stats, status):
+        """Record the stats filled in by solver()"""
+        with self.lock:
+            for family in stats['build']:
+                self.build_seconds.observe(family['ms'] / 1000, family['family'])
+                self.build_constraints.observe(family['constraints'], family['family'])
+
+            search = stats['search']
+            engine = search['engine']
+            self.solves.inc(engine, 'solved' if status else 'unsolved')
+            self.search_seconds.observe(search['wallTimeMs'] / 1000, engine)
+            self.search_branches.observe(search['branches'], engine)
+            self.search_failures.observe(search['failures'], engine)
+
+    def render(self):
+        with self.lock:
+            metrics = [
+                self.solves,
+                self.cache,
+                self.build_seconds,
+                self.build_constraints,
+                self.search_seconds,
+                self.search_branches,
+                self.search_failures,
+            ]
+
+            return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
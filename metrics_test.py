@@ -0,0 +1,40 @@
+import unittest
+from api import app
+from metrics import Metrics, Histogram
+from cpsat_solver_test import get_test_data
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_render(self):
+        histogram = Histogram('solve_seconds', 'Solve time', ['engine'], [1, 10])
+        histogram.observe(0.5, 'cp')
+        histogram.observe(5, 'cp')
+
+        self.assertListEqual(histogram.render(), [
+            '# HELP solve_seconds Solve time',
+            '# TYPE solve_seconds histogram',
+            'solve_seconds_bucket{engine="cp",le="1"} 1',
+            'solve_seconds_bucket{engine="cp",le="10"} 2',
+            'solve_seconds_bucket{engine="cp",le="+Inf"} 2',
+            'solve_seconds_sum{engine="cp"} 5.5',
+            'solve_seconds_count{engine="cp"} 2',
+        ])
+
+    def test_solve_stats_and_metrics(self):
+        client = app.test_client()
+        data = get_test_data('noOptimisation')
+        data['stats'] = True
+
+        stats = client.post('/solve', json=data).get_json()['stats']
+
+        families = [family['family'] for family in stats['build']]
+        self.assertIn('add_same_worker_same_task_time', families)
+        self.assertIn('add_unavailability', families)
+        self.assertEqual(stats['search']['engine'], 'cp')
+        self.assertEqual(stats['search']['solutions'], 1)
+
+        metrics = client.get('/metrics').get_data(as_text=True)
+        self.assertIn('solver_build_seconds_count{family="add_same_worker_same_task_time"}', metrics)
+        self.assertIn('solver_solves_total{engine="cp",status="solved"}', metrics)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,291 @@
+import time
+from array import array
+from ortools.sat.python import cp_model
+
+class CpSatModel(cp_model.CpModel):
+    """
+        CP-SAT model exposing the same building interface as pywrapcp.Solver (IntVar, Add, Sum),
+        so every Constraints family can be added to either engine unchanged.
+    """
+    def IntVar(self, lower_bound, upper_bound, name):
+        return self.NewIntVar(lower_bound, upper_bound, name)
+
+    def Sum(self, expressions):
+        return cp_model.LinearExpr.Sum(list(expressions))
+
+    def Copy(self):
+        """
+            Copy of the model, the variables of this model index the same variables of the copy.
+            clone gives a plain CpModel, which only lacks the building interface of this class
+        """
+        model = self.clone()
+        model.__class__ = CpSatModel
+
+        return model
+
+class AssignmentPairs():
+    """
+        The worker/tasks of a roster as flat int arrays of worker and task indexes, in worker then task order.
+        Workers and tasks are looked up by index when a solution is read, so memory grows with the pairs
+        rather than with an object per worker/task
+    """
+    def __init__(self, workers, tasks, pairs=()):
+        self.workers = workers
+        self.tasks = tasks
+        self.worker_indexes = array('i')
+        self.task_indexes = array('i')
+
+        for i, j in pairs:
+            self.append(i, j)
+
+    def append(self, i, j):
+        self.worker_indexes.append(i)
+        self.task_indexes.append(j)
+
+    def __len__(self):
+        return len(self.worker_indexes)
+
+    def __getitem__(self, p):
+        return (self.worker_indexes[p], self.task_indexes[p])
+
+    def __iter__(self):
+        return zip(self.worker_indexes, self.task_indexes)
+
+    def get_costs(self, assignment_costs):
+        """Cost of each pair, in pair order"""
+        return array('i', (assignment_costs[i][j] for i, j in self))
+
+    def get_cost_order(self, assignment_costs):
+        """(worker_index, task_index) of every pair cheapest first, pairs of equal cost in pair order"""
+        costs = self.get_costs(assignment_costs)
+
+        return [self[p] for p in sorted(range(len(costs)), key=costs.__getitem__)]
+
+def build_assignments(model, tasks, workers, fixed={}):
+    """
+        Declare a 0/1 decision variable per worker/task on model, with the AssignmentPairs having one.
+        Rows of the variables are sparse, { [task_index] : var }: pairs fixed to 0 (see Constraints.presolve)
+        get no variable and pairs fixed to 1 a variable that can only be 1
+    """
+    assignments = []
+    assignments_ref = AssignmentPairs(workers, tasks)
+    for worker in workers:
+        worker_assignments = {}
+        for task in tasks:
+            value = fixed.get((worker.index, task.index))
+            if value == 0:
+                continue
+
+            lower_bound = 1 if value == 1 else 0
+            worker_assignments[task.index] = model.IntVar(lower_bound, 1, f'worker: , task: {task.id}')
+            assignments_ref.append(worker.index, task.index)
+        assignments.append(worker_assignments)
+
+    return (assignments, assignments_ref)
+
+def get_presolve_stats(fixed, assignments):
+    """Pairs presolve fixed to 0 or 1, and the decision variables left in the model"""
+    num_fixed_one = sum(1 for value in fixed.values() if value == 1)
+
+    return {
+        "fixedZero": len(fixed) - num_fixed_one,
+        "fixedOne": num_fixed_one,
+        "variables": sum(len(worker_assignments) for worker_assignments in assignments),
+    }
+
+def get_hinted_assignments(solution_hint, workers, tasks):
+    """
+        (worker_index, task_index) pairs assigned in a previous solutionByWorker, ignoring any
+        worker or scheduled task no longer in the request
+        solution_hint : { [worker_id] : scheduled_task_id[] }
+    """
+    if solution_hint == None:
+        return set()
+
+    worker_index_by_id = {str(w.id): w.index for w in workers}
+    task_index_by_id = {t.id: t.index for t in tasks}
+
+    return set(
+        (worker_index_by_id[str(worker_id)], task_index_by_id[task_id])
+            for worker_id, task_ids in solution_hint.items() if str(worker_id) in worker_index_by_id
+                for task_id in task_ids if task_id in task_index_by_id
+    )
+
+def get_hint_deviation(model, assignments, hinted):
+    """Number of worker/tasks assigned differently to the hinted assignments"""
+    return model.Sum(
+        (1 - assignment) if (i, j) in hinted else assignment
+            for i, worker_assignments in enumerate(assignments)
+                for j, assignment in worker_assignments.items()
+    )
+
+class CountingModel():
+    """
+        Forwards to model, counting the constraints and variables added through it
+    """
+    def __init__(self, model):
+        self.model = model
+        self.num_constraints = 0
+        self.num_variables = 0
+
+    def Add(self, constraint):
+        self.num_constraints += 1
+        return self.model.Add(constraint)
+
+    def IntVar(self, lower_bound, upper_bound, name):
+        self.num_variables += 1
+        return self.model.IntVar(lower_bound, upper_bound, name)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+def measure_build(build_stats, family, model, add):
+    """
+        Call add(model), appending its wall time and the number of constraints/variables it added
+        to build_stats (if given)
+    """
+    counting_model = CountingModel(model)
+    start = time.perf_counter()
+
+    result = add(counting_model)
+
+    if build_stats != None:
+        build_stats.append({
+            "family": family,
+            "ms": (time.perf_counter() - start) * 1000,
+            "constraints": counting_model.num_constraints,
+            "variables": counting_model.num_variables,
+        })
+
+    return result
+
+def add_constraints(model, constraints, extra_constraints, build_stats=None):
+    """
+        Add every constraint family requested in extra_constraints to model, recording each
+        family's build in build_stats
+    """
+    def add(family, add_family):
+        measure_build(build_stats, family, model, add_family)
+
+    # each task assigned it's given qty
+    add('add_task_qty_constraint', constraints.add_task_qty_constraint)
+
+    # a worker cannot work on two tasks that are on at the same time
+    add('add_same_worker_same_task_time', constraints.add_same_worker_same_task_time)
+
+    # a worker can at most be assigned to the same orderTask date once (i.e cannot take up multiple qty)
+    # maybe add any cannot work constraints
+    # maybe add any must work constraints
+    must_map = extra_constraints['mustWork'] if 'mustWork' in extra_constraints else None
+    cannot_map = extra_constraints['cannotWork'] if 'cannotWork' in extra_constraints else None
+    add('must_cannot_work', lambda m: constraints.must_cannot_work(m, must_map, cannot_map))
+
+    # add must combined must work
+    if 'combinedMustWork' in extra_constraints:
+        add('combined_must_work_all', lambda m: constraints.combined_must_work_all(m, extra_constraints['combinedMustWork']))
+
+    # add at least has to work constraint
+    if 'atLeastWork' in extra_constraints:
+        add('add_at_least_work_task', lambda m: constraints.add_at_least_work_task(m, extra_constraints['atLeastWork']))
+
+    # add total time fatigue constraints
+    if 'timeFatigueTotal' in extra_constraints:
+        add('add_time_fatigue_total', lambda m: constraints.add_time_fatigue_total(m, extra_constraints['timeFatigueTotal']))
+
+    # add total overall time fatigue constraints
+    if 'overallTimeFatigueTotal' in extra_constraints:
+        add('add_overall_total_fatigue_time', lambda m: constraints.add_overall_total_fatigue_time(m, extra_constraints['overallTimeFatigueTotal']))
+
+    # add consecutive fatigue constaints
+    if 'overallTimeFatigueConsecutive' in extra_constraints:
+        add('add_overall_consecutive_total_fatigue_time', lambda m: constraints.add_overall_consecutive_total_fatigue_time(m, extra_constraints['overallTimeFatigueConsecutive']))
+
+    # add unavailable time constraints
+    if 'unavailable' in extra_constraints:
+        add('add_unavailability', lambda m: constraints.add_unavailability(m, extra_constraints['unavailable']))
+
+    # add buddy constraints
+    if 'buddy' in extra_constraints:
+        add('add_buddy', lambda m: constraints.add_buddy(m, extra_constraints['buddy']))
+
+    # add nemesis constraints
+    if 'nemesis' in extra_constraints:
+        add('add_nemesis', lambda m: constraints.add_nemesis(m, extra_constraints['nemesis']))
+
+    # works must be assigned to at least n tasks (this could change later per worker)
+    # [model.Add(model.Sum(assignments[i][j] for j in range(num_tasks)) >= 3) for i in range(num_workers)]
+
+def get_solution(assignments_ref, is_assigned):
+    """
+        Group the assigned worker/tasks by task and by worker
+        assignments_ref : AssignmentPairs
+        is_assigned : (worker_index, task_index) => bool
+    """
+    solution_by_task = {}
+    solution_by_worker = {}
+    for i, j in assignments_ref:
+        if is_assigned(i, j):
+            worker = assignments_ref.workers[i]
+            task = assignments_ref.tasks[j]
+
+            if task.id in solution_by_task:
+                solution_by_task[task.id] = [*solution_by_task[task.id], worker.id]
+            else:
+                solution_by_task[task.id] = [worker.id]
+
+            if worker.id in solution_by_worker:
+                solution_by_worker[worker.id] = [*solution_by_worker[worker.id], task.id]
+            else:
+                solution_by_worker[worker.id] = [task.id]
+
+    return (solution_by_task, solution_by_worker)
+
+def get_solution_cost(assignment_costs, assignments_ref, is_assigned):
+    """
+        Total cost of the assigned worker/tasks
+        is_assigned : (worker_index, task_index) => bool
+    """
+    return sum(assignment_costs[i][j] for i, j in assignments_ref if is_assigned(i, j))
+
+def report_solution(on_solution, assignment_costs, assignments_ref, is_assigned):
+    """
+        Call on_solution(objective_value, solution_by_worker) with a solution found during search
+    """
+    _, solution_by_worker = get_solution(assignments_ref, is_assigned)
+
+    on_solution(get_solution_cost(assignment_costs, assignments_ref, is_assigned), solution_by_worker)
+
+def get_cost_bound(assignment_costs, assignments, tasks, fixed):
+    """
+        Lower bound on the cost of any solution: every task filled to its qty by its cheapest workers
+        (and any fixed to it), relaxing one task at a time and every other constraint
+    """
+    bound = 0
+    num_fixed_one = [0] * len(tasks)
+    costs_by_task = [[] for _ in tasks]
+    for i, worker_assignments in enumerate(assignments):
+        for j in worker_assignments:
+            if fixed.get((i, j)) == 1:
+                bound += assignment_costs[i][j]
+                num_fixed_one[j] += 1
+            else:
+                costs_by_task[j].append(assignment_costs[i][j])
+
+    for task in tasks:
+        bound += sum(sorted(costs_by_task[task.index])[:max(0, task.qty - num_fixed_one[task.index])])
+
+    return bound
+
+def get_gap(objective_value, bound):
+    """Relative gap of a solution's cost to a lower bound on it, 0 once the solution is proven optimal"""
+    if objective_value == None or bound == None:
+        return None
+
+    return (objective_value - bound) / max(1, abs(objective_value))
+
+def is_gap_reached(objective_value, bound, relative_gap=None, absolute_gap=None):
+    """Whether a solution is within either gap target given of the bound"""
+    return (
+        (absolute_gap != None and objective_value - bound <= absolute_gap) or
+        (relative_gap != None and get_gap(objective_value, bound) <= relative_gap)
+    )
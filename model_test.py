@@ -0,0 +1,39 @@
+import unittest
+import utils
+from constraints import Constraints
+from model import CpSatModel, AssignmentPairs, build_assignments, get_solution, get_solution_cost
+from benchmark.generate import generate_roster
+
+class TestModel(unittest.TestCase):
+    def test_assignment_pairs(self):
+        data = generate_roster(8, 10, constraint_mix={ 'cannotWork': 0.3 }, seed=2)
+        tasks = utils.get_tasks(data['scheduledTasks'])
+        workers = utils.get_workers(data['workers'])
+        assignment_costs = utils.get_cost_rows(data['costMatrix'], workers, tasks)
+        fixed = Constraints(tasks, workers).presolve(data['constraints'])
+
+        assignments, assignments_ref = build_assignments(CpSatModel(), tasks, workers, fixed)
+
+        # a pair for each variable, in worker then task order
+        self.assertEqual(list(assignments_ref), [(i, j) for i in range(len(workers)) for j in assignments[i]])
+        self.assertLess(len(assignments_ref), len(workers) * len(tasks))
+
+        # cheapest first, ties in pair order
+        pairs = list(assignments_ref)
+        self.assertEqual(
+            assignments_ref.get_cost_order(assignment_costs),
+            sorted(pairs, key=lambda ij: assignment_costs[ij[0]][ij[1]])
+        )
+
+        assigned = AssignmentPairs(workers, tasks, [(0, 1), (0, 3), (2, 1)])
+        solution_by_task, solution_by_worker = get_solution(assigned, lambda i, j: True)
+
+        self.assertEqual(solution_by_task, { tasks[1].id: [workers[0].id, workers[2].id], tasks[3].id: [workers[0].id] })
+        self.assertEqual(solution_by_worker, { workers[0].id: [tasks[1].id, tasks[3].id], workers[2].id: [tasks[1].id] })
+        self.assertEqual(
+            get_solution_cost(assignment_costs, assigned, lambda i, j: i == 0),
+            assignment_costs[0][1] + assignment_costs[0][3]
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from model import get_gap
+
+# strategies (solver.search_strategies) a portfolio runs by default, randomRestarts with different seeds
+default_portfolio = [
+    { "strategy": "cheapestFirst" },
+    { "strategy": "mostConstrainedTask" },
+    { "strategy": "minValueFirst" },
+    { "strategy": "randomRestarts", "seed": 1 },
+    { "strategy": "randomRestarts", "seed": 2 },
+]
+
+# shared by the pool processes of a portfolio: the best objective any strategy has found, and whether one has finished
+shared_bound = None
+finished = None
+
+# pool a portfolio's strategies run in, started once and kept for every later request (grown for a longer
+# portfolio). Its shared values are reset for each request, so only one portfolio runs on it at a time
+pool = None
+pool_size = 0
+pool_lock = threading.Lock()
+
+def init_process(bound, done):
+    """Pool initializer, handing every process the shared values"""
+    global shared_bound, finished
+
+    shared_bound = bound
+    finished = done
+
+def get_pool(size):
+    """The portfolio pool of at least size processes, with the values they share"""
+    global pool, pool_size, shared_bound, finished
+
+    if pool == None or pool_size < size:
+        if pool != None:
+            pool.shutdown()
+
+        context = multiprocessing.get_context()
+        shared_bound = context.Value('i', 2 ** 31 - 1)
+        finished = context.Value('i', 0)
+
+        pool = ProcessPoolExecutor(size, initializer=init_process, initargs=(shared_bound, finished))
+        pool_size = size
+
+    return pool
+
+def shutdown_pool():
+    with pool_lock:
+        if pool != None:
+            pool.shutdown(cancel_futures=True)
+
+atexit.register(shutdown_pool)
+
+def get_portfolio(data):
+    """
+        { strategy, seed }[] to run: default_portfolio for portfolio true, or a list of strategy names and
+        { strategy, seed } entries
+    """
+    portfolio = data['portfolio'] if isinstance(data['portfolio'], list) else default_portfolio
+
+    entries = [{ "strategy": entry } if isinstance(entry, str) else entry for entry in portfolio]
+
+    return [{ "strategy": entry['strategy'], "seed": entry['seed'] if 'seed' in entry else 0 } for entry in entries]
+
+def solve_strategy(data, with_stats):
+    """Search with one strategy in a pool process, until it or another strategy finishes"""
+    # solver runs portfolios, so only import it once running
+    from solver import solver
+
+    stats = {} if with_stats else None
+
+    solution = solver(data, should_stop=lambda: finished.value == 1, stats=stats, shared_bound=shared_bound)
+
+    # the first to finish has run out of time, proved nothing beats the best found, or found a first solution
+    finished.value = 1
+
+    return (solution, stats)
+
+def get_strategy_request(data, entry):
+    """The request searched with one strategy, already prechecked and not a flow or decomposable"""
+    return {
+        **data,
+        "searchStrategy": entry['strategy'],
+        "seed": entry['seed'] if 'seed' in entry else 0,
+        "portfolio": False,
+        "precheck": False,
+        "flow": False,
+        "decompose": False,
+    }
+
+def merge_results(entries, results):
+    """
+        The response of the strategy with the cheapest solution (the first listed on a tie), naming it as strategy.
+        bound is the best any strategy proved
+    """
+    solved = [k for k, (solution, _) in enumerate(results) if solution['status']]
+    winner = min(solved, key=lambda k: results[k][0]['objectiveValue']) if len(solved) > 0 else 0
+    solution = results[winner][0]
+
+    if len(solved) > 0:
+        bound = max(results[k][0]['bound'] for k in solved)
+        solution = { **solution, "bound": bound, "gap": get_gap(solution['objectiveValue'], bound) }
+
+    return ({ **solution, "strategy": entries[winner]['strategy'] }, winner)
+
+def portfolio_solve(data, stats=None):
+    """
+        Search the request with every strategy of the portfolio at once, each in its own process under the same
+        timeLimit. Solutions found by one tighten the objective of the rest (SharedBoundMonitor), and once one
+        finishes the others stop. Returns the best response, with the strategy that found it
+    """
+    entries = get_portfolio(data)
+
+    with pool_lock:
+        # one process each whatever numProcesses, a strategy left waiting would be stopped before it starts
+        strategy_pool = get_pool(len(entries))
+        shared_bound.value = 2 ** 31 - 1
+        finished.value = 0
+
+        futures = [
+            strategy_pool.submit(solve_strategy, get_strategy_request(data, entry), stats != None)
+                for entry in entries
+        ]
+        results = [future.result() for future in futures]
+
+    solution, winner = merge_results(entries, results)
+
+    if stats != None:
+        stats.update(results[winner][1])
+        stats['portfolio'] = [
+            {
+                **entry,
+                "status": strategy_solution['status'],
+                "objectiveValue": strategy_solution['objectiveValue'],
+                "wallTimeMs": strategy_stats['search']['wallTimeMs'],
+            }
+                for entry, (strategy_solution, strategy_stats) in zip(entries, results)
+        ]
+
+    return solution
@@ -0,0 +1,51 @@
+import unittest
+import portfolio
+from solver import solver, search_strategies, objective_step
+from benchmark.generate import generate_roster
+
+def roster():
+    return { **generate_roster(8, 10, solver_option='optimal', seed=3), 'decompose': False, 'flow': False }
+
+class TestPortfolio(unittest.TestCase):
+    def test_strategies_prove_same_optimum(self):
+        data = roster()
+        optimum = solver(data)['objectiveValue']
+
+        # optimal to within objective_step
+        for search_strategy in search_strategies:
+            stats = {}
+            solution = solver({ **data, 'searchStrategy': search_strategy }, stats=stats)
+
+            self.assertLess(abs(solution['objectiveValue'] - optimum), objective_step)
+            self.assertLessEqual(solution['bound'], min(optimum, solution['objectiveValue']))
+            self.assertEqual(stats['search']['strategy'], search_strategy)
+
+        with self.assertRaises(ValueError):
+            solver({ **data, 'searchStrategy': 'unknown' })
+
+    def test_portfolio_reports_winning_strategy(self):
+        data = roster()
+        stats = {}
+
+        solution = solver({ **data, 'portfolio': ['cheapestFirst', 'minValueFirst', { 'strategy': 'randomRestarts', 'seed': 3 }] }, stats=stats)
+
+        self.assertTrue(solution['status'])
+        self.assertLess(abs(solution['objectiveValue'] - solver(data)['objectiveValue']), objective_step)
+        self.assertIn(solution['strategy'], ['cheapestFirst', 'minValueFirst', 'randomRestarts'])
+        self.assertEqual(stats['search']['strategy'], solution['strategy'])
+        self.assertListEqual([entry['seed'] for entry in stats['portfolio']], [0, 0, 3])
+        self.assertLessEqual(solution['bound'], solution['objectiveValue'])
+
+        # the winner found the cheapest solution of every strategy
+        self.assertEqual(solution['objectiveValue'], min(
+            entry['objectiveValue'] for entry in stats['portfolio'] if entry['status']
+        ))
+
+        # later portfolios run on the same processes, from a fresh shared bound
+        pool = portfolio.pool
+        again = solver({ **data, 'portfolio': ['cheapestFirst', 'minValueFirst'] })
+        self.assertIs(portfolio.pool, pool)
+        self.assertLess(abs(again['objectiveValue'] - solution['objectiveValue']), objective_step)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,249 @@
+import time
+
+import utils
+from constraints import Constraints
+from skeletons import get_skeleton
+
+def violation(type, message, workers=[], tasks=[], **details):
+    """A violated condition: type, a readable message, and the worker ids and scheduled task ids involved"""
+    return {
+        "type": type,
+        "message": message,
+        "workers": workers,
+        "tasks": tasks,
+        **details,
+    }
+
+def get_violations(tasks, workers, extra_constraints, constraints=None):
+    """
+        Conditions no solution can meet, worked out from the parsed tasks and constraint maps without searching:
+        must work pairs the constraints rule out or that clash, tasks and overlapping times needing more workers
+        than can work them, combinedMustWork/atLeastWork with nobody left to work them, buddy/nemesis groups
+        contradicting each other or must work, and fatigue limits shorter than the tasks a worker must work.
+        Returns a list of violation (empty when nothing was found, which doesn't make the roster feasible)
+        constraints : Constraints already presolved with extra_constraints, if there is one
+    """
+    if constraints == None:
+        constraints = Constraints(tasks, workers)
+        constraints.presolve(extra_constraints)
+
+    fixed = constraints.fixed
+    num_tasks = len(tasks)
+
+    violations = []
+
+    for i, j in sorted(constraints.conflicts):
+        violations.append(violation(
+            'mustWorkConflict',
+            f'worker {workers[i].id} must work task {tasks[j].id} but is unavailable or too fatigued for it',
+            [workers[i].id],
+            [tasks[j].id],
+        ))
+
+    # a buddy on (or off) a task takes the rest of the group with them
+    must = set(pair for pair, value in fixed.items() if value == 1) | constraints.conflicts
+    cannot = set(pair for pair, value in fixed.items() if value == 0)
+
+    for group in extra_constraints['buddy'] if 'buddy' in extra_constraints else []:
+        worker_indexes = constraints.worker_indexes(group['workers'])
+        if len(worker_indexes) < 2:
+            continue
+
+        for j in constraints.task_indexes(group['tasks']):
+            on = [i for i in worker_indexes if (i, j) in must]
+            off = [i for i in worker_indexes if (i, j) in cannot]
+
+            if len(on) > 0 and len(off) > 0:
+                violations.append(violation(
+                    'buddy',
+                    f'buddies must work task {tasks[j].id} together but some of them can\'t',
+                    [workers[i].id for i in worker_indexes],
+                    [tasks[j].id],
+                ))
+            elif len(on) > 0:
+                must.update((i, j) for i in worker_indexes)
+            elif len(off) > 0:
+                cannot.update((i, j) for i in worker_indexes)
+
+    for group in extra_constraints['nemesis'] if 'nemesis' in extra_constraints else []:
+        worker_indexes = constraints.worker_indexes(group['workers'])
+
+        for j in constraints.task_indexes(group['tasks']):
+            on = [i for i in worker_indexes if (i, j) in must]
+
+            if len(on) > 1:
+                violations.append(violation(
+                    'nemesis',
+                    f'nemeses must never work task {tasks[j].id} together but must work or buddy on it',
+                    [workers[i].id for i in on],
+                    [tasks[j].id],
+                ))
+
+    must_by_task = [[] for _ in range(num_tasks)]
+    must_by_worker = [[] for _ in workers]
+    for i, j in sorted(must):
+        must_by_task[j].append(i)
+        must_by_worker[i].append(j)
+
+    # most workers can work most tasks, so keep the ones that can't
+    cannot_by_task = [set() for _ in range(num_tasks)]
+    for i, j in cannot:
+        cannot_by_task[j].add(i)
+
+    for task in tasks:
+        j = task.index
+
+        if len(must_by_task[j]) > task.qty:
+            violations.append(violation(
+                'mustWorkOverQty',
+                f'{len(must_by_task[j])} workers must work task {task.id} which only needs {task.qty}',
+                [workers[i].id for i in must_by_task[j]],
+                [task.id],
+                qty=task.qty,
+            ))
+
+        available = len(workers) - len(cannot_by_task[j])
+        if available < task.qty:
+            violations.append(violation(
+                'taskCapacity',
+                f'task {task.id} needs {task.qty} workers but only {available} can work it',
+                tasks=[task.id],
+                demand=task.qty,
+                available=available,
+            ))
+
+    # a worker works one of the tasks on at any time, so tasks on together need as many different workers
+    overlaps_found = set()
+    for task_indexes in utils.group_task_indexes_by_time_overlap(constraints.task_table):
+        demand = sum(tasks[j].qty for j in task_indexes)
+        available = len(workers) - len(set.intersection(*[cannot_by_task[j] for j in task_indexes]))
+        scheduled_task_ids = [tasks[j].id for j in sorted(task_indexes)]
+
+        if demand > available:
+            violations.append(violation(
+                'timeSlotCapacity',
+                f'tasks on at the same time need {demand} workers but only {available} can work them',
+                tasks=scheduled_task_ids,
+                demand=demand,
+                available=available,
+            ))
+
+        must_by_worker_on = {}
+        for j in sorted(task_indexes):
+            for i in must_by_task[j]:
+                must_by_worker_on.setdefault(i, []).append(j)
+
+        for i, worker_must in must_by_worker_on.items():
+            # tasks can overlap in more than one group of tasks on together
+            if len(worker_must) > 1 and (i, tuple(worker_must)) not in overlaps_found:
+                overlaps_found.add((i, tuple(worker_must)))
+                violations.append(violation(
+                    'mustWorkOverlap',
+                    f'worker {workers[i].id} must work tasks on at the same time',
+                    [workers[i].id],
+                    [tasks[j].id for j in worker_must],
+                ))
+
+    for group in extra_constraints['combinedMustWork'] if 'combinedMustWork' in extra_constraints else []:
+        worker_indexes = constraints.worker_indexes(group['workers'])
+
+        for j in constraints.task_indexes(group['tasks']):
+            if len(worker_indexes) > 0 and all(i in cannot_by_task[j] for i in worker_indexes):
+                violations.append(violation(
+                    'combinedMustWork',
+                    f'one of a group must work task {tasks[j].id} but none of them can',
+                    [workers[i].id for i in worker_indexes],
+                    [tasks[j].id],
+                ))
+
+    if 'atLeastWork' in extra_constraints:
+        for worker_id, task_ids in extra_constraints['atLeastWork'].items():
+            for i in constraints.worker_indexes([worker_id]):
+                for task_id, task_indexes in constraints.task_indexes_by_task_id.items():
+                    if str(task_id) in task_ids and all(i in cannot_by_task[j] for j in task_indexes):
+                        violations.append(violation(
+                            'atLeastWork',
+                            f'worker {workers[i].id} must work task {task_id} at least once but can\'t work any of it',
+                            [workers[i].id],
+                            [tasks[j].id for j in task_indexes],
+                        ))
+
+    duration = constraints.task_table.duration
+
+    if 'timeFatigueTotal' in extra_constraints:
+        for worker_id, fatigue_totals in extra_constraints['timeFatigueTotal'].items():
+            for i in constraints.worker_indexes([worker_id]):
+                for fatigue_total in fatigue_totals:
+                    for task_id in fatigue_total['tasks']:
+                        task_indexes = [j for j in constraints.task_indexes_by_task_id.get(task_id, []) if (i, j) in must]
+                        total = sum(duration[j] for j in task_indexes)
+
+                        if total > fatigue_total['limit']:
+                            violations.append(violation(
+                                'timeFatigueTotal',
+                                f'worker {workers[i].id} must work {total} mins of task {task_id}, over their limit of {fatigue_total["limit"]}',
+                                [workers[i].id],
+                                [tasks[j].id for j in task_indexes],
+                                limit=fatigue_total['limit'],
+                                total=total,
+                            ))
+
+    # keyed by worker index, as in add_overall_total_fatigue_time
+    if 'overallTimeFatigueTotal' in extra_constraints:
+        for i, worker in enumerate(workers):
+            if str(worker.index) in extra_constraints['overallTimeFatigueTotal']:
+                limit = extra_constraints['overallTimeFatigueTotal'][str(worker.index)]['limit']
+                total = sum(duration[j] for j in must_by_worker[i])
+
+                if total > limit:
+                    violations.append(violation(
+                        'overallTimeFatigueTotal',
+                        f'worker {worker.id} must work {total} mins, over their limit of {limit}',
+                        [worker.id],
+                        [tasks[j].id for j in must_by_worker[i]],
+                        limit=limit,
+                        total=total,
+                    ))
+
+    return violations
+
+def precheck(data, stats=None):
+    """
+        The response for a request get_violations finds can't be solved, listing its violations. None if
+        nothing was found, to go on and search
+    """
+    start = time.perf_counter()
+
+    # the presolve is the one the solve goes on to use
+    skeleton, _, _ = get_skeleton(data)
+    violations = get_violations(skeleton.tasks, skeleton.workers, skeleton.extra_constraints, skeleton.constraints)
+
+    if len(violations) == 0:
+        return None
+
+    print('violations', len(violations))
+
+    if stats != None:
+        stats['build'] = []
+        stats['buildMs'] = 0
+        stats['presolve'] = { "fixedZero": 0, "fixedOne": 0, "variables": 0 }
+        stats['symmetry'] = { "classes": 0, "workers": 0 }
+        stats['search'] = {
+            "engine": "precheck",
+            "branches": 0,
+            "failures": 0,
+            "solutions": 0,
+            "restarts": 0,
+            "wallTimeMs": (time.perf_counter() - start) * 1000,
+        }
+
+    return {
+        "status": False,
+        "solutionByTask": None,
+        "solutionByWorker": None,
+        "objectiveValue": None,
+        "bound": None,
+        "gap": None,
+        "engine": "precheck",
+        "violations": violations,
+    }
@@ -0,0 +1,84 @@
+import unittest
+import utils
+from precheck import get_violations
+from solver import solver
+from benchmark.generate import generate_roster
+
+whole_day = { 'range': { 'startTime': { 'hour': 0, 'min': 0 }, 'endTime': { 'hour': 23, 'min': 0 } } }
+
+def roster():
+    return generate_roster(10, 12, constraint_mix={}, solver_option='cpsat', seed=0)
+
+def violation_types(data):
+    tasks = utils.get_tasks(data['scheduledTasks'])
+    workers = utils.get_workers(data['workers'])
+
+    return [violation['type'] for violation in get_violations(tasks, workers, data['constraints'])]
+
+class TestPrecheck(unittest.TestCase):
+    def test_feasible_roster_has_no_violations(self):
+        data = roster()
+
+        self.assertListEqual(violation_types(data), [])
+        self.assertTrue(solver(data)['status'])
+
+    def test_capacity(self):
+        data = roster()
+        data['constraints']['unavailable'] = { str(i): whole_day for i in range(9) }
+
+        types = violation_types(data)
+
+        # a single worker left can't fill a qty 2 task, or two tasks on at once
+        self.assertIn('timeSlotCapacity', types)
+        if any(scheduled_task['task']['qty'] > 1 for scheduled_task in data['scheduledTasks']):
+            self.assertIn('taskCapacity', types)
+
+    def test_must_work(self):
+        data = roster()
+        scheduled_task = data['scheduledTasks'][0]
+        task_id = str(scheduled_task['task']['id'])
+        data['constraints']['mustWork'] = { '0': [task_id] }
+        data['constraints']['unavailable'] = { '0': whole_day }
+
+        self.assertIn('mustWorkConflict', violation_types(data))
+
+        data['constraints']['unavailable'] = {}
+        data['constraints']['overallTimeFatigueTotal'] = { '0': { 'limit': 5 } }
+
+        self.assertIn('overallTimeFatigueTotal', violation_types(data))
+
+    def test_buddy_nemesis(self):
+        data = roster()
+        task_id = data['scheduledTasks'][0]['task']['id']
+        data['constraints']['mustWork'] = { '0': [str(task_id)] }
+        data['constraints']['buddy'] = [{ 'workers': [0, 1], 'tasks': [task_id] }]
+        data['constraints']['nemesis'] = [{ 'workers': [0, 1], 'tasks': [task_id] }]
+
+        self.assertIn('nemesis', violation_types(data))
+
+        # the buddy can't work the task
+        data['constraints']['nemesis'] = []
+        data['constraints']['cannotWork'] = { '1': [str(task_id)] }
+
+        self.assertIn('buddy', violation_types(data))
+
+    def test_solver_answers_without_searching(self):
+        data = roster()
+        data['constraints']['unavailable'] = { str(i): whole_day for i in range(9) }
+        stats = {}
+
+        solution = solver(data, stats=stats)
+
+        self.assertFalse(solution['status'])
+        self.assertEqual(solution['engine'], 'precheck')
+        self.assertEqual(stats['search']['engine'], 'precheck')
+        self.assertGreater(len(solution['violations']), 0)
+
+        # turned off, the search finds out for itself
+        solution = solver({ **data, 'precheck': False })
+
+        self.assertFalse(solution['status'])
+        self.assertNotIn('violations', solution)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import utils
+from constraints import Constraints
+from model import CpSatModel, build_assignments, add_constraints, measure_build
+
+# parts of a request the model is built from, everything else (costMatrix, hints, limits) can change between solves
+structure_keys = ['workers', 'scheduledTasks', 'constraints']
+
+# skeletons kept per process, a CP-SAT skeleton of a large roster is a lot of memory
+default_max_skeletons = 8
+
+def structure_key(data):
+    """
+        Hash of the structural part of a request. Unlike cache.request_key nothing is reordered,
+        decision variables are by worker and task position
+    """
+    structure = { key: data[key] for key in structure_keys if key in data }
+    canonical = json.dumps(structure, sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class Skeleton():
+    """
+        Everything built from the structure of a request: the parsed tasks and workers, Constraints with
+        its presolve (fixed pairs, overlap groups and consecutive fatigue paths), and once asked for,
+        the CP-SAT model of the decision variables and every constraint, without an objective or hints
+    """
+    def __init__(self, data, build_stats=None):
+        self.extra_constraints = data['constraints'] if 'constraints' in data else {}
+        self.tasks = utils.get_tasks(data['scheduledTasks'])
+        self.workers = utils.get_workers(data['workers'])
+
+        self.constraints = measure_build(build_stats, 'Constraints', None, lambda m: Constraints(self.tasks, self.workers))
+
+        # worker/tasks the constraints already decide don't need a decision variable
+        self.fixed = measure_build(build_stats, 'presolve', None, lambda m: self.constraints.presolve(self.extra_constraints))
+
+        self.cpsat = None
+        self.lock = threading.Lock()
+
+    def get_constraints(self):
+        """The presolved Constraints, for a solve to set its own assignments on"""
+        return copy.copy(self.constraints)
+
+    def get_cpsat_model(self, build_stats=None):
+        """
+            (model, assignments, assignments_ref, hit) of a copy of the CP-SAT skeleton, building it on first use
+            (hit false). The variables index the same variables of every copy
+        """
+        with self.lock:
+            hit = self.cpsat != None
+            if not hit:
+                model = CpSatModel()
+
+                assignments, assignments_ref = measure_build(
+                    build_stats,
+                    'build_assignments',
+                    model,
+                    lambda m: build_assignments(m, self.tasks, self.workers, self.fixed)
+                )
+
+                constraints = self.get_constraints()
+                constraints.set_assignments(None, assignments, assignments_ref)
+                add_constraints(model, constraints, self.extra_constraints, build_stats)
+
+                self.cpsat = (model, assignments, assignments_ref)
+
+        model, assignments, assignments_ref = self.cpsat
+
+        return (measure_build(build_stats, 'copy_skeleton', None, lambda m: model.Copy()), assignments, assignments_ref, hit)
+
+class Skeletons():
+    """
+        Skeletons by structure_key, least recently used dropped past max_size. Requests that only change
+        costMatrix (or hints and limits) share one, so only the objective and search order are built again
+    """
+    def __init__(self, max_size=default_max_skeletons):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, data, build_stats=None):
+        """Returns (skeleton, key, hit), building the skeleton on a miss"""
+        key = structure_key(data)
+
+        with self.lock:
+            skeleton = self.entries.get(key)
+            if skeleton != None:
+                self.entries.move_to_end(key)
+                return (skeleton, key, True)
+
+        skeleton = Skeleton(data, build_stats)
+
+        with self.lock:
+            self.entries[key] = skeleton
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        return (skeleton, key, False)
+
+skeletons = Skeletons()
+
+def get_skeleton(data, build_stats=None):
+    """
+        The skeleton of a request, shared with earlier requests of the same structure
+        unless skeletonCache is false
+    """
+    use_cache = data['skeletonCache'] if 'skeletonCache' in data else True
+    if not use_cache:
+        return (Skeleton(data, build_stats), None, False)
+
+    return skeletons.get(data, build_stats)
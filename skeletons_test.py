@@ -0,0 +1,55 @@
+import random
+import unittest
+from skeletons import structure_key, Skeletons
+from solver import solver
+from benchmark.generate import generate_roster
+
+def with_costs(data, seed):
+    rand = random.Random(seed)
+
+    return {
+        **data,
+        "costMatrix": { worker_id: { task_id: rand.randrange(100) for task_id in costs } for worker_id, costs in data['costMatrix'].items() },
+    }
+
+class TestSkeletons(unittest.TestCase):
+    def test_structure_key(self):
+        data = generate_roster(10, 12, solver_option='cpsat', seed=0)
+
+        self.assertEqual(structure_key(data), structure_key({ **with_costs(data, 1), 'timeLimit': 1 }))
+        self.assertNotEqual(structure_key(data), structure_key({ **data, 'workers': data['workers'][::-1] }))
+        self.assertNotEqual(structure_key(data), structure_key({ **data, 'constraints': {} }))
+
+        skeletons = Skeletons(max_size=1)
+        skeleton, _, hit = skeletons.get(data)
+        self.assertFalse(hit)
+        self.assertIs(skeletons.get(with_costs(data, 1))[0], skeleton)
+        self.assertTrue(skeletons.get(data)[2])
+
+        # least recently used dropped
+        skeletons.get({ **data, 'constraints': {} })
+        self.assertFalse(skeletons.get(data)[2])
+
+    def test_changed_costs_reuse_skeleton(self):
+        data = { **generate_roster(12, 15, solver_option='cpsat', seed=1), 'decompose': False }
+
+        for seed in range(3):
+            request = with_costs(data, seed)
+            stats = {}
+
+            solution = solver(request, stats=stats)
+            uncached_solution = solver({ **request, 'skeletonCache': False })
+
+            self.assertEqual(solution['objectiveValue'], uncached_solution['objectiveValue'])
+            if seed > 0:
+                self.assertTrue(stats['skeleton']['hit'])
+                # constraint families aren't added again
+                self.assertNotIn('add_task_qty_constraint', [family['family'] for family in stats['build']])
+
+        # a hint penalty only changes the objective of the copy it's solved on
+        hinted_solution = solver({ **data, 'solutionHint': solution['solutionByWorker'], 'hintPenalty': 1000 })
+        self.assertTrue(hinted_solution['status'])
+        self.assertEqual(solver(data)['objectiveValue'], solver({ **data, 'skeletonCache': False })['objectiveValue'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,140 +1,331 @@
 import json
+import random
+import time
 
-import copy
-from collections import namedtuple
 from ortools.constraint_solver import pywrapcp
 
 import utils
-from constraints import Constraints
-
-Worker_task = namedtuple('Worker_task', ['worker', 'task'])
+from skeletons import get_skeleton
+from model import (
+    build_assignments,
+    add_constraints,
+    measure_build,
+    get_solution,
+    get_solution_cost,
+    report_solution,
+    get_hinted_assignments,
+    get_hint_deviation,
+    get_presolve_stats,
+    get_cost_bound,
+    get_gap,
+    is_gap_reached,
+)
+from cpsat_solver import cpsat_solver
+from decompose import get_components, is_pool_process, should_decompose, decomposed_solve
+from flow_solver import flow_solver
+from greedy_solver import greedy_solver
+from lns_solver import lns_solver
+from precheck import precheck
+from portfolio import portfolio_solve
 
 min_num_allocations_per_worker = 3
 
-def solver(data):
+# each solution found when optimising must improve on the last by at least this much
+objective_step = 5
+
+# orders the cp engine can search worker/tasks in (searchStrategy):
+#   cheapestFirst - cheapest worker/tasks first, assigned if they can be
+#   mostConstrainedTask - tasks with the fewest workers to spare first, cheapest of them first
+#   randomRestarts - cheapest first by costs randomly scaled (seed), restarting the search ever more rarely
+#   minValueFirst - most expensive worker/tasks first, left unassigned if they can be
+search_strategies = ['cheapestFirst', 'mostConstrainedTask', 'randomRestarts', 'minValueFirst']
+
+# randomRestarts scales each cost by up to this fraction either way
+random_cost_noise = 0.5
+
+# failures before the first restart of randomRestarts, later ones follow the Luby sequence
+luby_restart_scale = 100
+
+class SolutionMonitor(pywrapcp.SearchMonitor):
+    """
+        Search monitor passing every solution found on to on_solution(objective_value, solution_by_worker)
+    """
+    def __init__(self, solver, on_solution, assignment_costs, assignments, assignments_ref):
+        super().__init__(solver)
+        self.on_solution = on_solution
+        self.assignment_costs = assignment_costs
+        self.assignments = assignments
+        self.assignments_ref = assignments_ref
+
+    def AtSolution(self):
+        report_solution(
+            self.on_solution,
+            self.assignment_costs,
+            self.assignments_ref,
+            lambda i, j: self.assignments[i][j].Value() == 1
+        )
+
+        return False
+
+class GapMonitor(pywrapcp.SearchMonitor):
+    """
+        Search monitor noting once a solution is within the relativeGap/absoluteGap targets of the cost bound
+    """
+    def __init__(self, solver, total_cost, bound, relative_gap, absolute_gap):
+        super().__init__(solver)
+        self.total_cost = total_cost
+        self.bound = bound
+        self.relative_gap = relative_gap
+        self.absolute_gap = absolute_gap
+        self.reached = False
+
+    def AtSolution(self):
+        self.reached = is_gap_reached(self.total_cost.Value(), self.bound, self.relative_gap, self.absolute_gap)
+
+        return False
+
+class SharedBoundMonitor(pywrapcp.SearchMonitor):
+    """
+        Search monitor lowering shared_bound (a multiprocessing.Value of the best objective found by searches
+        of the same request in other processes) to every solution found
+    """
+    def __init__(self, solver, total_cost, shared_bound):
+        super().__init__(solver)
+        self.total_cost = total_cost
+        self.shared_bound = shared_bound
+
+    def AtSolution(self):
+        with self.shared_bound.get_lock():
+            self.shared_bound.value = min(self.shared_bound.value, self.total_cost.Value())
+
+        return False
+
+class SharedBoundBuilder(pywrapcp.PyDecisionBuilder):
+    """
+        Decision builder making the decisions of decision_builder only where they could beat shared_bound by
+        objective_step, so the search prunes on solutions other processes find as it does on its own.
+        A fail in a search monitor escapes the search, so the bound is set here
+    """
+    def __init__(self, decision_builder, total_cost, shared_bound):
+        super().__init__()
+        self.decision_builder = decision_builder
+        self.total_cost = total_cost
+        self.shared_bound = shared_bound
+
+    def Next(self, solver):
+        self.total_cost.SetMax(min(self.total_cost.Max(), self.shared_bound.value - objective_step))
+
+        return self.decision_builder.NextWrapper(solver)
+
+class RestartMonitor(pywrapcp.SearchMonitor):
+    """
+        Search monitor counting search restarts
+    """
+    def __init__(self, solver):
+        super().__init__(solver)
+        self.restarts = 0
+
+    def RestartSearch(self):
+        self.restarts += 1
+
+def solver(data, on_solution=None, should_stop=None, stats=None, shared_bound=None):
+    """
+        on_solution : (objective_value, solution_by_worker) => void, called for every solution found
+        should_stop : () => bool, polled during search to cancel it (returning the best solution so far)
+        stats : dict to fill with the build time and size of each constraint family (build, buildMs)
+            and the search statistics (search)
+        shared_bound : multiprocessing.Value of the best objective found by searches of the same request in
+            other processes, for the cp engine to improve on (see portfolio)
+        Responses include bound, a lower bound on the cost of any solution, and gap, the relative gap of
+        objectiveValue to it. Optimising stops early once within relativeGap or absoluteGap of the bound, if given
+    """
+    # conditions no solution can meet are answered straight away (with the violations found), without searching
+    use_precheck = data['precheck'] if 'precheck' in data else True
+    if use_precheck:
+        solution = precheck(data, stats)
+        if solution != None:
+            return solution
+
+    # a greedy first solution, built without searching. Greedy can miss a solution searching finds,
+    # so search for a first one then
+    if data['solverOption'] == 'fast':
+        solution = greedy_solver(data, on_solution, stats)
+        if solution['status']:
+            return solution
+
+        data = { **data, 'solverOption': 'noOptimisation' }
+
+    # workers and tasks that never interact are solved as separate requests, side by side.
+    # on_solution/should_stop follow a single search, so leave those requests whole
+    if should_decompose(data) and on_solution == None and should_stop == None:
+        components = [
+            component for component in get_components(
+                utils.get_tasks(data['scheduledTasks']),
+                utils.get_workers(data['workers']),
+                data['constraints'] if 'constraints' in data else {}
+            )
+            # workers that can't do any task have nothing to solve
+            if len(component[1]) > 0
+        ]
+
+        if len(components) > 1:
+            return decomposed_solve(data, components, stats)
+
+    # qty and one task at a time alone (with pairs fixed by must/cannot/unavailable) is a min cost flow,
+    # solved to optimality without searching. A first solution keeps to the CP search unless flow is set
+    use_flow = data['flow'] if 'flow' in data else data['solverOption'] != 'noOptimisation'
+    if use_flow:
+        solution = flow_solver(data, on_solution, stats)
+        if solution != None:
+            return solution
+
+    # start searching from a greedy solution, unless there's a previous one
+    greedy_hint = data['greedyHint'] if 'greedyHint' in data else False
+    if greedy_hint and ('solutionHint' not in data or data['solutionHint'] == None):
+        solution = greedy_solver(data)
+        if solution['status']:
+            data = { **data, 'solutionHint': solution['solutionByWorker'] }
+
+    # several search strategies side by side in their own processes, sharing the best objective found.
+    # on_solution/should_stop follow a single search, so leave those to the one strategy, as does a
+    # request already solved in a pool process
+    portfolio = data['portfolio'] if 'portfolio' in data else False
+    if portfolio and on_solution == None and should_stop == None and not is_pool_process() and data['solverOption'] not in ['cpsat', 'lns']:
+        return portfolio_solve(data, stats)
+
+    # CP-SAT engine builds the same model, but searches with multiple workers
+    if data['solverOption'] == 'cpsat':
+        return cpsat_solver(data, on_solution, should_stop, stats)
+
+    # large neighbourhood search re-optimises part of the roster at a time on the CP-SAT model
+    if data['solverOption'] == 'lns':
+        return lns_solver(data, on_solution, should_stop, stats)
+
     # initialise solver
     solver = pywrapcp.Solver("allocations")
 
-    tasks = utils.get_tasks(data['scheduledTasks'])
-    workers = utils.get_workers(data['workers'])
-
     cost_matrix = data['costMatrix']
     solver_option = data['solverOption']
     time_limit = data['timeLimit']
     extra_constraints = data['constraints'] if 'constraints' in data else {}
+    solution_hint = data['solutionHint'] if 'solutionHint' in data else None
+    hint_penalty = data['hintPenalty'] if 'hintPenalty' in data else 0
+    relative_gap = data['relativeGap'] if 'relativeGap' in data else None
+    absolute_gap = data['absoluteGap'] if 'absoluteGap' in data else None
+    # a first solution doesn't need symmetry broken, proving one optimal does
+    symmetry_breaking = data['symmetryBreaking'] if 'symmetryBreaking' in data else solver_option != 'noOptimisation'
+    search_strategy = data['searchStrategy'] if 'searchStrategy' in data else 'cheapestFirst'
+    seed = data['seed'] if 'seed' in data else 0
+
+    if search_strategy not in search_strategies:
+        raise ValueError(f'unknown searchStrategy {search_strategy}')
 
     print('solver_option', solver_option)
 
-    num_tasks = len(tasks)
-    num_workers = len(workers)
-
-    # declare decision variables and a reference matrix
-    assignment_costs = []
-    assignments = []
-    assignments_ref = []
-    for worker in workers:
-        worker_assignments = []
-        worker_assignments_ref = []
-        worker_assignment_costs = []
-        for task in tasks:
-            worker_assignments.append(solver.IntVar(0, 1, f'worker: , task: {task.id}'))
-            worker_assignments_ref.append(Worker_task(worker, task))
-            worker_assignment_costs.append(cost_matrix[str(worker.id)][task.id])
-        assignments.append(worker_assignments)
-        assignments_ref.append(worker_assignments_ref)
-        assignment_costs.append(worker_assignment_costs)
-
-    constraints = Constraints(
-        tasks,
-        workers,
-        assignment_costs,
-        assignments,
-        assignments_ref,
-    )
-
-    # objective
-
+    build_stats = [] if stats != None else None
 
-    # Only add objective if optimisation requested
-    if solver_option != 'noOptimisation':
-        total_cost = solver.IntVar(0, 3000, "total_cost")
+    # tasks, workers and the presolved Constraints, shared with earlier requests of the same structure
+    skeleton, skeleton_key, skeleton_hit = get_skeleton(data, build_stats)
+    tasks = skeleton.tasks
+    workers = skeleton.workers
+    constraints = skeleton.get_constraints()
 
-        solver.Add(
-            total_cost == solver.Sum(
-                [assignment_costs[i][j] * assignments[i][j] for i in range(num_workers) for j in range(num_tasks)]))
+    num_workers = len(workers)
 
-        objective = solver.Minimize(total_cost, 5)
+    # worker/tasks the constraints already decide don't need a decision variable
+    fixed = skeleton.fixed
 
-    # constraints
+    # cost of every worker/task by index, whichever format costMatrix came in
+    assignment_costs = measure_build(
+        build_stats,
+        'get_cost_rows',
+        solver,
+        lambda m: utils.get_cost_rows(cost_matrix, workers, tasks)
+    )
 
-    # each task assigned it's given qty
-    constraints.add_task_qty_constraint(solver)
+    # declare decision variables and the worker/task pairs having one
+    assignments, assignments_ref = measure_build(
+        build_stats,
+        'build_assignments',
+        solver,
+        lambda m: build_assignments(m, tasks, workers, fixed)
+    )
 
-    # a worker cannot work on two tasks that are on at the same time
-    constraints.add_same_worker_same_task_time(solver)
+    constraints.set_assignments(assignment_costs, assignments, assignments_ref)
 
-    # a worker can at most be assigned to the same orderTask date once (i.e cannot take up multiple qty)
-    # maybe add any cannot work constraints
-    # maybe add any must work constraints
-    must_map = extra_constraints['mustWork'] if 'mustWork' in extra_constraints else None
-    cannot_map = extra_constraints['cannotWork'] if 'cannotWork' in extra_constraints else None
-    constraints.must_cannot_work(solver, must_map, cannot_map)
+    # previous solution to start the search from
+    hinted = get_hinted_assignments(solution_hint, workers, tasks)
 
-    # add must combined must work
-    if 'combinedMustWork' in extra_constraints:
-        constraints.combined_must_work_all(solver, extra_constraints['combinedMustWork'])
+    # objective
 
-    # add at least has to work constraint
-    if 'atLeastWork' in extra_constraints:
-        constraints.add_at_least_work_task(solver, extra_constraints['atLeastWork'])
 
-    # add total time fatigue constraints
-    if 'timeFatigueTotal' in extra_constraints:
-        constraints.add_time_fatigue_total(solver, extra_constraints['timeFatigueTotal'])
+    # Only add objective if optimisation requested
+    if solver_option != 'noOptimisation':
+        total_cost = solver.IntVar(0, 3000, "total_cost")
 
-    # add total overall time fatigue constraints
-    if 'overallTimeFatigueTotal' in extra_constraints:
-        constraints.add_overall_total_fatigue_time(solver, extra_constraints['overallTimeFatigueTotal'])
+        cost = solver.Sum([
+            assignment_costs[i][j] * assignment
+                for i, worker_assignments in enumerate(assignments)
+                    for j, assignment in worker_assignments.items()
+        ])
 
-    # add consecutive fatigue constaints
-    if 'overallTimeFatigueConsecutive' in extra_constraints:
-        constraints.add_overall_consecutive_total_fatigue_time(solver, extra_constraints['overallTimeFatigueConsecutive'])
+        # optionally penalise every change from the previous solution
+        if len(hinted) > 0 and hint_penalty > 0:
+            cost = cost + hint_penalty * get_hint_deviation(solver, assignments, hinted)
 
-    # add unavailable time constraints
-    if 'unavailable' in extra_constraints:
-        constraints.add_unavailability(solver, extra_constraints['unavailable'])
+        solver.Add(total_cost == cost)
 
-    # add buddy constraints
-    if 'buddy' in extra_constraints:
-        constraints.add_buddy(solver, extra_constraints['buddy'])
+        objective = solver.Minimize(total_cost, objective_step)
 
-    # add nemesis constraints
-    if 'nemesis' in extra_constraints:
-        constraints.add_nemesis(solver, extra_constraints['nemesis'])
+    # constraints
+    add_constraints(solver, constraints, extra_constraints, build_stats)
 
-    # works must be assigned to at least n tasks (this could change later per worker)
-    # [solver.Add(solver.Sum(assignments[i][j] for j in range(num_tasks)) >= 3) for i in range(num_workers)]
+    # every task filled by its cheapest workers
+    bound = get_cost_bound(assignment_costs, assignments, tasks, fixed)
 
+    # only search one order of interchangeable workers
+    worker_classes = constraints.get_worker_classes(extra_constraints, hinted) if symmetry_breaking else []
+    measure_build(build_stats, 'add_symmetry_breaking', solver, lambda m: constraints.add_symmetry_breaking(m, worker_classes))
 
     # Create the decision builder.
 
     # Want to sort the decision variables by least cost to the solution
 
     if solver_option != 'noOptimisation':
-        assignment_ref_copy = copy.deepcopy(assignments_ref)
-        assignment_ref_copy_flat = [assignment_ref_copy[i][j] for i in range(num_workers) for j in range(num_tasks)]
         # Sort by least cost
-        assignment_ref_copy_flat.sort(key=lambda wrk_tsk: cost_matrix[str(wrk_tsk.worker.id)][wrk_tsk.task.id])
-        # map to assignment vars
-        assignments_flat = [assignments[ref.worker.index][ref.task.index] for ref in assignment_ref_copy_flat]
+        flat_indexes = assignments_ref.get_cost_order(assignment_costs)
     else:
-        assignments_flat = [assignments[i][j] for i in range(num_workers) for j in range(num_tasks)]
-
-    db = solver.Phase(
-        assignments_flat,
-        solver.CHOOSE_FIRST_UNBOUND,
-        solver.ASSIGN_MAX_VALUE
-    )
+        flat_indexes = [(i, j) for i in range(num_workers) for j in assignments[i]]
+
+    if search_strategy == 'mostConstrainedTask':
+        # workers a task could have beyond its qty, a stable sort keeps the cheapest of each task first
+        spare_workers = [-task.qty for task in tasks]
+        for (i, j) in flat_indexes:
+            spare_workers[j] += 1
+        flat_indexes.sort(key=lambda ij: spare_workers[ij[1]])
+    elif search_strategy == 'minValueFirst':
+        flat_indexes.reverse()
+    elif search_strategy == 'randomRestarts':
+        # cheapest first give or take random_cost_noise of each cost
+        rand = random.Random(seed)
+        noise = { ij: 1 + rand.uniform(-random_cost_noise, random_cost_noise) for ij in flat_indexes }
+        flat_indexes.sort(key=lambda ij: assignment_costs[ij[0]][ij[1]] * noise[ij])
+
+    # Try the previous solution first, search then only has to repair what no longer fits
+    if len(hinted) > 0 and search_strategy != 'minValueFirst':
+        flat_indexes = [ij for ij in flat_indexes if ij in hinted] + [ij for ij in flat_indexes if ij not in hinted]
+
+    # map to assignment vars
+    assignments_flat = [assignments[i][j] for (i, j) in flat_indexes]
+
+    if search_strategy == 'minValueFirst':
+        db = solver.Phase(assignments_flat, solver.CHOOSE_FIRST_UNBOUND, solver.ASSIGN_MIN_VALUE)
+    else:
+        db = solver.Phase(
+            assignments_flat,
+            solver.CHOOSE_FIRST_UNBOUND,
+            solver.ASSIGN_MAX_VALUE
+        )
 
     # Create solution collector depending on solver option requested
     if (solver_option == 'optimise' and time_limit != None) or solver_option == 'optimal':
@@ -149,75 +340,121 @@ def solver(data):
 
     monitor.RestartSearch()
 
+    # Hooks for callers following or cancelling the search
+    hooks = []
+    if on_solution != None:
+        hooks.append(SolutionMonitor(solver, on_solution, assignment_costs, assignments, assignments_ref))
+    if should_stop != None:
+        hooks.append(solver.CustomLimit(should_stop))
+    if solver_option != 'noOptimisation' and (relative_gap != None or absolute_gap != None):
+        gap_monitor = GapMonitor(solver, total_cost, bound, relative_gap, absolute_gap)
+        hooks.append(gap_monitor)
+        hooks.append(solver.CustomLimit(lambda: gap_monitor.reached))
+    if solver_option != 'noOptimisation' and shared_bound != None:
+        db = SharedBoundBuilder(db, total_cost, shared_bound)
+        hooks.append(SharedBoundMonitor(solver, total_cost, shared_bound))
+    if search_strategy == 'randomRestarts':
+        hooks.append(solver.LubyRestart(luby_restart_scale))
+    if stats != None:
+        restart_monitor = RestartMonitor(solver)
+        hooks.append(restart_monitor)
+
     # Set time limit if given
     if solver_option == 'optimise' and time_limit != None:
         print('time_limit', time_limit)
         solver_time_limit = solver.TimeLimit(time_limit * 60 * 1000)
 
+    search_start = time.perf_counter()
+
     # Solve appropriately
     if solver_option == 'optimal':
         collector.AddObjective(total_cost)
-        status = solver.Solve(db, [objective, collector, monitor])
+        status = solver.Solve(db, [objective, collector, monitor, *hooks])
     elif solver_option == 'optimise' and time_limit != None:
         collector.AddObjective(total_cost)
-        status = solver.Solve(db, [objective, collector, solver_time_limit, monitor])
+        status = solver.Solve(db, [objective, collector, solver_time_limit, monitor, *hooks])
     else:
-        status = solver.Solve(db, [collector])
+        status = solver.Solve(db, [collector, *hooks])
+
+    search_ms = (time.perf_counter() - search_start) * 1000
+
+    # an optimising search that ran to the end proved no solution improves by objective_step or more
+    searched_all = (
+        (solver_option == 'optimal' or (solver_option == 'optimise' and time_limit != None and search_ms < time_limit * 60 * 1000)) and
+        not any(hook.Crossed() for hook in hooks if isinstance(hook, pywrapcp.SearchLimit))
+    )
 
     print("Time:", solver.WallTime(), "ms")
     print('status', status)
 
+    if stats != None:
+        stats['build'] = build_stats
+        stats['buildMs'] = sum(family['ms'] for family in build_stats)
+        stats['presolve'] = get_presolve_stats(fixed, assignments)
+        stats['symmetry'] = {
+            "classes": len(worker_classes),
+            "workers": sum(len(worker_class) for worker_class in worker_classes),
+        }
+        stats['skeleton'] = { "key": skeleton_key, "hit": skeleton_hit }
+        stats['search'] = {
+            "engine": "cp",
+            "strategy": search_strategy,
+            "branches": solver.Branches(),
+            "failures": solver.Failures(),
+            "solutions": solver.Solutions(),
+            "restarts": restart_monitor.restarts,
+            "wallTimeMs": search_ms,
+        }
+
     # If solution found, collect all assignments
     if status:
-        solution_by_task = {}
-        solution_by_worker = {}
-        for i in range(num_workers):
-            for j in range(num_tasks):
-                if collector.Value(0, assignments[i][j]) == 1:
-                    worker_task = assignments_ref[i][j]
-                    # Group solution by worker and task
-
-                    if worker_task.task.id in solution_by_task:
-                        solution_by_task[worker_task.task.id] = [*solution_by_task[worker_task.task.id], worker_task.worker.id]
-                    else:
-                        solution_by_task[worker_task.task.id] = [worker_task.worker.id]
-
-                    if worker_task.worker.id in solution_by_worker:
-                        solution_by_worker[worker_task.worker.id] = [*solution_by_worker[worker_task.worker.id], worker_task.task.id]
-                    else:
-                        solution_by_worker[worker_task.worker.id] = [worker_task.task.id]
-
-        if solver_option == 'optimal' or (solver_option == 'optimise' and time_limit != None):
+        solution_by_task, solution_by_worker = get_solution(
+            assignments_ref,
+            lambda i, j: collector.Value(0, assignments[i][j]) == 1
+        )
+
+        if len(hinted) > 0 and hint_penalty > 0:
+            # objective includes the hint penalty, report the cost alone
+            objective_value = get_solution_cost(
+                assignment_costs,
+                assignments_ref,
+                lambda i, j: collector.Value(0, assignments[i][j]) == 1
+            )
+        elif solver_option == 'optimal' or (solver_option == 'optimise' and time_limit != None):
             objective_value = collector.ObjectiveValue(0)
         else:
-            objective_value = get_non_optimised_cost(cost_matrix, solution_by_task)
+            objective_value = get_solution_cost(
+                assignment_costs,
+                assignments_ref,
+                lambda i, j: collector.Value(0, assignments[i][j]) == 1
+            )
+
+        # the objective is the cost alone without a hint penalty, so proving it optimal bounds the cost.
+        # With a shared bound, what was proved is that nothing beats the best of every search
+        if searched_all and (len(hinted) == 0 or hint_penalty == 0):
+            proved = min(objective_value, shared_bound.value) if shared_bound != None else objective_value
+            bound = max(bound, proved - (objective_step - 1))
 
         return {
             "status": status,
             "solutionByTask": solution_by_task,
             "solutionByWorker": solution_by_worker,
-            "objectiveValue": objective_value
+            "objectiveValue": objective_value,
+            "bound": bound,
+            "gap": get_gap(objective_value, bound),
+            "engine": "cp",
         }
 
     return {
         "status": status,
         "solutionByTask": None,
         "solutionByWorker": None,
-        "objectiveValue": None
+        "objectiveValue": None,
+        "bound": None,
+        "gap": None,
+        "engine": "cp",
     }
 
-def get_non_optimised_cost(cost_matrix, solution):
-    total = 0
-
-    for task_id, workers in solution.items():
-        task_cost = 0
-        for worker_id in workers:
-            task_cost += cost_matrix[str(worker_id)][task_id]
-        total += task_cost
-
-    return total
-
-
 def get_data(file_path):
     data_file = open(file_path, 'r')
     data = json.load(data_file)
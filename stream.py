@@ -0,0 +1,88 @@
+import json
+import queue
+import threading
+import time
+
+from solver import solver
+
+def get_pairs(solution_by_worker):
+    return set(
+        (worker_id, task_id)
+            for worker_id, task_ids in solution_by_worker.items()
+                for task_id in task_ids
+    )
+
+def group_by_worker(pairs):
+    grouped = {}
+    for worker_id, task_id in sorted(pairs, key=lambda pair: (str(pair[0]), pair[1])):
+        grouped.setdefault(worker_id, []).append(task_id)
+
+    return grouped
+
+def solution_delta(previous_by_worker, solution_by_worker):
+    """
+        Worker/tasks assigned and unassigned going from one solutionByWorker to the next
+    """
+    previous_pairs = get_pairs(previous_by_worker)
+    pairs = get_pairs(solution_by_worker)
+
+    return {
+        "assigned": group_by_worker(pairs - previous_pairs),
+        "unassigned": group_by_worker(previous_pairs - pairs),
+    }
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+def stream_solve(data, solve=solver):
+    """
+        Generator of Server-Sent Events for a solve: a 'solution' event for every improving solution
+        (objective, elapsed ms and the delta from the previous one) then a 'done' event with the response.
+        The search stops once stopAtObjective is reached or the client stops reading
+    """
+    stop_at_objective = data['stopAtObjective'] if 'stopAtObjective' in data else None
+    events = queue.Queue()
+    stopped = threading.Event()
+    start = time.monotonic()
+    best_objective = [None]
+
+    def on_solution(objective_value, solution_by_worker):
+        if best_objective[0] != None and objective_value >= best_objective[0]:
+            return
+
+        best_objective[0] = objective_value
+        events.put(('solution', objective_value, (time.monotonic() - start) * 1000, solution_by_worker))
+
+        if stop_at_objective != None and objective_value <= stop_at_objective:
+            stopped.set()
+
+    def run():
+        try:
+            events.put(('done', solve(data, on_solution, stopped.is_set)))
+        except Exception as e:
+            events.put(('error', str(e)))
+
+    threading.Thread(target=run, daemon=True).start()
+
+    try:
+        previous_by_worker = {}
+        while True:
+            event = events.get()
+
+            if event[0] == 'solution':
+                _, objective_value, elapsed_ms, solution_by_worker = event
+                yield sse_event('solution', {
+                    "objectiveValue": objective_value,
+                    "elapsedMs": round(elapsed_ms),
+                    **solution_delta(previous_by_worker, solution_by_worker),
+                })
+                previous_by_worker = solution_by_worker
+            elif event[0] == 'done':
+                yield sse_event('done', event[1])
+                return
+            else:
+                yield sse_event('error', { "error": event[1] })
+                return
+    finally:
+        # client went away (or the solve finished), stop searching
+        stopped.set()
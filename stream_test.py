@@ -0,0 +1,47 @@
+import json
+import unittest
+from api import app
+from stream import solution_delta
+from cpsat_solver_test import get_test_data
+
+def parse_events(body):
+    events = []
+    for chunk in body.strip().split('\n\n'):
+        event_line, data_line = chunk.split('\n')
+        events.append((event_line[len('event: '):], json.loads(data_line[len('data: '):])))
+
+    return events
+
+class TestStream(unittest.TestCase):
+    def test_solution_delta(self):
+        delta = solution_delta({ 1: ['a', 'b'], 2: ['c'] }, { 1: ['a'], 2: ['c', 'b'] })
+
+        self.assertDictEqual(delta, { "assigned": { 2: ['b'] }, "unassigned": { 1: ['b'] } })
+
+    def test_stream_improving_solutions(self):
+        response = app.test_client().post('/solve/stream', json=get_test_data('cpsat'))
+        events = parse_events(response.get_data(as_text=True))
+
+        solutions = [data for event, data in events if event == 'solution']
+        event, done = events[-1]
+
+        self.assertEqual(event, 'done')
+        self.assertTrue(len(solutions) > 0)
+        objectives = [s['objectiveValue'] for s in solutions]
+        self.assertListEqual(objectives, sorted(objectives, reverse=True))
+        self.assertEqual(objectives[-1], done['objectiveValue'])
+
+    def test_stream_stops_at_objective(self):
+        data = get_test_data('optimal')
+        data['stopAtObjective'] = 2000
+
+        response = app.test_client().post('/solve/stream', json=data)
+        events = parse_events(response.get_data(as_text=True))
+        event, done = events[-1]
+
+        self.assertEqual(event, 'done')
+        self.assertTrue(done['status'])
+        self.assertLessEqual(done['objectiveValue'], 2000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,16 @@
-from collections import namedtuple
+import ast
+import base64
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple, deque
 
 Task = namedtuple('Task', ['id', 'task_id', 'qty', 'start_time', 'end_time', 'index'])
 Worker = namedtuple('Worker', ['id', 'name', 'tags', 'index'])
 Range = namedtuple('Range', ['start_time', 'end_time'])
+Timeline = namedtuple('Timeline', ['buckets'])
+TimelineBucket = namedtuple('TimelineBucket', ['starts', 'positions', 'max_duration'])
+TaskTable = namedtuple('TaskTable', ['start', 'end', 'duration', 'qty', 'task_code', 'index', 'task_ids'])
 
 def get_range(range):
     return Range(range['startTime'], range['endTime'])
@@ -41,6 +49,149 @@ def get_workers(given_workers):
 
     return workers
 
+def is_dense_cost_matrix(cost_matrix):
+    """Whether cost_matrix is lined up with the order of the workers and scheduledTasks arrays"""
+    return isinstance(cost_matrix, list) or 'encoding' in cost_matrix
+
+def get_cost_rows(cost_matrix, workers, tasks):
+    """
+        Cost of each worker for each scheduled task, indexed by worker.index then task.index. cost_matrix is one of
+            { [worker_id] : { [scheduled_task_id] : cost } }
+            cost[][] : rows in the order of workers, columns in the order of scheduledTasks
+            { encoding : 'base64', data } : the same rows as one little-endian int32 buffer, base64 encoded
+            { encoding : 'npy', data } : a base64 encoded .npy file of an int32 (workers, tasks) array
+        Rows of an encoded matrix are views over the one decoded buffer
+    """
+    if isinstance(cost_matrix, list):
+        if len(cost_matrix) != len(workers) or any(len(row) != len(tasks) for row in cost_matrix):
+            raise ValueError(f'costMatrix must have {len(workers)} rows of {len(tasks)} costs')
+
+        return cost_matrix
+
+    if 'encoding' in cost_matrix:
+        return get_encoded_cost_rows(cost_matrix, len(workers), len(tasks))
+
+    return [[cost_matrix[str(worker.id)][task.id] for task in tasks] for worker in workers]
+
+def get_encoded_cost_rows(cost_matrix, num_workers, num_tasks):
+    buffer = base64.b64decode(cost_matrix['data'])
+
+    if cost_matrix['encoding'] == 'npy':
+        buffer = get_npy_data(buffer, (num_workers, num_tasks))
+    elif cost_matrix['encoding'] != 'base64':
+        raise ValueError(f"unknown costMatrix encoding {cost_matrix['encoding']}")
+
+    if len(buffer) != num_workers * num_tasks * 4:
+        raise ValueError(f'costMatrix must have {num_workers} rows of {num_tasks} int32 costs')
+
+    if sys.byteorder == 'little':
+        costs = memoryview(buffer).cast('i')
+    else:
+        costs = array('i', bytes(buffer))
+        costs.byteswap()
+
+    return [costs[i * num_tasks:(i + 1) * num_tasks] for i in range(num_workers)]
+
+def get_npy_data(buffer, shape):
+    """
+        The data of a .npy file holding a little-endian int32, C ordered array of shape
+    """
+    if buffer[:6] != b'\x93NUMPY':
+        raise ValueError('costMatrix is not a .npy file')
+
+    # version 1 has a 2 byte header length, later versions 4
+    if buffer[6] == 1:
+        header_start = 10
+        header_length = int.from_bytes(buffer[8:10], 'little')
+    else:
+        header_start = 12
+        header_length = int.from_bytes(buffer[8:12], 'little')
+
+    header = ast.literal_eval(buffer[header_start:header_start + header_length].decode('latin1'))
+
+    if header['descr'] != '<i4' or header['fortran_order'] or tuple(header['shape']) != shape:
+        raise ValueError(f'costMatrix .npy must be a <i4, C ordered array of shape {shape}')
+
+    return memoryview(buffer)[header_start + header_length:]
+
+def get_task_table(tasks):
+    """
+        Columnar view of tasks with times precomputed in minutes, built once per request.
+        Each column is an array('i') lined up with task.index. task_code holds the position
+        of the task's task_id in task_ids.
+    """
+    start = array('i')
+    end = array('i')
+    duration = array('i')
+    qty = array('i')
+    task_code = array('i')
+    index = array('i')
+    task_ids = []
+    task_id_codes = {}
+
+    for task in tasks:
+        start_mins = time_in_mins(task.start_time)
+        end_mins = time_in_mins(task.end_time)
+
+        if task.task_id not in task_id_codes:
+            task_id_codes[task.task_id] = len(task_ids)
+            task_ids.append(task.task_id)
+
+        start.append(start_mins)
+        end.append(end_mins)
+        duration.append(end_mins - start_mins)
+        qty.append(task.qty)
+        task_code.append(task_id_codes[task.task_id])
+        index.append(task.index)
+
+    return TaskTable(start, end, duration, qty, task_code, index, task_ids)
+
+def get_timeline(task_table):
+    """
+        Task table positions in start order with their start minutes, built once per request so
+        time queries bisect to the tasks they need instead of scanning every task.
+        Tasks are bucketed by duration (powers of 2), a bucket's max_duration bounds how long before
+        a range a task of it on in the range can start, so a single long task only widens the
+        search of its own bucket rather than every query
+    """
+    positions_by_bucket = {}
+    for position in sorted(range(len(task_table.start)), key=lambda position: task_table.start[position]):
+        positions_by_bucket.setdefault(task_table.duration[position].bit_length(), []).append(position)
+
+    return Timeline([
+        TimelineBucket(
+            array('i', (task_table.start[position] for position in positions)),
+            array('i', positions),
+            max(task_table.duration[position] for position in positions),
+        )
+            for _, positions in sorted(positions_by_bucket.items())
+    ])
+
+def get_timeline_indexes_in_range(task_table, timeline, range_start, range_end):
+    """Indexes of tasks mins_same_time as the range (in minutes), in index order"""
+    indexes = []
+    for bucket in timeline.buckets:
+        first = bisect_left(bucket.starts, range_start - bucket.max_duration)
+        last = bisect_right(bucket.starts, range_end)
+
+        indexes.extend(
+            task_table.index[position] for position in bucket.positions[first:last]
+                if mins_same_time(task_table.start[position], task_table.end[position], range_start, range_end)
+        )
+
+    return sorted(indexes)
+
+def get_timeline_indexes_starting_between(task_table, timeline, after, before):
+    """Indexes of tasks starting strictly between the two times (in minutes), in index order"""
+    indexes = []
+    for bucket in timeline.buckets:
+        first = bisect_right(bucket.starts, after)
+        last = bisect_left(bucket.starts, before)
+
+        indexes.extend(task_table.index[position] for position in bucket.positions[first:last])
+
+    return sorted(indexes)
+
 def time_in_mins(time):
     return (time['hour'] * 60) + time['min']
 
@@ -67,6 +218,16 @@ def get_task_duration(task):
         time_in_mins(task.end_time) - time_in_mins(task.start_time)
     )
 
+def mins_same_time(start1, end1, start2, end2):
+    """same_time for ranges already in minutes"""
+    return (
+        (start1 == start2 and end1 == end2) or
+        start2 < start1 < end2 or
+        start2 < end1 < end2 or
+        start1 < start2 < end1 or
+        start1 < end2 < end1
+    )
+
 def split_task_by_duration_limit(tasks, limit):
     over = []
     under = []
@@ -113,6 +274,29 @@ def group_tasks(tasks, predicate):
 
 # get tasks that last consecutive limit start within breaktime
 
+def split_task_indexes_by_duration_limit(task_table, limit):
+    under = []
+    over = []
+    for index, duration in zip(task_table.index, task_table.duration):
+        if duration > limit:
+            over.append(index)
+        else:
+            under.append(index)
+
+    return (under, over)
+
+def get_task_indexes_in_range(task_table, range, timeline=None):
+    range_start = time_in_mins(range.start_time)
+    range_end = time_in_mins(range.end_time)
+
+    if timeline != None:
+        return get_timeline_indexes_in_range(task_table, timeline, range_start, range_end)
+
+    return [
+        index for index, start, end in zip(task_table.index, task_table.start, task_table.end)
+            if mins_same_time(start, end, range_start, range_end)
+    ]
+
 def get_tasks_in_range(tasks, range):
     tasks_in_range = []
 
@@ -132,7 +316,60 @@ def all_tasks_share_time(task, tasks):
     return all([same_time(t, task) for t in tasks])
 
 def group_task_by_time_overlap(tasks):
-    return group_tasks(tasks, all_tasks_share_time)
+    """
+        Group tasks into the maximal sets of tasks that are all on at the same point in time.
+        Sweeps over task start/end minutes (ends before starts on the same minute, so tasks that
+        only connect do not overlap) and emits the tasks currently on whenever the sweep is about
+        to close a task after opening new ones. Every set of overlapping tasks is a subset of one
+        of the returned groups, so an "at most one" constraint per group is enough.
+        As for same_time, a task without a duration overlaps the tasks on either side of its minute
+        and any other task without a duration at that minute, but not tasks starting or ending on it.
+    """
+    starts = [time_in_mins(task.start_time) for task in tasks]
+    ends = [time_in_mins(task.end_time) for task in tasks]
+
+    return [[tasks[position] for position in group] for group in group_by_time_overlap(starts, ends)]
+
+def group_task_indexes_by_time_overlap(task_table):
+    """group_task_by_time_overlap over a task table, giving groups of task indexes"""
+    return [
+        [task_table.index[position] for position in group]
+            for group in group_by_time_overlap(task_table.start, task_table.end)
+    ]
+
+# order of the sweep events on the same minute: tasks ending, then tasks without a duration starting
+# and ending, then tasks starting
+task_end_event = 0
+instant_start_event = 1
+instant_end_event = 2
+task_start_event = 3
+
+def group_by_time_overlap(starts, ends):
+    events = []
+    for position, (start, end) in enumerate(zip(starts, ends)):
+        if end > start:
+            events.append((start, task_start_event, position))
+            events.append((end, task_end_event, position))
+        else:
+            events.append((start, instant_start_event, position))
+            events.append((start, instant_end_event, position))
+
+    events.sort()
+
+    groups = []
+    positions_on = {}
+    opened_since_emit = False
+    for _, event, position in events:
+        if event == task_start_event or event == instant_start_event:
+            positions_on[position] = True
+            opened_since_emit = True
+        else:
+            if opened_since_emit and len(positions_on) > 1:
+                groups.append(list(positions_on))
+            opened_since_emit = False
+            del positions_on[position]
+
+    return groups
 
 def group_task_by_task(tasks):
     grouped_tasks = {}
@@ -188,67 +425,110 @@ def tasks_connect(task1, task2):
 
 Path = namedtuple('Path', ['total_time', 'path_tasks'])
 
+def find_consecutive_index_paths(indexes, starts, ends, limit, firsts=None, max_paths=None):
+    """
+        Every path of back to back tasks (each starting as the previous one ends) that first reaches limit,
+        as Path(total_time, task indexes), found breadth first from each of firsts (default all indexes).
+        Tasks are indexed by start minute once, so extending a path never scans or copies the task list.
+        Returns None as soon as more than max_paths paths are found
+    """
+    by_start = sorted(indexes, key=lambda j: starts[j])
+
+    starting_at = {}
+    for j in by_start:
+        starting_at.setdefault(starts[j], []).append(j)
+
+    paths = []
+    for first in (by_start if firsts == None else firsts):
+        potential_paths = deque([(ends[first] - starts[first], (first,))])
+
+        while potential_paths:
+            total_time, path = potential_paths.popleft()
+
+            for j in starting_at.get(ends[path[-1]], []):
+                # tasks without a duration could otherwise connect to themselves
+                if j in path:
+                    continue
+
+                new_time = total_time + ends[j] - starts[j]
+                new_path = (*path, j)
+
+                if new_time >= limit:
+                    paths.append(Path(new_time, list(new_path)))
+
+                    if max_paths != None and len(paths) > max_paths:
+                        return None
+                else:
+                    potential_paths.append((new_time, new_path))
+
+    return paths
+
 def consecutive_tasks_until_limit(initial_task, tasks_after, limit):
     """
         Given an initial task and all tasks same_time or after, get all consecutive paths up until limit reached
     """
-    completed_paths = []
-    potential_paths = [
-        Path(get_task_duration(initial_task), [initial_task])
-    ]
-    new_path_created = True
-    remaining_tasks = tasks_after[:]
+    tasks = [initial_task, *tasks_after]
+    starts = [time_in_mins(t.start_time) for t in tasks]
+    ends = [time_in_mins(t.end_time) for t in tasks]
+
+    paths = find_consecutive_index_paths(range(1, len(tasks)), starts, ends, limit, firsts=[0])
 
-    # if an all remaining tasks do not patch any paths, stop!
-    while new_path_created:
-        new_path_created = False
-        new_remaining_tasks = remaining_tasks[:]
-        for task_index, task in enumerate(remaining_tasks):
-            new_potential_paths = potential_paths[:]
-            # test if each remaining task can join a path
-            for (total_time, path_tasks) in potential_paths:
-                end_task = end_task_of_path(path_tasks)
+    return [Path(total_time, [tasks[p] for p in path]) for total_time, path in paths]
 
-                if tasks_connect(end_task, task):
-                    new_time = get_total_consecutive_time(total_time, task)
-                    new_path = Path(new_time, [*path_tasks, task])
+def find_all_consecutive_paths(tasks, limit):
+    starts = [time_in_mins(t.start_time) for t in tasks]
+    ends = [time_in_mins(t.end_time) for t in tasks]
 
-                    if new_time >= limit:
-                        # Add to completed
-                        completed_paths.append(new_path)
-                    else:
-                        # Add to a potential path
-                        new_potential_paths.append(new_path)
-                        new_path_created = True
+    paths = find_consecutive_index_paths(range(len(tasks)), starts, ends, limit)
 
-                    # Once a task connects to a path (completed or not), remove task so don't check again
-                    new_remaining_tasks = remove_by_id(new_remaining_tasks, task.id)
+    return [Path(total_time, [tasks[p] for p in path]) for total_time, path in paths]
 
-            # update potential_paths
-            potential_paths = new_potential_paths[:]
+def get_task_predecessors(indexes, starts, ends):
+    """
+        { [index] : indexes of the tasks ending as it starts }, for the given task indexes
+    """
+    ending_at = {}
+    for j in indexes:
+        ending_at.setdefault(ends[j], []).append(j)
 
-        remaining_tasks = new_remaining_tasks[:]
+    return { j: [p for p in ending_at.get(starts[j], []) if p != j] for j in indexes }
 
-    # return [path.path_tasks for path in completed_paths]
-    return completed_paths
+def get_exact_limit_path_starts(indexes, starts, ends, limit):
+    """
+        Indexes of tasks that start a path of back to back tasks (two or more) lasting exactly limit.
+        Works back from the latest task, keeping the totals (up to limit) of the paths from every task,
+        so no path is enumerated. Assumes tasks have a duration
+    """
+    starting_at = {}
+    for j in indexes:
+        starting_at.setdefault(starts[j], []).append(j)
+
+    totals_from = {}
+    path_starts = []
+    for j in sorted(indexes, key=lambda j: starts[j], reverse=True):
+        duration = ends[j] - starts[j]
+        path_totals = set(
+            duration + total
+                for k in starting_at.get(ends[j], []) if k != j
+                    for total in totals_from.get(k, []) if duration + total <= limit
+        )
 
+        if limit in path_totals:
+            path_starts.append(j)
 
-def find_all_consecutive_paths(tasks, limit):
-    task_paths = []
-    # sort by start time
-    tasks_by_start = tasks[:]
-    tasks_by_start.sort(key= lambda t: time_in_mins(t.start_time))
+        totals_from[j] = path_totals | set([duration])
 
-    for index, task in enumerate(tasks_by_start):
-        # get all consecutive tasks from this task until limit
-        tasks_after = tasks_by_start[index:len(tasks_by_start)]
-        paths_from_task = consecutive_tasks_until_limit(task, tasks_after, limit)
+    return sorted(path_starts)
 
-        if len(paths_from_task):
-            for path in paths_from_task:
-                task_paths.append(path)
+def get_task_indexes_within_break_time_limit(break_time, path_end_time_mins, task_table, timeline=None):
+    """Indexes of tasks starting less than break_time after a path ends"""
+    if timeline != None:
+        return get_timeline_indexes_starting_between(task_table, timeline, path_end_time_mins, path_end_time_mins + break_time)
 
-    return task_paths
+    return [
+        index for index, start in zip(task_table.index, task_table.start)
+            if 0 < start - path_end_time_mins < break_time
+    ]
 
 def get_tasks_within_break_time_limit(break_time, path, tasks):
     path_tasks = path.path_tasks[:]
@@ -1,9 +1,51 @@
+import itertools
+import random
 import unittest
-from utils import same_time, group_task_by_time_overlap, get_task_duration, consecutive_tasks_until_limit
+from utils import (
+    same_time,
+    group_tasks,
+    all_tasks_share_time,
+    group_task_by_time_overlap,
+    get_task_duration,
+    consecutive_tasks_until_limit,
+    get_tasks,
+    get_task_table,
+    get_tasks_in_range,
+    get_task_indexes_in_range,
+    get_task_indexes_within_break_time_limit,
+    get_timeline,
+    split_task_by_duration_limit,
+    split_task_indexes_by_duration_limit,
+    find_consecutive_index_paths,
+    get_exact_limit_path_starts,
+    Range,
+)
+from solver import get_data
 
 from collections import namedtuple
 Task = namedtuple('Task', ['id', 'start_time', 'end_time'])
 
+def synthetic_day(num_tasks, seed, durations=[15, 30, 45, 60, 90, 120]):
+    rand = random.Random(seed)
+    tasks = []
+    for id in range(num_tasks):
+        start = rand.randrange(8 * 60, 18 * 60, 15)
+        end = start + rand.choice(durations)
+        tasks.append(Task(
+            id,
+            { "hour": start // 60, "min": start % 60 },
+            { "hour": end // 60, "min": end % 60 },
+        ))
+
+    return tasks
+
+def overlapping_pairs(groups):
+    return set(
+        frozenset([t1.id, t2.id])
+            for group in groups
+                for t1, t2 in itertools.combinations(group, 2)
+    )
+
 class TestUtils(unittest.TestCase):
     def test_consecutive_tasks_until_limit_1(self):
         initial_task = Task(1, { "hour": 9, "min": 00 }, { "hour": 9, "min": 15 })
@@ -75,6 +117,154 @@ class TestUtils(unittest.TestCase):
             ]
         )
 
+    def test_group_task_by_time_overlap_matches_group_tasks(self):
+        tasks = get_tasks(get_data('./data.json')['scheduledTasks'])
+
+        grouped = [frozenset(t.id for t in g) for g in group_task_by_time_overlap(tasks)]
+        previously_grouped = [frozenset(t.id for t in g) for g in group_tasks(tasks, all_tasks_share_time)]
+
+        # every new group is one of the old groups, and every old group is covered by a new one
+        self.assertTrue(all(g in previously_grouped for g in grouped))
+        self.assertTrue(all(any(g <= n for n in grouped) for g in previously_grouped))
+
+    def test_group_task_by_time_overlap_synthetic_day(self):
+        for seed in range(3):
+            tasks = synthetic_day(400, seed)
+
+            grouped = group_task_by_time_overlap(tasks)
+            expected_pairs = set(
+                frozenset([t1.id, t2.id])
+                    for t1, t2 in itertools.combinations(tasks, 2) if same_time(t1, t2)
+            )
+
+            for group in grouped:
+                self.assertTrue(all(same_time(t1, t2) for t1, t2 in itertools.combinations(group, 2)))
+            self.assertSetEqual(overlapping_pairs(grouped), expected_pairs)
+
+            # only maximal groups are returned
+            group_ids = [frozenset(t.id for t in g) for g in grouped]
+            self.assertFalse(any(g1 < g2 for g1 in group_ids for g2 in group_ids))
+
+    def test_group_task_by_time_overlap_without_duration(self):
+        tasks = synthetic_day(300, 0, durations=[0, 15, 30, 60])
+        grouped = group_task_by_time_overlap(tasks)
+
+        expected_pairs = set(
+            frozenset([t1.id, t2.id])
+                for t1, t2 in itertools.combinations(tasks, 2) if same_time(t1, t2)
+        )
+        self.assertSetEqual(overlapping_pairs(grouped), expected_pairs)
+
+        # on inside a task, or at the same minute as another, but not as a task starts or ends
+        grouped = group_task_by_time_overlap([
+            Task(1, { "hour": 9, "min": 0 }, { "hour": 10, "min": 0 }),
+            Task(2, { "hour": 9, "min": 30 }, { "hour": 9, "min": 30 }),
+            Task(3, { "hour": 9, "min": 30 }, { "hour": 9, "min": 30 }),
+            Task(4, { "hour": 10, "min": 0 }, { "hour": 10, "min": 0 }),
+            Task(5, { "hour": 10, "min": 0 }, { "hour": 11, "min": 0 }),
+        ])
+        self.assertListEqual([sorted(t.id for t in g) for g in grouped], [[1, 2, 3]])
+
+    def test_task_table_queries_match_task_queries(self):
+        tasks = get_tasks(get_data('./data.json')['scheduledTasks'])
+        task_table = get_task_table(tasks)
+
+        self.assertListEqual(list(task_table.duration), [get_task_duration(t) for t in tasks])
+        self.assertListEqual([task_table.task_ids[c] for c in task_table.task_code], [t.task_id for t in tasks])
+
+        for start_hour, end_hour in [(9, 10), (11, 13), (12, 17), (16, 18)]:
+            range = Range({ "hour": start_hour, "min": 0 }, { "hour": end_hour, "min": 0 })
+            self.assertListEqual(
+                get_task_indexes_in_range(task_table, range),
+                [t.index for t in get_tasks_in_range(tasks, range)]
+            )
+
+        under, over = split_task_by_duration_limit(tasks, 30)
+        self.assertTupleEqual(
+            split_task_indexes_by_duration_limit(task_table, 30),
+            ([t.index for t in under], [t.index for t in over])
+        )
+
+    def test_exact_limit_path_starts_match_paths(self):
+        for seed in range(3):
+            task_table = get_task_table(get_tasks([
+                { "id": t.id, "task": { "id": t.id, "qty": 1 }, "startTime": t.start_time, "endTime": t.end_time }
+                    for t in synthetic_day(60, seed)
+            ]))
+            indexes = list(range(len(task_table.start)))
+
+            for limit in [30, 60, 90]:
+                paths = find_consecutive_index_paths(indexes, task_table.start, task_table.end, limit)
+
+                # every path is a chain of back to back tasks, over the limit or exactly at it
+                for path in paths:
+                    self.assertGreater(len(path.path_tasks), 1)
+                    self.assertGreaterEqual(path.total_time, limit)
+                    for p, j in zip(path.path_tasks, path.path_tasks[1:]):
+                        self.assertEqual(task_table.end[p], task_table.start[j])
+
+                self.assertListEqual(
+                    get_exact_limit_path_starts(indexes, task_table.start, task_table.end, limit),
+                    sorted(set(path.path_tasks[0] for path in paths if path.total_time == limit))
+                )
+
+                # too many paths
+                if len(paths) > 0:
+                    self.assertIsNone(find_consecutive_index_paths(
+                        indexes, task_table.start, task_table.end, limit, max_paths=len(paths) - 1))
+
+    def test_timeline_queries_match_scans(self):
+        for seed in range(3):
+            task_table = get_task_table(get_tasks([
+                { "id": t.id, "task": { "id": t.id, "qty": 1 }, "startTime": t.start_time, "endTime": t.end_time }
+                    for t in synthetic_day(200, seed)
+            ]))
+            timeline = get_timeline(task_table)
+
+            for start in range(7 * 60, 20 * 60, 15):
+                # empty ranges only match tasks starting and ending at the same times
+                for length in [0, 15, 45, 240]:
+                    end = start + length
+                    time_range = Range({ "hour": start // 60, "min": start % 60 }, { "hour": end // 60, "min": end % 60 })
+                    self.assertListEqual(
+                        get_task_indexes_in_range(task_table, time_range, timeline),
+                        get_task_indexes_in_range(task_table, time_range)
+                    )
+
+                for break_time in [15, 30, 60]:
+                    self.assertListEqual(
+                        get_task_indexes_within_break_time_limit(break_time, start, task_table, timeline),
+                        get_task_indexes_within_break_time_limit(break_time, start, task_table)
+                    )
+
+    def test_timeline_long_task(self):
+        tasks = [
+            { "id": t.id, "task": { "id": t.id, "qty": 1 }, "startTime": t.start_time, "endTime": t.end_time }
+                for t in synthetic_day(200, 0, durations=[0, 15, 30, 60])
+        ]
+        tasks.append({ "id": "all day", "task": { "id": "all day", "qty": 1 },
+            "startTime": { "hour": 0, "min": 0 }, "endTime": { "hour": 23, "min": 59 } })
+        task_table = get_task_table(get_tasks(tasks))
+        timeline = get_timeline(task_table)
+
+        # the all day task gets a bucket of its own, the others are still searched by their own durations
+        self.assertEqual([len(bucket.positions) for bucket in timeline.buckets if bucket.max_duration > 60], [1])
+        self.assertTrue(all(bucket.max_duration <= 60 for bucket in timeline.buckets if len(bucket.positions) > 1))
+
+        for start in range(7 * 60, 20 * 60, 15):
+            for length in [0, 15, 240]:
+                end = start + length
+                time_range = Range({ "hour": start // 60, "min": start % 60 }, { "hour": end // 60, "min": end % 60 })
+                self.assertListEqual(
+                    get_task_indexes_in_range(task_table, time_range, timeline),
+                    get_task_indexes_in_range(task_table, time_range)
+                )
+
+            self.assertListEqual(
+                get_task_indexes_within_break_time_limit(30, start, task_table, timeline),
+                get_task_indexes_within_break_time_limit(30, start, task_table)
+            )
+
     # def test_same_time(self):
     #     # Same time test
     #     self.assertEqual(